@@ -1,61 +1,123 @@
 """
 ML prediction & monitoring service (Flask).
 """
+import time
+
+_IMPORT_START = time.perf_counter()
+
 from datetime import datetime
 import json
 import logging
 import os
+import random
 from typing import Any, Dict
 
-import joblib
 import numpy as np
 import pandas as pd
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
-from src.data.preprocessing import DataPreprocessor
+from src.data.compiled import CompiledTransformer
+from src.data.preprocessing import load_config, setup_logging
+from src.data.validation import DataValidator
+from src.monitoring.drift import DriftMonitor
+from src.serving.batching import MicroBatcher
+from src.serving.cache import PredictionCache
+from src.serving.logs import enable_async_logging
+from src.serving.profiler import collapsed, sample_stacks
+from src.serving.registry import LoadedModel, ModelRegistry, PreprocessorWatcher, ServingTables
+from src.serving.shadow import Canary, ShadowScorer
+from src.serving.store import create_store
 
 
-# Logging
+# Logging (handlers come from config/logging.yaml, applied below)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("logs/app.log"), logging.StreamHandler()],
-)
 logger = logging.getLogger("inference_app")
 
-PREDICTIONS_FILE = "data/predictions.json"
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
 
 PREDICTION_LATENCY = Histogram(
     "prediction_latency_seconds",
     "Time spent processing prediction requests",
-    buckets=(0.1, 0.5, 1.0, 2.0, 5.0),
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_LATENCY = Histogram(
+    "batch_prediction_latency_seconds",
+    "Time spent processing batch prediction requests",
+    buckets=LATENCY_BUCKETS[4:] + (10.0, 30.0, 60.0),
+)
+STAGE_LATENCY = Histogram(
+    "prediction_stage_latency_seconds",
+    "Time spent per stage of a prediction request",
+    ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+EXPLAIN_LATENCY = Histogram(
+    "explain_latency_seconds",
+    "Time spent processing explanation requests",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_ROWS = Histogram(
+    "batch_prediction_rows",
+    "Number of records per batch prediction request",
+    buckets=(1, 10, 100, 1000, 10000, 50000, 100000),
 )
 PREDICTION_REQUESTS = Counter(
     "prediction_requests_total",
     "Prediction request count",
     ["model", "status"],
 )
+STARTUP_SECONDS = Gauge(
+    "app_startup_seconds",
+    "Wall time of each startup phase",
+    ["phase"],
+    multiprocess_mode="max",
+)
 
 # --------------------------------------------------------------------------- #
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Next-Before", "X-Prev-After", "X-Cache", "X-Model"])
+
+
+# Load artefacts needed for *prediction* (LightGBM stays the default live model)
+
+STARTUP: Dict[str, Any] = {"ready": False, "seconds": {"imports": time.perf_counter() - _IMPORT_START}}
+_artifacts_start = time.perf_counter()
+
+CONFIG = load_config()
+os.makedirs("logs", exist_ok=True)
+setup_logging()
+LOGGING_CONFIG = CONFIG["api"].get("request_logging", {})
+if LOGGING_CONFIG.get("async", True):
+    enable_async_logging(LOGGING_CONFIG.get("queue_size", 10_000))
+PAYLOAD_SAMPLE_RATE = float(LOGGING_CONFIG.get("payload_sample_rate", 1.0))
+validator = DataValidator(CONFIG)
+
+BATCH_CONFIG = CONFIG["api"].get("batch", {})
+STORE_CONFIG = CONFIG["api"].get("prediction_store", {})
+STARTUP_CONFIG = CONFIG["api"].get("startup", {})
+EXPLAIN_CONFIG = CONFIG["api"].get("explain", {})
+prediction_store = create_store(CONFIG)
 
+MODELS_CONFIG = CONFIG["api"].get("models", {})
+DEFAULT_MODEL = MODELS_CONFIG.get("default", "lightgbm")
+registry = ModelRegistry.from_config(CONFIG)
+registry.get(DEFAULT_MODEL)
 
-# Load artefacts needed for *prediction* (we keep LightGBM as the live model)
 
-preprocessor = DataPreprocessor()
-preprocessor.load_preprocessor()
+def _on_preprocessor_swap(tables: ServingTables):
+    if drift_monitor is not None:
+        drift_monitor.set_feature_names(tables.compiled.feature_names_)
 
-model_path = "models/lightgbm.joblib"
-encoder_path = "models/lightgbm_label_encoder.joblib"
 
-model = joblib.load(model_path)
-label_encoder = joblib.load(encoder_path)
+# reloaded like the models when a retrain rewrites it; one snapshot per request
+preprocessor = PreprocessorWatcher.from_config(CONFIG, _on_preprocessor_swap)
+drift_monitor = DriftMonitor.from_config(CONFIG, preprocessor.current.compiled.feature_names_)
+STARTUP["seconds"]["artifacts"] = time.perf_counter() - _artifacts_start
 
-logger.info("LightGBM model & encoder loaded for /predict.")
+logger.info(f"Default model '{DEFAULT_MODEL}' loaded for /predict.")
 
 
 #  Metrics table shared by the monitoring endpoints
@@ -73,70 +135,568 @@ METRICS_TABLE: Dict[str, Dict[str, float]] = _load_metrics_table()
 
 # Utils
 
-def load_predictions() -> list[Dict[str, Any]]:
-    return json.load(open(PREDICTIONS_FILE)) if os.path.exists(PREDICTIONS_FILE) else []
+def save_prediction(record: Dict[str, Any]):
+    # enqueue only – the store's background writer does the disk I/O
+    prediction_store.append({"timestamp": datetime.now().isoformat()} | record)
 
 
-def save_prediction(record: Dict[str, Any]):
-    os.makedirs(os.path.dirname(PREDICTIONS_FILE), exist_ok=True)
-    data = load_predictions()
-    data.append(record | {"timestamp": datetime.now().isoformat()})
-    with open(PREDICTIONS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+# Challengers: canary routing and asynchronous shadow scoring
+
+canary = Canary.from_config(CONFIG)
+shadow = ShadowScorer.from_config(CONFIG, registry.get, DEFAULT_MODEL, save_prediction)
+# challengers stay resident: an LRU swap per shadowed request would cost more than scoring
+registry.pinned.update(([canary.model] if canary else []) + (shadow.challengers if shadow else []))
+
+
+def _parse_batch_records() -> tuple[list[Dict[str, Any]], Dict[int, list[str]]]:
+    """
+    Read a JSON array or an NDJSON body (one object per line).
+    Lines that are not JSON objects are reported as per-row errors.
+    """
+    records: list[Dict[str, Any]] = []
+    errors: Dict[int, list[str]] = {}
+
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        lines = [ln for ln in request.get_data(as_text=True).splitlines() if ln.strip()]
+        for i, line in enumerate(lines):
+            try:
+                rec = json.loads(line)
+            except ValueError as exc:
+                rec, errors[i] = {}, [f"invalid JSON: {exc}"]
+            records.append(rec)
+    else:
+        records = request.get_json(force=True)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of records")
+
+    for i, rec in enumerate(records):
+        if not isinstance(rec, dict):
+            records[i], errors[i] = {}, ["record is not a JSON object"]
+    return records, errors
+
+
+def _resolve_model(routable: bool = False) -> LoadedModel:
+    """
+    Model named by ``?model=`` (default: ``api.models.default``, or for
+    ``routable`` requests the canary model ``api.canary.fraction`` of the time).
+    """
+    name = request.args.get("model")
+    if name is None:
+        name = canary.model if routable and canary is not None and canary.route() else DEFAULT_MODEL
+    return registry.get(name)
+
+
+def _score_matrix(live: LoadedModel, X: np.ndarray, observe: bool = True,
+                  policy: str = None) -> tuple[np.ndarray, np.ndarray]:
+    """Score an already-encoded feature matrix in one vectorised call → (labels, raw probabilities)."""
+    proba = live.predict_proba(X)
+    if observe and drift_monitor is not None:
+        drift_monitor.observe(X, proba, live.name)
+    return live.labels(proba, policy), proba
+
+
+def _score_micro_batch(items: list[tuple[LoadedModel, CompiledTransformer, Dict[str, Any]]]) -> list[Any]:
+    """
+    Score queued (model, compiled preprocessor, payload) /predict requests,
+    one vectorised call per model and preprocessor version → (label, probability, encoded row).
+    """
+    results: list[Any] = [None] * len(items)
+    by_model: Dict[tuple[int, int], list[int]] = {}
+    for i, (live, compiled, _) in enumerate(items):
+        by_model.setdefault((id(live), id(compiled)), []).append(i)
+
+    for positions in by_model.values():
+        live, compiled, _ = items[positions[0]]
+        try:
+            X, ok, errors = compiled.transform_partial([items[i][2] for i in positions])
+        except Exception:
+            # a malformed payload (e.g. missing a whole column) must not fail its neighbours
+            for i in positions:
+                try:
+                    X = compiled.transform(items[i][2])
+                    labels, proba = _score_matrix(live, X)
+                    results[i] = (labels[0], float(proba[0]), X[0])
+                except Exception as exc:
+                    results[i] = exc
+            continue
+        for j, msgs in errors.items():
+            results[positions[j]] = ValueError("; ".join(msgs))
+        if len(ok):
+            labels, proba = _score_matrix(live, X)
+            for k, (j, label, p) in enumerate(zip(ok, labels, proba)):
+                results[positions[j]] = (label, float(p), X[k])
+    return results
+
+
+def _explain_records(live: LoadedModel, records: list[Dict[str, Any]], top_k: int,
+                     timings: Dict[str, float]) -> tuple[list[Dict[str, Any]], Dict[int, list[str]]]:
+    """
+    Prediction + per-field contributions for every record that encodes.
+    Cached rows are reused; the rest go through one ``pred_contrib`` call.
+    """
+    tables = preprocessor.get()
+    compiled, feature_groups = tables.compiled, tables.groups
+    X, ok, errors = compiled.transform_partial(records, timings)
+    n = len(ok)
+    proba, bias = np.zeros(n), np.zeros(n)
+    folded = np.zeros((n, len(feature_groups.fields)))
+
+    t0 = time.perf_counter()
+    cache = explanation_cache
+    keys: list[Any] = [None] * n
+    misses = list(range(n))
+    if cache is not None:
+        version = (live.version, compiled.version)
+        misses = []
+        for j in range(n):
+            keys[j] = cache.feature_key(live.name, version, X[j])
+            cached = cache.explanations.get(keys[j])
+            if cached is None:
+                misses.append(j)
+            else:
+                proba[j], bias[j], folded[j] = cached
+        timings["cache"] = time.perf_counter() - t0
+
+    if misses:
+        t0 = time.perf_counter()
+        p, contributions = live.explain(X[misses])
+        timings["contributions"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        proba[misses], bias[misses], folded[misses] = p, contributions[:, -1], feature_groups.fold(contributions)
+        if cache is not None:
+            for j in misses:
+                cache.explanations.put(keys[j], (float(proba[j]), float(bias[j]), folded[j].copy()))
+        timings["fold"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    labels = live.labels(proba)
+    described = feature_groups.describe(folded, [records[i] for i in ok], top_k)
+    results = [
+        {
+            "index": int(i),
+            "prediction": label,
+            "probability": round(float(p), 6),
+            "risk": round(float(r), 6),
+            "base_value": round(float(b), 6),
+            "contributions": items,
+        }
+        for i, label, p, r, b, items in zip(ok, labels, proba, live.risk(proba), bias, described)
+    ]
+    timings["describe"] = time.perf_counter() - t0
+    return results, errors
+
+
+def _explain_setup() -> tuple[LoadedModel, int]:
+    """(model, top_k) for an /explain request; KeyError / ValueError for bad parameters."""
+    live = _resolve_model()
+    if not live.explainable:
+        raise ValueError(f"Model '{live.name}' has no native feature contributions (use lightgbm or xgboost)")
+    top_k = int(request.args.get("top_k", EXPLAIN_CONFIG.get("top_k", 10)))
+    return live, top_k
+
+
+def _observe_stages(endpoint: str, timings: Dict[str, float]):
+    for stage, seconds in timings.items():
+        STAGE_LATENCY.labels(endpoint=endpoint, stage=stage).observe(seconds)
+
+
+MICRO_BATCH_CONFIG = CONFIG["api"].get("micro_batching", {})
+batcher = (
+    MicroBatcher(
+        _score_micro_batch,
+        max_batch_size=MICRO_BATCH_CONFIG.get("max_batch_size", 64),
+        max_delay_ms=MICRO_BATCH_CONFIG.get("max_delay_ms", 2.0),
+    )
+    if MICRO_BATCH_CONFIG.get("enabled", False)
+    else None
+)
+
+PROFILING_CONFIG = CONFIG["api"].get("profiling", {})
+prediction_cache = PredictionCache.from_config(CONFIG)
+# /explain caches per encoded row even when /predict does not
+explanation_cache = prediction_cache
+if explanation_cache is None and EXPLAIN_CONFIG.get("cache", True):
+    explanation_cache = PredictionCache(
+        max_entries=EXPLAIN_CONFIG.get("cache_entries", 10_000), ttl_seconds=EXPLAIN_CONFIG.get("cache_ttl_seconds", 300.0)
+    )
+
+
+def warmup(rounds: int) -> Dict[str, Any]:
+    """
+    Score the example record saved with the preprocessor ``rounds`` times
+    through the /predict code path (transform, predict_proba, labels,
+    jsonify), so lazy imports, lookup caches and the booster's first-call
+    setup happen before the first real request.
+    """
+    compiled = preprocessor.get().compiled
+    record = compiled.example_record
+    if not rounds or record is None:
+        return {"status": "skipped" if not rounds else "no example record in artefacts"}
+    live = registry.get(DEFAULT_MODEL)
+    for _ in range(rounds):
+        labels, proba = _score_matrix(live, compiled.transform(record, {}), observe=False)
+        with app.app_context():
+            jsonify({"prediction": labels[0], "response_time": float(proba[0])})
+    return {"status": "ok", "rounds": rounds}
+
+
+def finish_startup():
+    """Warm up and mark this process ready. serve.py defers this to each forked worker."""
+    start = time.perf_counter()
+    try:
+        STARTUP["warmup"] = warmup(int(STARTUP_CONFIG.get("warmup_rounds", 3)))
+    except Exception as exc:  # a bad example record must not keep a working model from serving
+        logger.exception(exc)
+        STARTUP["warmup"] = {"status": f"failed: {exc}"}
+    STARTUP["seconds"]["warmup"] = time.perf_counter() - start
+    STARTUP["seconds"]["total"] = time.perf_counter() - _IMPORT_START
+    for phase, seconds in STARTUP["seconds"].items():
+        STARTUP_SECONDS.labels(phase=phase).set(seconds)
+    STARTUP["ready"] = True
+    logger.info(f"Ready in {STARTUP['seconds']['total']:.2f}s (warmup: {STARTUP['warmup']['status']})")
+
+
+if not os.environ.get("API_DEFER_WARMUP"):
+    finish_startup()
 
 
 # Routes – Prometheus, health, prediction
 
 @app.route("/metrics")
 def metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # pre-forked workers (serve.py): aggregate every worker's samples
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry_ = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry_)
+        return generate_latest(registry_), 200, {"Content-Type": CONTENT_TYPE_LATEST}
     return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "healthy", "model_loaded": True})
+    """Readiness: artefacts loaded and warmed up; 503 until then."""
+    resident = [m["name"] for m in registry.resident()]
+    body = {
+        "status": "healthy" if STARTUP["ready"] else "starting",
+        "ready": STARTUP["ready"],
+        "model_loaded": DEFAULT_MODEL in resident,
+        "default_model": DEFAULT_MODEL,
+        "resident_models": resident,
+        "warmup": STARTUP.get("warmup"),
+        "startup_seconds": {k: round(v, 3) for k, v in STARTUP["seconds"].items()},
+    }
+    return jsonify(body), 200 if STARTUP["ready"] else 503
+
+
+@app.route("/debug/profile")
+def debug_profile():
+    """
+    Sample every thread's stack for ``?seconds=N`` and return collapsed
+    stacks (flamegraph.pl / speedscope input). Off unless
+    ``api.profiling.enabled``.
+    """
+    if not PROFILING_CONFIG.get("enabled", False):
+        return jsonify({"error": "Profiling is disabled (api.profiling.enabled)"}), 404
+    try:
+        seconds = float(request.args.get("seconds", 5))
+        interval = float(request.args.get("interval_ms", PROFILING_CONFIG.get("interval_ms", 5))) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    seconds = min(max(seconds, 0.0), float(PROFILING_CONFIG.get("max_seconds", 60)))
+    logger.info(f"Profiling for {seconds:.1f}s")
+    return collapsed(sample_stacks(seconds, max(interval, 0.001))), 200, {"Content-Type": "text/plain"}
 
 
 @app.route("/predict", methods=["POST"])
 def predict():
     start_time = datetime.now()
+    try:
+        live = _resolve_model(routable=True)
+        policy = request.args.get("policy")
+        live.threshold(policy)
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    timings: Dict[str, float] = {}
     with PREDICTION_LATENCY.time():
         try:
+            compiled = preprocessor.get().compiled
+            t0 = time.perf_counter()
             payload = request.get_json()
-            logger.info(f"Request: {payload}")
-
-            inp_df = pd.DataFrame([payload])
-            X = preprocessor.transform_new_data(inp_df)
-            X = X[preprocessor.feature_names_]          # keep order
-            X = X.apply(pd.to_numeric, errors="ignore") # ensure numeric
-
-            proba = model.predict_proba(X)[0][1]
-            y_num = int(proba >= 0.5)
-            label = label_encoder.inverse_transform([y_num])[0]
+            t1 = time.perf_counter()
+            timings["parse"] = t1 - t0
+            if PAYLOAD_SAMPLE_RATE >= 1.0 or random.random() < PAYLOAD_SAMPLE_RATE:
+                logger.info("request", extra={"event": "request", "model": live.name, "payload": payload})
+            timings["log"] = time.perf_counter() - t1
+
+            label, cache_status, row = None, "off", None
+            cache = prediction_cache if isinstance(payload, dict) else None
+            if cache is not None:
+                t0 = time.perf_counter()
+                version = (live.version, compiled.version)
+                raw_key = cache.raw_key(live.name, version, compiled.canonical(payload))
+                cached = cache.raw.get(raw_key)
+                if cached is not None:
+                    (label, p), cache_status = cached, "hit-raw"
+                timings["cache"] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            if label is None and batcher is not None:
+                label, p, row = batcher.score((live, compiled, payload))  # shares a vectorised call with concurrent requests
+                timings["micro_batch"] = time.perf_counter() - t0
+                if cache is not None:
+                    cache.raw.put(raw_key, (label, p))
+                    cache_status = "miss"
+            elif label is None:
+                X = compiled.transform(payload, timings)  # feature_names_ order, float32
+                row = X[0] if len(X) == 1 else None
+                cached = None
+                if cache is not None and len(X) == 1:
+                    feature_key = cache.feature_key(live.name, version, X[0])
+                    cached = cache.features.get(feature_key)
+                if cached is not None:
+                    (label, p), cache_status = cached, "hit-features"
+                    cache.raw.put(raw_key, cached)
+                else:
+                    t0 = time.perf_counter()
+                    labels, proba = _score_matrix(live, X)
+                    label, p = labels[0], float(proba[0])
+                    timings["inference"] = time.perf_counter() - t0
+                    if cache is not None and len(X) == 1:
+                        cache.raw.put(raw_key, (label, float(proba[0])))
+                        cache.features.put(feature_key, (label, float(proba[0])))
+                        cache_status = "miss"
+
+            # cached / batched labels use the default operating point
+            risk = float(live.risk(p))
+            if policy is not None:
+                label = live.labels(np.asarray([p]), policy)[0]
 
             # Calculate response time in milliseconds
             response_time = (datetime.now() - start_time).total_seconds() * 1000
 
             result = {
                 "prediction": label,
+                "risk": round(risk, 6),
                 "response_time": round(response_time, 2)  # Round to 2 decimal places
             }
-            save_prediction(result)
+            t0 = time.perf_counter()
+            record = result | {"model": live.name, "timestamp": datetime.now().isoformat()}
+            if live.name != DEFAULT_MODEL and "model" not in request.args:
+                record["canary"] = True
+            if shadow is not None and row is not None:
+                # saved by the shadow pool once the challengers' results are attached
+                shadow.submit(live, row[None, :], [label], np.array([p]), [record])
+            else:
+                save_prediction(record)
+            timings["save_prediction"] = time.perf_counter() - t0
+
+            _observe_stages("predict", timings)
+            PREDICTION_REQUESTS.labels(model=live.name, status="success").inc()
+            return jsonify(result), 200, {"X-Cache": cache_status, "X-Model": live.name}
+        except Exception as e:
+            logger.exception("prediction failed", extra={"event": "error", "model": live.name})
+            PREDICTION_REQUESTS.labels(model=live.name, status="error").inc()
+            return jsonify({"error": str(e)}), 500
+
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Score many records at once. Body is a JSON array or NDJSON; rows are
+    validated individually, then scored in chunks of ``api.batch.chunk_size``.
+    Every scored row is saved to the prediction store (``batch: true``,
+    without a response time).
+    """
+    start_time = datetime.now()
+    try:
+        live = _resolve_model(routable=True)
+        policy = request.args.get("policy")
+        live.threshold(policy)
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    timings: Dict[str, float] = {}
+    with BATCH_LATENCY.time():
+        t0 = time.perf_counter()
+        try:
+            records, errors = _parse_batch_records()
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        timings["parse"] = time.perf_counter() - t0
+
+        max_rows = int(BATCH_CONFIG.get("max_rows", 100_000))
+        if len(records) > max_rows:
+            return jsonify({"error": f"Batch too large ({len(records)} > {max_rows} rows)"}), 413
+        BATCH_ROWS.observe(len(records))
+
+        try:
+            chunk_size = int(request.args.get("chunk_size", BATCH_CONFIG.get("chunk_size", 5000)))
+            t0 = time.perf_counter()
+            unparsed = set(errors)
+            for i, msgs in validator.validate_rows(pd.DataFrame(records)).items():
+                if i not in unparsed:
+                    errors.setdefault(i, []).extend(msgs)
+            timings["validate"] = time.perf_counter() - t0
+
+            candidates = [i for i in range(len(records)) if i not in errors]
+            results: list[Dict[str, Any]] = [{"index": i} for i in range(len(records))]
+            compiled = preprocessor.get().compiled
+            for lo in range(0, len(candidates), chunk_size):
+                rows = candidates[lo:lo + chunk_size]
+                X, ok, chunk_errors = compiled.transform_partial([records[i] for i in rows], timings)
+                for j, msgs in chunk_errors.items():
+                    errors[rows[j]] = msgs
+                if not len(ok):
+                    continue
+                t0 = time.perf_counter()
+                labels, proba = _score_matrix(live, X, policy=policy)
+                risk = live.risk(proba)
+                timings["inference"] = timings.get("inference", 0.0) + time.perf_counter() - t0
+                for j, label, p, r in zip(ok, labels, proba, risk):
+                    results[rows[j]]["prediction"] = label
+                    results[rows[j]]["probability"] = round(float(p), 6)
+                    results[rows[j]]["risk"] = round(float(r), 6)
+
+                # one record per scored row; the request's latency is not a per-row latency
+                t0 = time.perf_counter()
+                now = datetime.now().isoformat()
+                saved = [{"prediction": label, "risk": round(float(r), 6), "response_time": None,
+                          "model": live.name, "batch": True, "timestamp": now} for label, r in zip(labels, risk)]
+                if shadow is not None:
+                    # saved by the shadow pool once the challengers' results are attached
+                    shadow.submit(live, X, labels, proba, saved)
+                else:
+                    prediction_store.append_many(saved)
+                timings["save_prediction"] = timings.get("save_prediction", 0.0) + time.perf_counter() - t0
+
+            for i, msgs in errors.items():
+                results[i]["errors"] = msgs
+            valid = [r for r in results if "prediction" in r]
+
+            response_time = (datetime.now() - start_time).total_seconds() * 1000
+            _observe_stages("predict_batch", timings)
+            PREDICTION_REQUESTS.labels(model=live.name, status="success").inc(len(valid))
+            if errors:
+                PREDICTION_REQUESTS.labels(model=live.name, status="error").inc(len(errors))
+            return jsonify(
+                {
+                    "model": live.name,
+                    "results": results,
+                    "n_rows": len(records),
+                    "n_scored": len(valid),
+                    "n_errors": len(errors),
+                    "response_time": round(response_time, 2),
+                }
+            )
+        except Exception as e:
+            logger.exception("prediction failed", extra={"event": "error", "model": live.name})
+            PREDICTION_REQUESTS.labels(model=live.name, status="error").inc()
+            return jsonify({"error": str(e)}), 500
+
+
+@app.route("/explain", methods=["POST"])
+def explain():
+    """
+    Prediction for one record plus each raw field's contribution to it
+    (log-odds, tree SHAP), largest ``?top_k=`` first. ``base_value`` is the
+    model's expected log-odds; it and the contributions sum to the logit of
+    ``probability``.
+    """
+    try:
+        live, top_k = _explain_setup()
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    timings: Dict[str, float] = {}
+    with EXPLAIN_LATENCY.labels(endpoint="explain").time():
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        try:
+            results, errors = _explain_records(live, [payload], top_k, timings)
+        except Exception as e:
+            logger.exception("explanation failed", extra={"event": "error", "model": live.name})
+            return jsonify({"error": str(e)}), 500
+        if errors:
+            return jsonify({"error": "; ".join(errors[0])}), 400
+        _observe_stages("explain", timings)
+        result = results[0]
+        del result["index"]
+        return jsonify(result | {"model": live.name})
+
 
-            PREDICTION_REQUESTS.labels(model="LightGBM", status="success").inc()
-            return jsonify(result)
+@app.route("/explain/batch", methods=["POST"])
+def explain_batch():
+    """``/explain`` for a JSON array or NDJSON body, in one vectorised call per request."""
+    try:
+        live, top_k = _explain_setup()
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    timings: Dict[str, float] = {}
+    with EXPLAIN_LATENCY.labels(endpoint="explain_batch").time():
+        t0 = time.perf_counter()
+        try:
+            records, errors = _parse_batch_records()
         except Exception as e:
-            logger.exception(e)
-            PREDICTION_REQUESTS.labels(model="LightGBM", status="error").inc()
+            return jsonify({"error": str(e)}), 400
+        timings["parse"] = time.perf_counter() - t0
+
+        max_rows = int(EXPLAIN_CONFIG.get("max_rows", 10_000))
+        if len(records) > max_rows:
+            return jsonify({"error": f"Batch too large ({len(records)} > {max_rows} rows)"}), 413
+
+        try:
+            candidates = [i for i in range(len(records)) if i not in errors]
+            explained, row_errors = _explain_records(live, [records[i] for i in candidates], top_k, timings)
+            results: list[Dict[str, Any]] = [{"index": i} for i in range(len(records))]
+            for r in explained:
+                r["index"] = candidates[r["index"]]
+                results[r["index"]] = r
+            for j, msgs in row_errors.items():
+                errors[candidates[j]] = msgs
+            for i, msgs in errors.items():
+                results[i]["errors"] = msgs
+        except Exception as e:
+            logger.exception("explanation failed", extra={"event": "error", "model": live.name})
             return jsonify({"error": str(e)}), 500
 
+        _observe_stages("explain_batch", timings)
+        return jsonify(
+            {
+                "model": live.name,
+                "results": results,
+                "n_rows": len(records),
+                "n_explained": len(explained),
+                "n_errors": len(errors),
+            }
+        )
+
 
 #  NEW ▸ monitoring / analytics endpoints
 
 @app.route("/models", methods=["GET"])
 def models_list():
-    """Return list of model names for the UI tab bar."""
-    return jsonify({"models": list(METRICS_TABLE)})
+    """Return list of model names for the UI tab bar (+ what the registry can serve)."""
+    return jsonify(
+        {
+            "models": list(METRICS_TABLE),
+            "default": DEFAULT_MODEL,
+            "servable": registry.available(),
+            "resident": registry.resident(),
+        }
+    )
 
 
 @app.route("/model-info/<model_name>", methods=["GET"])
@@ -153,7 +713,10 @@ def model_info(model_name: str):
         if not os.path.exists(model_file):
             return jsonify({"error": "Model file not found"}), 404
 
-        metrics = METRICS_TABLE[model_name]
+        # the UI renders every entry of "metrics" as a percentage; CV folds,
+        # search trace and timings go under "training"
+        entry = METRICS_TABLE[model_name]
+        metrics = {k: v for k, v in entry.items() if isinstance(v, (int, float))}
 
         return jsonify(
             {
@@ -161,6 +724,8 @@ def model_info(model_name: str):
                 "type": os.path.splitext(os.path.basename(model_file))[0],
                 "version": "1.0.0",
                 "metrics": metrics,
+                "training": entry.get("training", {}),
+                "calibration": entry.get("calibration", {}),
                 "created_at": datetime.fromtimestamp(os.path.getctime(model_file)).isoformat(),
                 "last_updated": datetime.fromtimestamp(os.path.getmtime(model_file)).isoformat(),
             }
@@ -172,23 +737,68 @@ def model_info(model_name: str):
 
 @app.route("/predictions", methods=["GET"])
 def get_predictions():
-    """Return stored predictions (newest first)."""
+    """
+    Return stored predictions (newest first).
+
+    Query params: ``limit``, ``before`` / ``after`` (record-id cursors) and
+    ``start`` / ``end`` (ISO timestamps). Cursors for the neighbouring pages
+    are sent back in the ``X-Next-Before`` / ``X-Prev-After`` headers.
+    """
+    try:
+        args = request.args
+        limit = args.get("limit", type=int)
+        page = prediction_store.query(
+            limit=limit,
+            before=args.get("before", type=int),
+            after=args.get("after", type=int),
+            start=args.get("start"),
+            end=args.get("end"),
+        )
+        resp = jsonify(page)
+        if page:
+            resp.headers["X-Prev-After"] = str(page[0]["id"])
+            if limit is not None and len(page) == limit:
+                resp.headers["X-Next-Before"] = str(page[-1]["id"])
+        return resp
+    except Exception as exc:
+        logger.exception(exc)
+        return jsonify({"error": str(exc)}), 500
+
+
+@app.route("/predictions/summary", methods=["GET"])
+def predictions_summary():
+    """Pre-aggregated counts per label, latency percentiles and per-minute buckets over ``?window=`` minutes."""
     try:
-        history = load_predictions()
-        history.sort(key=lambda r: r["timestamp"], reverse=True)
-        return jsonify(history)
+        window = request.args.get("window", STORE_CONFIG.get("summary_window_minutes", 60), type=int)
+        window = min(max(window, 1), int(STORE_CONFIG.get("max_window_minutes", 1440)))
+        return jsonify(prediction_store.summary(window_minutes=window))
     except Exception as exc:
         logger.exception(exc)
         return jsonify({"error": str(exc)}), 500
 
 
+@app.route("/monitoring/drift", methods=["GET"])
+def monitoring_drift():
+    """Latest drift scores (PSI / KS per feature, PSI of predictions per model) vs the training profile."""
+    if drift_monitor is None:
+        return jsonify({"error": "Drift monitoring is disabled (monitoring.drift.enabled) or has no reference"}), 404
+    return jsonify(drift_monitor.report)
+
+
+@app.route("/monitoring/shadow", methods=["GET"])
+def monitoring_shadow():
+    """Agreement, risk deltas and latency of each challenger vs the live model (this worker process)."""
+    if shadow is None:
+        return jsonify({"error": "Shadow scoring is disabled (api.shadow.enabled)"}), 404
+    return jsonify(shadow.report() | {"canary": {"model": canary.model, "fraction": canary.fraction} if canary else None})
+
+
 @app.route("/predictions/clear", methods=["POST"])
 def clear_predictions():
     """Clear all stored predictions."""
     try:
-        if os.path.exists(PREDICTIONS_FILE):
-            os.remove(PREDICTIONS_FILE)
-            logger.info("Predictions cleared")
+        prediction_store.clear()
+        logger.info("Predictions cleared")
         return jsonify({"message": "Predictions cleared successfully"})
     except Exception as exc:
         logger.exception(exc)
@@ -197,5 +807,7 @@ def clear_predictions():
 
 
 if __name__ == "__main__":
+    # development server; use serve.py for multi-worker production serving
     os.makedirs("logs", exist_ok=True)
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host=CONFIG["api"].get("host", "0.0.0.0"), port=int(CONFIG["api"].get("port", 5000)),
+            debug=bool(CONFIG["api"].get("debug", False)))
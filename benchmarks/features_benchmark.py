@@ -0,0 +1,62 @@
+"""
+Benchmark: vectorised feature engineering (src/data/features.py) vs the
+row-wise pandas steps it replaces in DataPreprocessor. The reference
+implementations and the parity check live in src/data/feature_parity.py
+(shared with tests/test_features.py); each run re-checks parity on the edge
+cases and on the timed rows.
+
+    python -m benchmarks.features_benchmark --rows 100000 10000000
+
+The row-wise reference is only timed up to --legacy-max-rows; larger sizes
+report a linear extrapolation (marked "~").
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from src.data.feature_parity import COLUMNS, STEPS, check_parity, edge_frame
+from src.data.synthetic import make_raw_data
+
+
+# ---------------------------------------------------------------------- #
+def make_frame(n_rows: int, seed: int, chunk: int = 1_000_000) -> pd.DataFrame:
+    parts = [
+        make_raw_data(min(chunk, n_rows - lo), seed=seed + i)[COLUMNS]
+        for i, lo in enumerate(range(0, n_rows, chunk))
+    ]
+    return pd.concat(parts, ignore_index=True)
+
+
+def timed(fn, df) -> float:
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 10_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    check_parity(edge_frame())
+    print("parity: edge cases OK")
+
+    print(f"{'rows':>12} {'step':<12} {'row-wise s':>12} {'vectorised s':>13} {'speedup':>9}")
+    for n_rows in args.rows:
+        df = make_frame(n_rows, args.seed)
+        sample = df.iloc[: min(n_rows, args.legacy_max_rows)].reset_index(drop=True)
+        check_parity(sample)
+
+        for name, (legacy, fast) in STEPS.items():
+            fast_s = timed(fast, df)
+            legacy_s = timed(legacy, sample) * n_rows / len(sample)
+            approx = "~" if len(sample) < n_rows else " "
+            print(f"{n_rows:>12,} {name:<12} {approx}{legacy_s:>11.2f} {fast_s:>13.3f} {legacy_s / fast_s:>8.0f}x")
+        del df, sample
+
+
+if __name__ == "__main__":
+    main()
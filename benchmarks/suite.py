@@ -0,0 +1,351 @@
+"""
+Benchmark suite: inference latency, API throughput, preprocessing scaling
+and per-model fit time, on synthetic diabetic_data-shaped records.
+
+    python -m benchmarks.suite --out benchmarks/results/current.json
+    python -m benchmarks.suite --out current.json --baseline baseline.json   # run + compare
+    python -m benchmarks.suite --compare current.json --baseline baseline.json
+
+Everything runs in a throw-away workspace (copies of config/ and
+IDS_mapping.csv, fresh models/ and logs/), so the repo's own artefacts are
+never touched and every run starts from the same state. The prediction store
+uses the in-memory backend and the training cache is off.
+
+Results are flat ``{"<benchmark>.<metric>": value}`` JSON. Metrics ending in
+``_ms`` / ``_seconds`` are lower-is-better, ``_per_second`` higher-is-better;
+comparison exits with status 1 if any of them regressed by more than
+``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))  # the suite runs from a temporary working directory
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import yaml  # noqa: E402
+
+from src.data.compiled import CompiledTransformer  # noqa: E402
+from src.data.preprocessing import DIAG_COLS, DataPreprocessor  # noqa: E402
+from src.data.synthetic import make_raw_data  # noqa: E402
+from src.models.train import ModelTrainer  # noqa: E402
+from src.serving.registry import LoadedModel, ModelRegistry  # noqa: E402
+
+SIZES = {
+    "full": {"preprocess_rows": [1_000, 10_000, 100_000], "fit_rows": 20_000, "cv_folds": 5,
+             "single_requests": 500, "batch_sizes": [100, 1_000, 10_000], "batch_repeats": 20,
+             "api_requests": 500, "api_batch_rows": 1_000, "api_batch_repeats": 10},
+    "quick": {"preprocess_rows": [1_000, 10_000], "fit_rows": 5_000, "cv_folds": 2,
+              "single_requests": 100, "batch_sizes": [100, 1_000], "batch_repeats": 5,
+              "api_requests": 100, "api_batch_rows": 500, "api_batch_repeats": 3},
+}
+
+
+# ---------------------------------------------------------------------- #
+# Helpers
+# ---------------------------------------------------------------------- #
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def records(n: int, seed: int) -> List[Dict[str, Any]]:
+    """Scorable request payloads (no missing diagnosis / invalid gender / unseen race), target removed."""
+    raw = make_raw_data(2 * n + 100, seed=seed)
+    # race "?" becomes "Other" only when fitting; at inference it is an unseen category
+    scorable = ~raw[DIAG_COLS].eq("?").any(axis=1) & (raw["gender"] != "Unknown/Invalid") & (raw["race"] != "?")
+    return raw[scorable].head(n).drop(columns=["readmitted"]).to_dict("records")
+
+
+@contextmanager
+def workspace(cv_folds: int):
+    """Temporary cwd with the repo config (memory store, no training cache) and mapping file."""
+    root = Path(tempfile.mkdtemp(prefix="diabetes-bench-"))
+    shutil.copytree(REPO / "config", root / "config")
+    (root / "data" / "raw").mkdir(parents=True)
+    shutil.copy(REPO / "data" / "raw" / "IDS_mapping.csv", root / "data" / "raw")
+    for d in ("models", "logs"):
+        (root / d).mkdir()
+
+    cfg_path = root / "config" / "config.yaml"
+    cfg = yaml.safe_load(cfg_path.read_text())
+    cfg["model"]["cv_folds"] = cv_folds
+    cfg["model"].setdefault("training", {})["cache"] = False
+    cfg["model"].setdefault("search", {})["enabled"] = False
+    cfg["api"]["prediction_store"] = {"backend": "memory"}
+    cfg["api"].setdefault("micro_batching", {})["enabled"] = False
+    cfg_path.write_text(yaml.safe_dump(cfg, sort_keys=False))
+
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        yield cfg
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------- #
+# Benchmarks (each returns {metric: value})
+# ---------------------------------------------------------------------- #
+def bench_preprocess(rows: List[int], seed: int) -> Dict[str, float]:
+    out = {}
+    for n in rows:
+        raw = make_raw_data(n, seed=seed)
+        seconds = timed(lambda: DataPreprocessor().preprocess_data(raw))
+        out[f"preprocess.{n}.seconds"] = seconds
+        out[f"preprocess.{n}.rows_per_second"] = n / seconds
+    return out
+
+
+def bench_fit(n_rows: int, seed: int) -> Dict[str, float]:
+    """Train every configured model (CV included); leaves the artefacts in models/ for the inference benchmarks."""
+    preprocessor = DataPreprocessor()
+    X, y = preprocessor.preprocess_data(make_raw_data(n_rows, seed=seed))
+    preprocessor.save_preprocessor()
+
+    trainer = ModelTrainer()
+    start = time.perf_counter()
+    results = trainer.train_models(X, y)
+    out = {"fit.total_seconds": time.perf_counter() - start}
+    for name, metrics in results.items():
+        training = metrics.get("training", {})
+        out[f"fit.{name}.fit_seconds"] = training.get("fit_seconds", float("nan"))
+        folds = training.get("cv", {}).get("folds", [])
+        if folds:
+            out[f"fit.{name}.cv_fold_fit_seconds"] = float(np.mean([f["fit_seconds"] for f in folds]))
+    return out
+
+
+def bench_inference(model_name: str, n_single: int, batch_sizes: List[int], repeats: int, seed: int) -> Dict[str, float]:
+    preprocessor = DataPreprocessor()
+    preprocessor.load_preprocessor()
+    compiled = CompiledTransformer.from_preprocessor(preprocessor)
+    live = ModelRegistry("models").get(model_name)
+    payloads = records(max(n_single, max(batch_sizes)), seed + 1)
+
+    def pandas_path(recs):
+        return live.model.predict_proba(preprocessor.transform_new_data(pd.DataFrame(recs)))
+
+    def compiled_path(recs):
+        return live.predict_proba(compiled.transform(recs))
+
+    out = {}
+    for label, path in (("pandas", pandas_path), ("compiled", compiled_path)):
+        out[f"inference.single.{label}.cold_ms"] = timed(lambda: path([payloads[0]])) * 1000
+        stats = latency_stats([timed(lambda i=i: path([payloads[i]])) for i in range(n_single)])
+        out.update({f"inference.single.{label}.{k}": v for k, v in stats.items()})
+
+        for size in batch_sizes:
+            batch = payloads[:size]
+            seconds = [timed(lambda: path(batch)) for _ in range(repeats)]
+            stats = latency_stats(seconds)
+            out.update({f"inference.batch{size}.{label}.{k}": v for k, v in stats.items()})
+            out[f"inference.batch{size}.{label}.rows_per_second"] = size / float(np.median(seconds))
+
+    if live.forest is not None:
+        out.update(bench_trees(live, compiled.transform(payloads), n_single, batch_sizes, repeats))
+    return out
+
+
+def bench_trees(live: LoadedModel, X: np.ndarray, n_single: int, batch_sizes: List[int],
+                repeats: int) -> Dict[str, float]:
+    """Compiled forest vs the library's sklearn wrapper on the same encoded rows (model time only)."""
+    wrapper = LoadedModel(live.name, live.model, live.classes_, live.version, live.size_bytes)
+    out = {"trees.max_abs_diff": float(np.max(np.abs(live.predict_proba(X) - wrapper.predict_proba(X))))}
+    for label, scorer in (("wrapper", wrapper), ("forest", live)):
+        rows = range(min(n_single, len(X)))
+        stats = latency_stats([timed(lambda i=i: scorer.predict_proba(X[i:i + 1])) for i in rows])
+        out.update({f"trees.single.{label}.{k}": v for k, v in stats.items()})
+        for size in batch_sizes:
+            batch = X[:size]
+            seconds = [timed(lambda: scorer.predict_proba(batch)) for _ in range(repeats)]
+            out[f"trees.batch{size}.{label}.p50_ms"] = float(np.median(seconds)) * 1000
+            out[f"trees.batch{size}.{label}.rows_per_second"] = len(batch) / float(np.median(seconds))
+    return out
+
+
+def bench_api(n_requests: int, batch_rows: int, repeats: int, seed: int) -> Dict[str, float]:
+    """Flask app through its test client: import (startup) time, /predict, /predict/batch and /explain."""
+    start = time.perf_counter()
+    import app as service
+    out = {"api.import_seconds": time.perf_counter() - start}
+
+    client = service.app.test_client()
+    payloads = records(max(n_requests, batch_rows), seed + 2)
+
+    def post(path: str, body):
+        resp = client.post(path, json=body)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{path} returned {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+
+    out["api.predict.cold_ms"] = timed(lambda: post("/predict", payloads[0])) * 1000
+    start = time.perf_counter()
+    seconds = [timed(lambda i=i: post("/predict", payloads[i])) for i in range(n_requests)]
+    out["api.predict.requests_per_second"] = n_requests / (time.perf_counter() - start)
+    out.update({f"api.predict.{k}": v for k, v in latency_stats(seconds).items()})
+
+    batch = payloads[:batch_rows]
+    seconds = [timed(lambda: post("/predict/batch", batch)) for _ in range(repeats)]
+    out.update({f"api.batch{batch_rows}.{k}": v for k, v in latency_stats(seconds).items()})
+    out[f"api.batch{batch_rows}.rows_per_second"] = batch_rows / float(np.median(seconds))
+
+    if service.registry.get(service.DEFAULT_MODEL).explainable:
+        seconds = [timed(lambda i=i: post("/explain", payloads[i])) for i in range(n_requests)]
+        out.update({f"api.explain.{k}": v for k, v in latency_stats(seconds).items()})
+        seconds = []
+        for _ in range(repeats):
+            if service.explanation_cache is not None:
+                service.explanation_cache.clear()  # time the contributions, not the cache
+            seconds.append(timed(lambda: post("/explain/batch", batch)))
+        out[f"api.explain_batch{batch_rows}.rows_per_second"] = batch_rows / float(np.median(seconds))
+
+    service.prediction_store.close()
+    return out
+
+
+# ---------------------------------------------------------------------- #
+# Run / compare
+# ---------------------------------------------------------------------- #
+def _versions() -> Dict[str, str]:
+    versions = {"python": platform.python_version()}
+    for module in ("numpy", "pandas", "sklearn", "lightgbm", "xgboost"):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = "n/a"
+    return versions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_suite(size: str, seed: int, only: List[str]) -> Dict[str, Any]:
+    params = SIZES[size]
+    metrics: Dict[str, float] = {}
+    with workspace(params["cv_folds"]) as cfg:
+        default_model = cfg["api"].get("models", {}).get("default", "lightgbm")
+        steps = {
+            "preprocess": lambda: bench_preprocess(params["preprocess_rows"], seed),
+            "fit": lambda: bench_fit(params["fit_rows"], seed),
+            "inference": lambda: bench_inference(default_model, params["single_requests"], params["batch_sizes"],
+                                                 params["batch_repeats"], seed),
+            "api": lambda: bench_api(params["api_requests"], params["api_batch_rows"],
+                                     params["api_batch_repeats"], seed),
+        }
+        for name, step in steps.items():
+            # inference and api need the artefacts trained by "fit"
+            if only and name not in only and not (name == "fit" and {"inference", "api"} & set(only)):
+                continue
+            print(f"[{name}] ...", flush=True)
+            metrics.update(step())
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "versions": _versions(),
+            "size": size,
+            "params": params,
+            "seed": seed,
+        },
+        "metrics": metrics,
+    }
+
+
+def _direction(metric: str) -> int:
+    """+1 higher is better, -1 lower is better, 0 not compared."""
+    if metric.endswith("_per_second"):
+        return 1
+    if metric.endswith("_ms") or metric.endswith("_seconds"):
+        return -1
+    return 0
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print current vs baseline for every shared metric; returns the regressed metric names."""
+    regressions = []
+    cur, base = current["metrics"], baseline["metrics"]
+    print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric in sorted(set(cur) & set(base)):
+        direction = _direction(metric)
+        b, c = base[metric], cur[metric]
+        if not direction or not b or b != b or c != c:
+            continue
+        change = (c - b) / b
+        worse = -direction * change > tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"{metric:<48} {b:>12.4g} {c:>12.4g} {change:>+7.1%}{flag}")
+        if worse:
+            regressions.append(metric)
+    for metric in sorted(set(base) - set(cur)):
+        print(f"{metric:<48} missing from the current run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--size", choices=sorted(SIZES), default="full")
+    parser.add_argument("--only", nargs="+", choices=["preprocess", "fit", "inference", "api"], default=[])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--compare", help="compare this results JSON (instead of running)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    args = parser.parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare needs --baseline")
+        with open(args.compare) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args.size, args.seed, args.only)
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"Results → {args.out}")
+        else:
+            print(json.dumps(current["metrics"], indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
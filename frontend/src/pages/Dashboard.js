@@ -45,6 +45,7 @@ const Dashboard = () => {
   const [modelInfo, setModelInfo] = useState(null);
   const [health, setHealth] = useState(null);
   const [predictions, setPredictions] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [clearDialogOpen, setClearDialogOpen] = useState(false);
   const [clearing, setClearing] = useState(false);
 
@@ -55,12 +56,16 @@ const Dashboard = () => {
         const modelResponse = await axios.get('http://localhost:5000/model-info/lightgbm');
         setModelInfo(modelResponse.data);
 
-        // Fetch health status
-        const healthResponse = await axios.get('http://localhost:5000/health');
+        // Fetch health status (503 with status "starting" until the API has warmed up)
+        const healthResponse = await axios.get('http://localhost:5000/health', {
+          validateStatus: (status) => status === 200 || status === 503,
+        });
         setHealth(healthResponse.data);
 
-        // Fetch prediction history
-        const predictionsResponse = await axios.get('http://localhost:5000/predictions');
+        // Fetch server-side aggregates + the latest page of predictions
+        const summaryResponse = await axios.get('http://localhost:5000/predictions/summary');
+        setSummary(summaryResponse.data);
+        const predictionsResponse = await axios.get('http://localhost:5000/predictions?limit=10');
         setPredictions(predictionsResponse.data);
 
         setLoading(false);
@@ -76,28 +81,22 @@ const Dashboard = () => {
     return () => clearInterval(interval);
   }, []);
 
-  // Calculate prediction distribution from real data
-  const predictionDistribution = predictions.reduce((acc, pred) => {
-    const key = pred.prediction;
-    acc[key] = (acc[key] || 0) + 1;
-    return acc;
-  }, {});
-
-  const distributionData = Object.entries(predictionDistribution).map(([name, value]) => ({
+  // Prediction distribution and response time come pre-aggregated from the API
+  const distributionData = Object.entries(summary?.by_label || {}).map(([name, value]) => ({
     name,
     value,
   }));
 
-  // Calculate average response time from predictions
-  const avgResponseTime = predictions.length > 0
-    ? predictions.reduce((sum, pred) => sum + (pred.response_time || 0), 0) / predictions.length
-    : 0;
+  const statusColor = { healthy: 'success', starting: 'warning' }[health?.status] || 'error';
+  const totalPredictions = summary?.all_time_total ?? summary?.total ?? 0;
+  const avgResponseTime = summary?.response_time?.mean || 0;
 
   const handleClearPredictions = async () => {
     try {
       setClearing(true);
       await axios.post('http://localhost:5000/predictions/clear');
       setPredictions([]);
+      setSummary(null);
       setClearDialogOpen(false);
     } catch (err) {
       setError('Error clearing predictions. Please try again.');
@@ -142,7 +141,7 @@ const Dashboard = () => {
               <Box sx={{ display: 'flex', alignItems: 'center', mb: 1 }}>
                 <Chip
                   label={health?.status || 'Unknown'}
-                  color={health?.status === 'healthy' ? 'success' : 'error'}
+                  color={statusColor}
                   size="small"
                   sx={{ mr: 1 }}
                 />
@@ -151,7 +150,7 @@ const Dashboard = () => {
               <LinearProgress
                 variant="determinate"
                 value={health?.status === 'healthy' ? 100 : 0}
-                color={health?.status === 'healthy' ? 'success' : 'error'}
+                color={statusColor}
               />
             </CardContent>
           </Card>
@@ -178,7 +177,7 @@ const Dashboard = () => {
           <Card>
             <CardContent>
               <Typography color="textSecondary" gutterBottom>Total Predictions</Typography>
-              <Typography variant="h4">{predictions.length}</Typography>
+              <Typography variant="h4">{totalPredictions}</Typography>
             </CardContent>
           </Card>
         </Grid>
@@ -0,0 +1,174 @@
+"""
+Offline bulk scoring: raw encounters (CSV / Parquet) → predictions (Parquet),
+without going through the HTTP API.
+
+    python score.py data/raw/diabetic_data.csv predictions.parquet --model lightgbm --workers 8
+
+The input is read in chunks; each chunk is encoded with the compiled
+transformer (same output as ``DataPreprocessor.transform_new_data``) and
+scored in a process pool whose workers load the preprocessor and model once.
+Results are written in input order, one row per input row: ``row``, any id
+columns, ``prediction``, ``probability``, ``risk`` (calibrated, see
+src/models/calibration.py) and ``error`` (set, with the scores left empty,
+for rows that could not be scored).
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from threadpoolctl import threadpool_limits
+
+from src.data.compiled import CompiledTransformer
+from src.data.ingestion import ID_COLUMNS, _csv_dtypes
+from src.data.preprocessing import load_config
+from src.serving.registry import ModelRegistry
+
+RESULT_FIELDS = [
+    ("prediction", pa.string()),
+    ("probability", pa.float64()),
+    ("risk", pa.float64()),
+    ("error", pa.string()),
+]
+
+# ---------------------------------------------------------------------- #
+# Worker side: artefacts are loaded once per process
+# ---------------------------------------------------------------------- #
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(model_name: str, model_dir: str, threads: int):
+    threadpool_limits(limits=threads)
+    _WORKER["compiled"] = CompiledTransformer.from_artifacts(os.path.join(model_dir, "preprocessor.joblib"))
+    _WORKER["model"] = ModelRegistry(model_dir).get(model_name)
+
+
+def _score_chunk(offset: int, frame: pd.DataFrame) -> pd.DataFrame:
+    n = len(frame)
+    X, ok, errors = _WORKER["compiled"].transform_partial(frame)
+
+    prediction = np.full(n, None, dtype=object)
+    probability = np.full(n, np.nan)
+    risk = np.full(n, np.nan)
+    if len(ok):
+        live = _WORKER["model"]
+        proba = live.predict_proba(X)
+        prediction[ok] = live.labels(proba)
+        probability[ok] = proba
+        risk[ok] = live.risk(proba)
+
+    out = pd.DataFrame({"row": np.arange(offset, offset + n, dtype=np.int64)})
+    for c in ID_COLUMNS:
+        if c in frame.columns:
+            out[c] = frame[c].to_numpy()
+    out["prediction"] = prediction
+    out["probability"] = probability
+    out["risk"] = risk
+    out["error"] = [("; ".join(errors[i]) if i in errors else None) for i in range(n)]
+    return out
+
+
+# ---------------------------------------------------------------------- #
+# Driver
+# ---------------------------------------------------------------------- #
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if path.endswith(".parquet"):
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        dtypes = _csv_dtypes(pd.read_csv(path, nrows=0).columns)
+        yield from pd.read_csv(path, dtype=dtypes, chunksize=chunk_size)
+
+
+def _schema(first: pd.DataFrame) -> pa.Schema:
+    # id columns keep the input's types (Parquet ids may be nullable, float or string)
+    ids = pa.Schema.from_pandas(first[[c for c in ID_COLUMNS if c in first.columns]], preserve_index=False)
+    fields = [(f.name, pa.int64() if pa.types.is_null(f.type) else f.type) for f in ids]
+    return pa.schema([("row", pa.int64())] + fields + RESULT_FIELDS)
+
+
+def score_file(input_path: str, output_path: str, model_name: str, model_dir: str = "models",
+               chunk_size: int = 50_000, workers: int = 0) -> Dict[str, Any]:
+    """Score ``input_path`` into ``output_path``; returns row counts and throughput."""
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    init_args = (model_name, model_dir, threads)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args)
+    else:
+        _init_worker(*init_args)
+
+    tmp_path = f"{output_path}.tmp"
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    writer, schema = None, None
+    n_rows = n_errors = 0
+    start = time.perf_counter()
+
+    def write(result: pd.DataFrame):
+        nonlocal writer, schema, n_rows, n_errors
+        if writer is None:
+            schema = _schema(result)
+            writer = pq.ParquetWriter(tmp_path, schema)
+        writer.write_table(pa.Table.from_pandas(result, schema=schema, preserve_index=False))
+        n_rows += len(result)
+        n_errors += int(result["error"].notna().sum())
+        elapsed = time.perf_counter() - start
+        print(f"  scored {n_rows:,} rows ({n_errors:,} errors) – {n_rows / max(elapsed, 1e-9):,.0f} rows/s")
+
+    try:
+        # keep a bounded number of chunks in flight and write them back in input order
+        pending: deque = deque()
+        offset = 0
+        for frame in read_chunks(input_path, chunk_size):
+            if frame.empty:  # a header-only CSV still yields one chunk
+                continue
+            if pool is None:
+                write(_score_chunk(offset, frame))
+            else:
+                pending.append(pool.submit(_score_chunk, offset, frame))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            offset += len(frame)
+        while pending:
+            write(pending.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"No rows in {input_path}")
+    os.replace(tmp_path, output_path)
+    elapsed = time.perf_counter() - start
+    return {"rows": n_rows, "errors": n_errors, "seconds": round(elapsed, 3),
+            "rows_per_second": round(n_rows / max(elapsed, 1e-9), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or Parquet file of raw encounters")
+    parser.add_argument("output", help="Parquet file to write")
+    parser.add_argument("--model", default=None, help="model name (default: api.models.default)")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (0 = all cores)")
+    args = parser.parse_args()
+
+    model = args.model or load_config()["api"].get("models", {}).get("default", "lightgbm")
+    print(f"Scoring {args.input} with '{model}'...")
+    summary = score_file(args.input, args.output, model, args.model_dir, args.chunk_size, args.workers)
+    print(f"Wrote {summary['rows']:,} rows → {args.output} "
+          f"({summary['errors']:,} unscorable, {summary['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Production entry point: the Flask app behind a pre-forking gunicorn master.
+
+    python serve.py                 # api.host / api.port / api.server from config.yaml
+    python serve.py --workers 8
+
+The master imports app.py once (config, compiled preprocessor, default
+model), then forks the workers, which share those pages copy-on-write. Each
+worker warms up on its own before ``/health`` reports ready.
+
+    kill -HUP  <master pid>   # graceful restart: new workers, old ones finish in-flight requests
+    kill -TERM <master pid>   # graceful shutdown (api.server.graceful_timeout)
+
+Prometheus metrics are collected in multiprocess mode (one file per worker
+under ``PROMETHEUS_MULTIPROC_DIR``), so ``/metrics`` on any worker reports
+totals across all of them.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from src.data.preprocessing import load_config
+
+# OpenMP / BLAS threads per worker, set by main() before the fork
+_THREADS_PER_WORKER = 1
+
+
+def _prepare_environment(metrics_dir: str):
+    # must happen before prometheus_client is imported anywhere
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    # warm up in the workers, not the master (see post_fork)
+    os.environ["API_DEFER_WARMUP"] = "1"
+
+
+def _post_fork(server, worker):
+    from threadpoolctl import threadpool_limits
+
+    import app as service
+
+    # the master ran no multi-threaded OpenMP region (see load), so the
+    # workers can size their own pools: cores split evenly between them
+    threadpool_limits(limits=_THREADS_PER_WORKER)
+    service.finish_startup()
+
+
+def _child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def build_options(config: dict, workers: int = 0) -> dict:
+    api = config["api"]
+    cfg = api.get("server", {})
+    workers = workers or int(cfg.get("workers", 0)) or (os.cpu_count() or 1)
+    return {
+        "bind": f"{api.get('host', '0.0.0.0')}:{api.get('port', 5000)}",
+        "workers": workers,
+        "threads": int(cfg.get("threads", 4)),
+        "worker_class": "gthread",
+        "timeout": int(cfg.get("timeout", 30)),
+        "graceful_timeout": int(cfg.get("graceful_timeout", 30)),
+        "keepalive": int(cfg.get("keepalive", 5)),
+        "max_requests": int(cfg.get("max_requests", 0)),
+        "max_requests_jitter": int(cfg.get("max_requests_jitter", 0)),
+        "preload_app": True,
+        "post_fork": _post_fork,
+        "child_exit": _child_exit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: api.server.workers, 0 = all cores)")
+    args = parser.parse_args()
+
+    config = load_config()
+    metrics_dir = config["api"].get("server", {}).get("metrics_dir") or os.path.join(
+        tempfile.gettempdir(), "diabetes-api-metrics")
+    _prepare_environment(metrics_dir)
+
+    from gunicorn.app.base import BaseApplication
+
+    global _THREADS_PER_WORKER
+    options = build_options(config, args.workers)
+    _THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // options["workers"])
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from threadpoolctl import threadpool_limits
+
+            # OpenMP thread pools do not survive fork(): keep the master single-threaded
+            with threadpool_limits(limits=1):
+                import app as service
+            return service.app
+
+    Server().run()
+
+
+if __name__ == "__main__":
+    main()
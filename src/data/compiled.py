@@ -0,0 +1,431 @@
+"""
+Compiled inference transformer – the fast path for ``transform_new_data``.
+
+The fitted encoders of a ``DataPreprocessor`` are flattened into plain
+lookup tables (label indices, one-hot positions, binary-code rows) so raw
+request dicts can be written straight into a preallocated float32 matrix in
+``feature_names_`` order, without building or copying DataFrames.
+
+The output is bit-for-bit identical to
+``preprocessor.transform_new_data(pd.DataFrame(records)).to_numpy(np.float32)``
+including the rows the pandas path drops and the errors it raises.
+"""
+import json
+import logging
+import math
+import os
+from numbers import Number
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.preprocessing import DIAG_COLS, DRUG_COLS, DataPreprocessor, compiled_path
+from src.data.timing import Stopwatch
+from src.models.bundle import pack_values, read_bundle, unpack_values, write_bundle
+
+logger = logging.getLogger("data_pipeline")
+
+# columns transform_new_data drops before encoding
+_DROPPED_INPUTS = ["weight", "max_glu_serum", "A1Cresult", "medical_specialty", "payer_code",
+                   "encounter_id", "patient_nbr"]
+
+
+def _is_missing(v: Any) -> bool:
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+def _to_number(v: Any) -> float:
+    """Scalar equivalent of ``pd.to_numeric`` for one cell."""
+    if _is_missing(v):
+        return np.nan
+    if isinstance(v, (Number, np.number, bool, np.bool_)):
+        return float(v)
+    if isinstance(v, str):
+        s = v.strip()
+        if s == "":
+            return np.nan
+        if "_" not in s and s.lstrip("+-").lower() not in ("nan", "none"):
+            try:
+                return float(s)
+            except ValueError:
+                pass
+    raise ValueError(f'Unable to parse string "{v}"')
+
+
+class CompiledTransformer:
+    """Lookup-table version of ``DataPreprocessor.transform_new_data``."""
+
+    def __init__(self, state: Dict[str, Any]):
+        self.feature_names_: List[str] = list(state["feature_names"])
+        self.id_mappings: Dict[str, Dict[int, str]] = state["id_mappings"]
+        self.label_tables: Dict[str, Dict[Any, int]] = state["label_tables"]
+        self.onehot_tables: Dict[str, Dict[str, int]] = state["onehot_tables"]
+        self.binary_tables: Dict[str, Tuple[List[int], Dict[Any, List[float]], List[float]]] = state["binary_tables"]
+        self.count_index: Dict[str, int] = state["count_index"]
+        self.numeric_index: Dict[str, int] = state["numeric_index"]
+        self.input_columns = set(state["input_columns"])
+        self.check_dim: bool = state["check_dim"]
+        self.example_record: Optional[Dict[str, Any]] = state.get("example_record")
+        # (mtime_ns, size) of the artefact this was loaded from, set by ``from_artifacts``
+        self.version: Tuple[int, ...] = ()
+
+        self.n_features = len(self.feature_names_)
+        self._binary_rows = {
+            c: (
+                np.asarray(cols, dtype=np.intp),
+                {k: np.asarray(v, dtype=np.float32) for k, v in table.items()},
+                np.asarray(missing, dtype=np.float32),
+            )
+            for c, (cols, table, missing) in self.binary_tables.items()
+        }
+
+    # ------------------------------------------------------------------ #
+    # Build / persist
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def from_preprocessor(cls, pre: DataPreprocessor) -> "CompiledTransformer":
+        """Flatten the fitted encoders of ``pre`` (as saved by ``save_preprocessor``)."""
+        if not pre.feature_names_:
+            raise RuntimeError("Preprocessor not fitted / loaded.")
+        if not pre.id_mappings:
+            pre._load_id_mappings()
+
+        index = {name: i for i, name in enumerate(pre.feature_names_)}
+        target = pre.config["features"]["target_column"]
+
+        label_tables = {
+            c: {cls_: i for i, cls_ in enumerate(le.classes_.tolist())}
+            for c, le in pre.label_encoders.items()
+        }
+        onehot_tables = {
+            c: {col[len(c) + 1:]: index.get(col, -1) for col in pre.onehot_columns if col.startswith(f"{c}_")}
+            for c in pre.onehot_encode_features
+        }
+
+        binary_tables = {}
+        if pre.binary_encoder is not None:
+            be = pre.binary_encoder
+            for m_ord, m_bin in zip(be.ordinal_encoder.mapping, be.mapping):
+                c = m_ord["col"]
+                vocab = [v for v in m_ord["mapping"].index if not _is_missing(v)]
+                # probe the fitted encoder itself so unknown / missing codes match exactly
+                probe = pd.DataFrame(0, index=range(len(vocab) + 2), columns=pre.onehot_columns)
+                probe[c] = vocab + [np.nan, "__unseen__"]
+                out_cols = m_bin["mapping"].columns.tolist()
+                coded = be.transform(probe)[out_cols].to_numpy(dtype=np.float32)
+                table = {v: coded[i].tolist() for i, v in enumerate(vocab)}
+                if coded[-1].any():
+                    raise RuntimeError(f"Binary encoder for '{c}' does not map unseen values to zeros")
+                binary_tables[c] = ([index[col] for col in out_cols], table, coded[-2].tolist())
+
+        counts = [col for col in pre.onehot_columns if col.startswith("count_")]
+        encoded = set(label_tables) | set(onehot_tables) | set(binary_tables) | set(counts)
+        numeric_index = {
+            col: index[col] for col in pre.onehot_columns
+            if col not in encoded and col != target and col in index
+            and not any(col.startswith(f"{c}_") for c in onehot_tables)
+        }
+
+        state = {
+            "feature_names": pre.feature_names_,
+            "id_mappings": pre.id_mappings,
+            "label_tables": label_tables,
+            "onehot_tables": onehot_tables,
+            "binary_tables": binary_tables,
+            "count_index": {col[len("count_"):]: index[col] for col in counts},
+            "numeric_index": numeric_index,
+            "input_columns": (
+                list(pre.onehot_columns) + list(pre.onehot_encode_features) + DRUG_COLS + _DROPPED_INPUTS
+            ),
+            "check_dim": pre.binary_encoder is not None,
+            "example_record": pre.example_record_,
+        }
+        logger.info(f"Compiled transformer built ({len(pre.feature_names_)} features)")
+        return cls(state)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Plain-python state (no pandas / sklearn objects) for persistence."""
+        return {
+            "feature_names": self.feature_names_,
+            "id_mappings": self.id_mappings,
+            "label_tables": self.label_tables,
+            "onehot_tables": self.onehot_tables,
+            "binary_tables": self.binary_tables,
+            "count_index": self.count_index,
+            "numeric_index": self.numeric_index,
+            "input_columns": sorted(self.input_columns),
+            "check_dim": self.check_dim,
+            "example_record": self.example_record,
+        }
+
+    def save_bundle(self, path: str):
+        """
+        Write the tables as a memory-mappable bundle: vocabularies as flat
+        arrays (in code / column order), binary codes as one float32 matrix
+        per column, feature order and the small scalars in the header.
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        for c, mapping in self.id_mappings.items():
+            arrays[f"id/{c}/keys"] = np.asarray(list(mapping), dtype=np.int64)
+            arrays[f"id/{c}/values"] = pack_values(list(mapping.values()))
+        for c, table in self.label_tables.items():
+            arrays[f"label/{c}"] = pack_values(sorted(table, key=table.get))
+        for c, table in self.onehot_tables.items():
+            arrays[f"onehot/{c}/values"] = pack_values(list(table))
+            arrays[f"onehot/{c}/index"] = np.asarray(list(table.values()), dtype=np.int64)
+        for c, (cols, table, missing) in self.binary_tables.items():
+            arrays[f"binary/{c}/cols"] = np.asarray(cols, dtype=np.int64)
+            arrays[f"binary/{c}/values"] = pack_values(list(table))
+            arrays[f"binary/{c}/codes"] = np.asarray(list(table.values()), dtype=np.float32).reshape(len(table), len(cols))
+            arrays[f"binary/{c}/missing"] = np.asarray(missing, dtype=np.float32)
+
+        meta = {k: v for k, v in self.to_state().items()
+                if k not in ("id_mappings", "label_tables", "onehot_tables", "binary_tables")}
+        meta["columns"] = {
+            "id": list(self.id_mappings), "label": list(self.label_tables),
+            "onehot": list(self.onehot_tables), "binary": list(self.binary_tables),
+        }
+        write_bundle(path, "preprocessor/compiled", meta, arrays)
+
+    @classmethod
+    def load(cls, path: str, verify: bool = True) -> "CompiledTransformer":
+        """Rebuild from ``save_bundle`` output; binary code rows stay views into the mapping."""
+        _, meta, arrays = read_bundle(path, verify)
+        columns = meta.pop("columns")
+        state = dict(meta)
+        state["id_mappings"] = {
+            c: dict(zip(arrays[f"id/{c}/keys"].tolist(), unpack_values(arrays[f"id/{c}/values"])))
+            for c in columns["id"]
+        }
+        state["label_tables"] = {
+            c: {v: i for i, v in enumerate(unpack_values(arrays[f"label/{c}"]))} for c in columns["label"]
+        }
+        state["onehot_tables"] = {
+            c: dict(zip(unpack_values(arrays[f"onehot/{c}/values"]), arrays[f"onehot/{c}/index"].tolist()))
+            for c in columns["onehot"]
+        }
+        state["binary_tables"] = {
+            c: (
+                arrays[f"binary/{c}/cols"].tolist(),
+                dict(zip(unpack_values(arrays[f"binary/{c}/values"]), arrays[f"binary/{c}/codes"])),
+                arrays[f"binary/{c}/missing"],
+            )
+            for c in columns["binary"]
+        }
+        return cls(state)
+
+    @classmethod
+    def from_artifacts(cls, preprocessor_path: str = "models/preprocessor.joblib") -> "CompiledTransformer":
+        """
+        The compiled tables saved next to ``preprocessor_path`` – no sklearn /
+        category_encoders unpickling – or, for artefacts saved before those
+        existed, a fresh compile of the preprocessor itself.
+        """
+        tables = compiled_path(preprocessor_path)
+        if os.path.exists(tables) and os.path.getmtime(tables) >= os.path.getmtime(preprocessor_path):
+            compiled = cls.load(tables)
+            st = os.stat(tables)
+        else:
+            logger.warning(f"{tables} missing or stale – compiling from {preprocessor_path}")
+            pre = DataPreprocessor()
+            pre.load_preprocessor(preprocessor_path)
+            compiled = cls.from_preprocessor(pre)
+            st = os.stat(preprocessor_path)
+        compiled.version = (st.st_mtime_ns, st.st_size)
+        return compiled
+
+    # ------------------------------------------------------------------ #
+    # Transform
+    # ------------------------------------------------------------------ #
+    def transform(self, records: Mapping | Sequence[Mapping] | pd.DataFrame,
+                  timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Same rows, order and values as ``transform_new_data``: rows with a
+        missing diagnosis or ``Unknown/Invalid`` gender are dropped, and the
+        first invalid row raises the error the pandas path would raise.
+        ``timings`` (optional) collects seconds per stage.
+        """
+        X, _, _ = self._transform(self._as_records(records), strict=True, timings=timings)
+        return X
+
+    def transform_partial(
+        self, records: Mapping | Sequence[Mapping] | pd.DataFrame, timings: Optional[Dict[str, float]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[int, List[str]]]:
+        """
+        Per-row variant for batch scoring: returns the matrix of rows that
+        could be encoded, their positions in ``records`` and
+        {position: [problems]} for every row that was dropped or failed.
+        """
+        return self._transform(self._as_records(records), strict=False, timings=timings)
+
+    @staticmethod
+    def canonical(record: Mapping) -> bytes:
+        """Key-order-independent JSON of ``record`` without the inputs the encoding ignores."""
+        kept = {k: v for k, v in record.items() if k not in _DROPPED_INPUTS}
+        return json.dumps(kept, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+    @staticmethod
+    def _as_records(records) -> List[Mapping]:
+        if isinstance(records, pd.DataFrame):
+            return records.to_dict("records")
+        if isinstance(records, Mapping):
+            return [records]
+        return list(records)
+
+    def _transform(self, records: List[Mapping], strict: bool, timings: Optional[Dict[str, float]] = None):
+        watch = Stopwatch(timings)
+        n = len(records)
+        present = set().union(*(r.keys() for r in records)) if records else set()
+        errors: Dict[int, List[str]] = {}
+
+        def fail(i: int, exc: Exception):
+            if strict:
+                raise exc
+            errors.setdefault(i, []).append(str(exc))
+
+        def column(c: str, default: Any = 0) -> List[Any]:
+            # a column missing from every record is filled like the pandas path;
+            # a key missing from only some records is NaN there
+            if c not in present:
+                return [default] * n
+            return [r.get(c) for r in records]
+
+        # ---- rows the pandas path silently drops
+        keep = np.ones(n, dtype=bool)
+        for c in DIAG_COLS:
+            if c in present:
+                for i, v in enumerate(column(c)):
+                    if _is_missing(v) or v == "?":
+                        keep[i] = False
+                        if not strict:
+                            errors.setdefault(i, []).append(f"missing diagnosis code '{c}'")
+        if "gender" in present:
+            for i, v in enumerate(column("gender")):
+                if v == "Unknown/Invalid":
+                    keep[i] = False
+                    if not strict:
+                        errors.setdefault(i, []).append("gender is 'Unknown/Invalid'")
+        if "age" not in present:
+            raise KeyError("age")
+        for c in self.onehot_tables:
+            if c not in present:
+                raise KeyError(f"None of [Index(['{c}'], dtype='object')] are in the [columns]")
+
+        rows = np.flatnonzero(keep)
+        watch.lap("row_filters")
+        if strict and not len(rows) and self.check_dim:
+            # the pandas path ends up with the raw drug columns and fails in the binary encoder
+            raise ValueError("No rows left to encode (missing diagnosis code or 'Unknown/Invalid' gender)")
+        X = np.zeros((n, self.n_features), dtype=np.float32)
+
+        extra = present - self.input_columns
+        if extra and self.check_dim and len(rows):
+            for i in rows:
+                fail(int(i), ValueError(f"Unexpected input field(s): {sorted(extra)}"))
+
+        # ---- drug counts
+        for c in DRUG_COLS:
+            vals = column(c, "No")
+            for i in rows:
+                v = vals[i]
+                if _is_missing(v):
+                    continue
+                j = self.count_index.get(f"{v}")
+                if j is not None:
+                    X[i, j] += 1
+                elif self.check_dim:
+                    fail(int(i), ValueError(f"Unexpected input value '{v}' for '{c}'"))
+        watch.lap("drug_counts")
+
+        # ---- per-column encoders
+        for c, j in self.numeric_index.items():
+            vals = column(c)
+            mapping = self.id_mappings.get(c)
+            for i in rows:
+                v = vals[i]
+                if mapping is not None and c in present:
+                    v = mapping.get(v) if not _is_missing(v) else None
+                if c == "age":
+                    v = DataPreprocessor._convert_age_bin_to_mean(v)
+                try:
+                    X[i, j] = _to_number(v)
+                except ValueError as exc:
+                    fail(int(i), ValueError(f"{exc} for '{c}'"))
+        watch.lap("id_mappings_numeric")
+
+        for c, table in self.label_tables.items():
+            if c not in present:
+                continue
+            vals = self._prepared(c, column(c), rows)
+            j = self.feature_names_.index(c)
+            for i in rows:
+                code = table.get(vals[i]) if not _is_missing(vals[i]) else None
+                if code is None:
+                    fail(int(i), ValueError(f"y contains previously unseen labels: ['{vals[i]}']"))
+                else:
+                    X[i, j] = code
+        watch.lap("label_encoders")
+
+        for c, table in self.onehot_tables.items():
+            vals = self._prepared(c, column(c), rows)
+            for i in rows:
+                v = vals[i]
+                if _is_missing(v):
+                    continue
+                j = table.get(f"{v}")
+                if j is None:
+                    if self.check_dim:
+                        fail(int(i), ValueError(f"Unexpected input value '{v}' for '{c}'"))
+                elif j >= 0:
+                    X[i, j] = 1
+        watch.lap("onehot")
+
+        for c, (cols, table, missing) in self._binary_rows.items():
+            if c not in present:
+                continue
+            vals = self._prepared(c, column(c), rows)
+            for i in rows:
+                code = missing if _is_missing(vals[i]) else table.get(vals[i])
+                if code is not None:
+                    X[i, cols] = code
+        watch.lap("binary_encoder")
+
+        if strict:
+            return X[rows], rows, errors
+        ok = np.array([i for i in rows if i not in errors], dtype=np.intp)
+        return X[ok], ok, errors
+
+    def _prepared(self, c: str, vals: List[Any], rows: np.ndarray) -> List[Any]:
+        """Apply the id-mapping / age / ICD-9 step that precedes encoding."""
+        out = list(vals)
+        mapping = self.id_mappings.get(c)
+        for i in rows:
+            v = out[i]
+            if mapping is not None:
+                v = mapping.get(v) if not _is_missing(v) else None
+            if c == "age":
+                v = DataPreprocessor._convert_age_bin_to_mean(v)
+            elif c in DIAG_COLS:
+                v = DataPreprocessor._map_icd9_to_category(v)
+            out[i] = v
+        return out
+
+
+def assert_equivalent(pre: DataPreprocessor, compiled: CompiledTransformer, records: Sequence[Mapping]):
+    """
+    Check the compiled path against ``transform_new_data`` on ``records``
+    (bit-for-bit, NaNs in the same cells). Raises AssertionError otherwise.
+    """
+    expected = pre.transform_new_data(pd.DataFrame(list(records)))
+    expected = expected[pre.feature_names_].apply(pd.to_numeric, errors="ignore").to_numpy(dtype=np.float32)
+    got = compiled.transform(records)
+    if expected.shape != got.shape:
+        raise AssertionError(f"Shape mismatch: pandas {expected.shape} vs compiled {got.shape}")
+    same = (expected == got) | (np.isnan(expected) & np.isnan(got))
+    if not same.all():
+        r, c = np.argwhere(~same)[0]
+        raise AssertionError(
+            f"Mismatch at row {r}, feature '{pre.feature_names_[c]}': "
+            f"pandas {expected[r, c]!r} vs compiled {got[r, c]!r}"
+        )
@@ -0,0 +1,73 @@
+"""
+Row-wise reference implementations of the feature steps that
+src/data/features.py vectorised, and the parity check between the two.
+
+Shared by tests/test_features.py and benchmarks/features_benchmark.py;
+``edge_frame`` holds the malformed values (``?``, gap codes, non-string
+diagnoses, broken age bins) both of them re-check.
+"""
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.data.features import age_bin_means, drug_status_counts, icd9_categories
+from src.data.preprocessing import DIAG_COLS, DRUG_COLS, DataPreprocessor
+from src.data.synthetic import make_raw_data
+
+COLUMNS = DRUG_COLS + DIAG_COLS + ["age"]
+
+EDGE_DIAG = ["?", np.nan, "V45", "E800", "139", "139.5", "140", "0.5", "1", "999", "999.5", "1000",
+             "abc", " 250 ", "nan", "inf", "-5", 250.0, 401, "V", ""]
+EDGE_AGE = ["[0-10)", "[90-100)", "?", np.nan, "", "70-80", "[x-10)", 5]
+
+
+# ---------------------------------------------------------------------- #
+# Reference (pre-vectorisation) implementations
+# ---------------------------------------------------------------------- #
+def legacy_counts(df: pd.DataFrame) -> pd.DataFrame:
+    return df[DRUG_COLS].apply(lambda r: r.value_counts(), axis=1).fillna(0).astype(int).add_prefix("count_")
+
+
+def legacy_diag(s: pd.Series) -> pd.Series:
+    return s.apply(DataPreprocessor._map_icd9_to_category)
+
+
+def legacy_age(s: pd.Series) -> pd.Series:
+    return s.apply(DataPreprocessor._convert_age_bin_to_mean)
+
+
+# step name → (row-wise reference, vectorised step)
+STEPS = {
+    "drug counts": (legacy_counts, lambda df: drug_status_counts(df, DRUG_COLS)),
+    "icd9 x3": (
+        lambda df: [legacy_diag(df[c]) for c in DIAG_COLS],
+        lambda df: [icd9_categories(df[c]) for c in DIAG_COLS],
+    ),
+    "age bins": (lambda df: legacy_age(df["age"]), lambda df: age_bin_means(df["age"])),
+}
+
+
+def edge_frame() -> pd.DataFrame:
+    """``COLUMNS`` of a few synthetic rows overwritten with every edge value."""
+    n = len(EDGE_DIAG)
+    df = make_raw_data(n, seed=1)[COLUMNS]
+    for c in DIAG_COLS:
+        df[c] = pd.Series(EDGE_DIAG, dtype=object).sample(frac=1, random_state=len(c)).to_numpy()
+    df["age"] = (EDGE_AGE * n)[:n]
+    df.loc[0, DRUG_COLS[:5]] = np.nan
+    df.loc[1, DRUG_COLS] = np.nan
+    return df
+
+
+def check_parity(df: pd.DataFrame, steps: Iterable[str] = STEPS):
+    """AssertionError unless every vectorised step returns exactly the row-wise result on ``df``."""
+    for name in steps:
+        legacy, fast = STEPS[name]
+        expected, got = legacy(df), fast(df)
+        for e, g in zip(expected if isinstance(expected, list) else [expected],
+                        got if isinstance(got, list) else [got]):
+            if isinstance(e, pd.DataFrame):
+                pd.testing.assert_frame_equal(g, e)
+            else:
+                pd.testing.assert_series_equal(g, e)
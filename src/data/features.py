@@ -0,0 +1,142 @@
+"""
+Vectorised feature engineering used by ``DataPreprocessor``.
+
+Each function reproduces one row-wise step of the notebook pipeline
+exactly, including column order and dtypes. Per-value work is done once
+per *distinct* value (``pd.factorize``) and then broadcast back with
+NumPy indexing, so the cost is O(rows) array work plus O(distinct
+values) Python.
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# ICD-9 chapter boundaries (closed intervals); codes in the gaps between
+# them (e.g. 139.5) and outside 1–999 are "Unknown"
+ICD9_LOWER = np.array([1, 140, 240, 280, 290, 320, 390, 460, 520, 580, 630, 680, 710, 740, 760, 780, 800], dtype=float)
+ICD9_UPPER = np.array([139, 239, 279, 289, 319, 389, 459, 519, 579, 629, 679, 709, 739, 759, 779, 799, 999], dtype=float)
+ICD9_CATEGORIES = np.array(
+    [
+        "Infectious and parasitic diseases",
+        "Neoplasms",
+        "Endocrine, nutritional and metabolic diseases, and immunity disorders",
+        "Diseases of the blood and blood-forming organs",
+        "Mental disorders",
+        "Diseases of the nervous system and sense organs",
+        "Diseases of the circulatory system",
+        "Diseases of the respiratory system",
+        "Diseases of the digestive system",
+        "Diseases of the genitourinary system",
+        "Complications of pregnancy, childbirth, and the puerperium",
+        "Diseases of the skin and subcutaneous tissue",
+        "Diseases of the musculoskeletal system and connective tissue",
+        "Congenital anomalies",
+        "Perinatal conditions",
+        "Symptoms, signs, and ill-defined conditions",
+        "Injury and poisoning",
+        "Unknown",
+        "External/Supplemental",
+    ],
+    dtype=object,
+)
+_UNKNOWN = len(ICD9_LOWER)
+_EXTERNAL = _UNKNOWN + 1
+
+
+# ---------------------------------------------------------------------- #
+# Drug status counts
+# ---------------------------------------------------------------------- #
+def _legacy_counts(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.apply(lambda r: r.value_counts(), axis=1).fillna(0).astype(int).add_prefix("count_")
+
+
+def drug_status_counts(df: pd.DataFrame, drug_cols: List[str]) -> pd.DataFrame:
+    """
+    ``count_<status>`` columns: how many of ``drug_cols`` hold each status
+    per row. Same output as ``df[drug_cols].apply(lambda r: r.value_counts(),
+    axis=1).fillna(0).astype(int).add_prefix("count_")``.
+    """
+    frame = df[drug_cols]
+    n = len(frame)
+
+    # column by column (no n x width object matrix): factorize, remap into
+    # one shared value index, then bump that value's counter for each row
+    per_column, value_ids = [], {}
+    for c in drug_cols:
+        codes, uniques = pd.factorize(frame[c])
+        per_column.append((codes, [value_ids.setdefault(u, len(value_ids)) for u in uniques]))
+    uniques = list(value_ids)
+    k = len(uniques)
+
+    counts = np.zeros((n, k), dtype=np.int64)
+    rows = np.arange(n)
+    for codes, to_shared in per_column:
+        seen = codes >= 0                               # value_counts drops NaN
+        counts[rows[seen], np.asarray(to_shared, dtype=np.intp)[codes[seen]]] += 1
+
+    # pandas unions the per-row value_counts indexes: sorted, unless every
+    # row produced the identical index (then that row order is kept). That
+    # degenerate case, and empty frames, go through the row-wise path.
+    present = counts > 0
+    if n == 0 or k == 0 or (present == present[0]).all():
+        return _legacy_counts(frame)
+    try:
+        order = sorted(range(k), key=lambda j: uniques[j])
+    except TypeError:                                   # mixed, unorderable values
+        return _legacy_counts(frame)
+
+    return pd.DataFrame(
+        counts[:, order].astype(int),
+        columns=[f"count_{uniques[j]}" for j in order],
+        index=df.index,
+    )
+
+
+# ---------------------------------------------------------------------- #
+# ICD-9 chapters
+# ---------------------------------------------------------------------- #
+def _parse_icd9(code) -> float:
+    """NaN for external codes / unparsable values; the numeric code otherwise."""
+    try:
+        return float(code)
+    except Exception:
+        return np.nan
+
+
+def icd9_categories(codes: pd.Series) -> pd.Series:
+    """Chapter name per diagnosis code, via one ``searchsorted`` over the boundaries."""
+    ids, uniques = pd.factorize(codes)
+    uniques = np.asarray(uniques, dtype=object)
+
+    external = np.fromiter(
+        (isinstance(c, str) and c[:1] in ("E", "V") for c in uniques), dtype=bool, count=len(uniques)
+    )
+    numeric = np.fromiter((_parse_icd9(c) for c in uniques), dtype=float, count=len(uniques))
+
+    chapter = np.searchsorted(ICD9_LOWER, numeric, side="right") - 1
+    inside = (chapter >= 0) & (numeric <= ICD9_UPPER[np.clip(chapter, 0, None)])
+    chapter = np.where(inside, chapter, _UNKNOWN)
+    chapter = np.where(external, _EXTERNAL, chapter)
+
+    # factorize codes missing values as -1 → "Unknown"
+    per_value = np.append(chapter, _UNKNOWN)
+    return pd.Series(ICD9_CATEGORIES[per_value[ids]], index=codes.index, name=codes.name)
+
+
+# ---------------------------------------------------------------------- #
+# Age bins
+# ---------------------------------------------------------------------- #
+def _age_bin_mean(age_bin) -> float:
+    try:
+        lower, upper = age_bin.strip("[]()").split("-")
+        return (int(lower) + int(upper)) / 2
+    except Exception:
+        return np.nan
+
+
+def age_bin_means(ages: pd.Series) -> pd.Series:
+    """``[60-70)`` → 65.0 via a lookup over the distinct bins."""
+    ids, uniques = pd.factorize(ages)
+    table = np.array([_age_bin_mean(a) for a in uniques] + [np.nan], dtype=float)
+    return pd.Series(table[ids], index=ages.index, name=ages.name)
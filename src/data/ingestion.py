@@ -1,19 +1,52 @@
 """
 Data ingestion module for loading raw data.
 """
+import hashlib
 import logging
-import logging.config
 import os
-from typing import Dict
+from typing import Dict, Iterator
 
 import pandas as pd
-import yaml
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data.preprocessing import load_config, setup_logging
 
 # --------------------------------------------------------------------------- #
 # Logging
 # --------------------------------------------------------------------------- #
 logger = logging.getLogger("data_pipeline")
 
+# Pinned dtypes for diabetic_data.csv: identifiers stay int64, counts and
+# coded IDs fit in int16, every other column is a string categorical.
+ID_COLUMNS = ["encounter_id", "patient_nbr"]
+COUNT_COLUMNS = [
+    "admission_type_id", "discharge_disposition_id", "admission_source_id",
+    "time_in_hospital", "num_lab_procedures", "num_procedures", "num_medications",
+    "number_outpatient", "number_emergency", "number_inpatient", "number_diagnoses",
+]
+SCHEMA_VERSION = "1"
+
+
+def _csv_dtypes(columns) -> Dict[str, str]:
+    return {
+        c: "int64" if c in ID_COLUMNS else "int16" if c in COUNT_COLUMNS else "category"
+        for c in columns
+    }
+
+
+def _arrow_schema(dtypes: Dict[str, str]) -> pa.Schema:
+    to_arrow = {"int64": pa.int64(), "int16": pa.int16(), "category": pa.dictionary(pa.int32(), pa.string())}
+    return pa.schema([(c, to_arrow[t]) for c, t in dtypes.items()])
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(block_size):
+            h.update(chunk)
+    return h.hexdigest()
+
 
 class DataIngestion:
     """Handles data loading and *initial* validation-free ingestion."""
@@ -27,17 +60,14 @@ class DataIngestion:
     # --------------------------------------------------------------------- #
     def _load_config(self, config_path: str) -> Dict:
         try:
-            with open(config_path, "r") as f:
-                return yaml.safe_load(f)
+            return load_config(config_path)
         except Exception as e:
             logger.error(f"Error loading configuration: {e}")
             raise
 
     def _setup_logging(self):
         try:
-            with open("config/logging.yaml", "r") as f:
-                logging_config = yaml.safe_load(f)
-                logging.config.dictConfig(logging_config)
+            setup_logging()
         except Exception as e:
             logger.error(f"Error setting up logging: {e}")
             raise
@@ -46,7 +76,13 @@ class DataIngestion:
     # Public interface
     # --------------------------------------------------------------------- #
     def load_data(self) -> pd.DataFrame:
-        """Load raw CSV into a DataFrame (no cleaning)."""
+        """
+        Load the raw data (no cleaning). With ``data.ingestion.format:
+        parquet`` the CSV is converted once into a Parquet dataset, and later
+        runs memory-map that dataset while the source hash is unchanged.
+        """
+        if self.config["data"].get("ingestion", {}).get("format", "csv") == "parquet":
+            return self.load_columnar()
         try:
             raw_path = self.config["data"]["raw_data_path"]
             logger.info(f"Loading raw data from {raw_path} …")
@@ -57,10 +93,83 @@ class DataIngestion:
             logger.error(f"Error loading data: {e}")
             raise
 
+    def load_columnar(self) -> pd.DataFrame:
+        """Parquet-cached load: CSV is parsed only when its content changed."""
+        try:
+            parquet_path = self._ensure_parquet()
+            data = pq.read_table(parquet_path, memory_map=True).to_pandas()
+            logger.info(f"Loaded raw data with shape: {data.shape}")
+            return data
+        except Exception as e:
+            logger.error(f"Error loading data: {e}")
+            raise
+
+    def iter_chunks(self, chunksize: int | None = None) -> Iterator[pd.DataFrame]:
+        """
+        Raw data in chunks of ``chunksize`` rows (default
+        ``data.ingestion.chunksize``) for the streaming pipeline; only one
+        chunk is materialised at a time. Reads Parquet row batches when the
+        columnar format is configured, dtype-pinned CSV chunks otherwise.
+        """
+        ingest_cfg = self.config["data"].get("ingestion", {})
+        chunksize = int(chunksize or ingest_cfg.get("chunksize", 100_000))
+        if ingest_cfg.get("format", "csv") == "parquet":
+            parquet = pq.ParquetFile(self._ensure_parquet(), memory_map=True)
+            for batch in parquet.iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+        else:
+            raw_path = self.config["data"]["raw_data_path"]
+            dtypes = _csv_dtypes(pd.read_csv(raw_path, nrows=0).columns)
+            yield from pd.read_csv(raw_path, dtype=dtypes, chunksize=chunksize)
+
+    def _ensure_parquet(self) -> str:
+        """Path of the Parquet copy of the raw CSV, (re)built if the CSV changed."""
+        raw_path = self.config["data"]["raw_data_path"]
+        parquet_path = self.config["data"]["ingestion"]["parquet_path"]
+        source_hash = file_sha256(raw_path)
+
+        if self._cached_hash(parquet_path) != source_hash:
+            self._csv_to_parquet(raw_path, parquet_path, source_hash)
+        else:
+            logger.info(f"Source unchanged – reading {parquet_path}")
+        return parquet_path
+
+    @staticmethod
+    def _cached_hash(parquet_path: str) -> str | None:
+        if not os.path.exists(parquet_path):
+            return None
+        meta = pq.read_schema(parquet_path).metadata or {}
+        if meta.get(b"schema_version", b"").decode() != SCHEMA_VERSION:
+            return None
+        return meta.get(b"source_sha256", b"").decode() or None
+
+    def _csv_to_parquet(self, raw_path: str, parquet_path: str, source_hash: str):
+        """Stream the CSV in dtype-pinned chunks into one Parquet file (row group per chunk)."""
+        chunksize = int(self.config["data"]["ingestion"].get("chunksize", 100_000))
+        columns = pd.read_csv(raw_path, nrows=0).columns
+        dtypes = _csv_dtypes(columns)
+        schema = _arrow_schema(dtypes).with_metadata(
+            {"source_sha256": source_hash, "schema_version": SCHEMA_VERSION}
+        )
+        logger.info(f"Converting {raw_path} → {parquet_path} in chunks of {chunksize} rows …")
+
+        os.makedirs(os.path.dirname(parquet_path) or ".", exist_ok=True)
+        tmp_path = f"{parquet_path}.tmp"
+        n_rows = 0
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for chunk in pd.read_csv(raw_path, dtype=dtypes, chunksize=chunksize):
+                writer.write_table(pa.Table.from_pandas(chunk, preserve_index=False).cast(schema))
+                n_rows += len(chunk)
+        os.replace(tmp_path, parquet_path)
+        logger.info(f"Wrote {n_rows} rows to {parquet_path}")
+
     def run_pipeline(self) -> pd.DataFrame:
         """End-to-end ingestion (load → save copy → return)."""
         try:
             data = self.load_data()
+            if self.config["data"].get("ingestion", {}).get("format", "csv") == "parquet":
+                # the Parquet dataset already is the persisted copy
+                return data
 
             processed_path = self.config["data"]["processed_data_path"]
             os.makedirs(os.path.dirname(processed_path), exist_ok=True)
@@ -0,0 +1,79 @@
+"""
+On-disk feature matrix for the streaming (out-of-core) pipeline.
+
+Encoded chunks are appended to a raw float32 file (row-major, one row per
+encounter) plus an int8 label file; readers memory-map both, so a matrix
+larger than RAM can be consumed batch by batch.
+
+    <root>/X.f32      float32, n_rows x n_features
+    <root>/y.i8       int8, n_rows
+    <root>/meta.json  {"n_rows": ..., "feature_names": [...]}
+"""
+import json
+import logging
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("data_pipeline")
+
+
+class FeatureMatrixWriter:
+    """Append-only writer; ``meta.json`` is written on close, so a crashed run leaves no readable matrix."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.feature_names: Optional[List[str]] = None
+        self.n_rows = 0
+        os.makedirs(root, exist_ok=True)
+        meta = os.path.join(root, "meta.json")
+        if os.path.exists(meta):
+            os.remove(meta)
+        self._X = open(os.path.join(root, "X.f32"), "wb")
+        self._y = open(os.path.join(root, "y.i8"), "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self._X.close()
+        self._y.close()
+        if exc_type is None:
+            with open(os.path.join(self.root, "meta.json"), "w") as f:
+                json.dump({"n_rows": self.n_rows, "feature_names": self.feature_names or []}, f)
+
+    def append(self, X: pd.DataFrame, y: np.ndarray):
+        columns = [str(c) for c in X.columns]
+        if self.feature_names is None:
+            self.feature_names = columns
+        elif columns != self.feature_names:
+            raise ValueError(f"Chunk columns differ from the first chunk written to {self.root}")
+        self._X.write(np.ascontiguousarray(X.to_numpy(dtype=np.float32)).tobytes())
+        self._y.write(np.asarray(y, dtype=np.int8).tobytes())
+        self.n_rows += len(X)
+
+
+class FeatureMatrix:
+    """Read-only, memory-mapped view of a matrix written by ``FeatureMatrixWriter``."""
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as f:
+            meta = json.load(f)
+        self.feature_names: List[str] = meta["feature_names"]
+        n, k = int(meta["n_rows"]), len(self.feature_names)
+        if n == 0:  # numpy cannot map an empty file
+            self.X, self.y = np.zeros((0, k), dtype=np.float32), np.zeros(0, dtype=np.int8)
+        else:
+            self.X = np.memmap(os.path.join(root, "X.f32"), dtype=np.float32, mode="r", shape=(n, k))
+            self.y = np.memmap(os.path.join(root, "y.i8"), dtype=np.int8, mode="r", shape=(n,))
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def batches(self, batch_rows: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(X, y) row slices of at most ``batch_rows`` rows, read from disk on demand."""
+        for lo in range(0, len(self), batch_rows):
+            yield np.asarray(self.X[lo:lo + batch_rows]), np.asarray(self.y[lo:lo + batch_rows])
@@ -1,46 +1,90 @@
 """
 Data preprocessing – mirrors exactly the notebook steps.
 """
+import copy
 import csv
+import json
 import logging
 import logging.config
-from typing import Dict, Tuple, List
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Tuple, List
 
-import category_encoders as ce
 import joblib
 import numpy as np
 import pandas as pd
 import yaml
-from sklearn.preprocessing import LabelEncoder
+
+from src.data.features import age_bin_means, drug_status_counts, icd9_categories
+from src.data.timing import Stopwatch
+
+if TYPE_CHECKING:  # fit-time only; serving never imports them
+    import category_encoders as ce
+    from sklearn.preprocessing import LabelEncoder
 
 logger = logging.getLogger("data_pipeline")
 
+DRUG_COLS = [
+    "metformin","repaglinide","nateglinide","chlorpropamide","glimepiride",
+    "acetohexamide","glipizide","glyburide","tolbutamide","pioglitazone",
+    "rosiglitazone","acarbose","miglitol","troglitazone","tolazamide",
+    "examide","citoglipton","insulin","glyburide-metformin",
+    "glipizide-metformin","glimepiride-pioglitazone","metformin-rosiglitazone",
+    "metformin-pioglitazone",
+]
+DIAG_COLS = ["diag_1", "diag_2", "diag_3"]
+
+_NA = object()  # stands in for NaN while merging per-chunk vocabularies
+_EXAMPLE_CANDIDATES = 10_000  # raw rows searched for the serving warmup record
+
+_CONFIGS: Dict[Tuple[str, int], Dict] = {}
+_LOGGING_CONFIGURED = set()
+
+
+def load_config(path: str = "config/config.yaml") -> Dict:
+    """Parsed ``config.yaml``; parsed once per file version, each caller gets its own copy."""
+    # absolute, so two working directories with the same relative path never share an entry
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if key not in _CONFIGS:
+        with open(path, "r") as f:
+            _CONFIGS[key] = yaml.safe_load(f)
+    return copy.deepcopy(_CONFIGS[key])
+
+
+def setup_logging(path: str = "config/logging.yaml"):
+    """Apply ``logging.yaml`` once per process (``dictConfig`` replaces every handler)."""
+    if path in _LOGGING_CONFIGURED:
+        return
+    with open(path, "r") as f:
+        logging.config.dictConfig(yaml.safe_load(f))
+    _LOGGING_CONFIGURED.add(path)
+
+
+def compiled_path(path: str) -> str:
+    """Where ``save_preprocessor`` writes the compiled (encoder-free) bundle for ``path``."""
+    return f"{os.path.splitext(path)[0]}.bundle"
+
 
 class DataPreprocessor:
     # ------------------------------------------------------------------ #
     # Init / utils
     # ------------------------------------------------------------------ #
     def __init__(self, config_path: str = "config/config.yaml"):
-        self.config = self._load_config(config_path)
-        self._setup_logging()
+        self.config = load_config(config_path)
+        setup_logging()
 
-        self.label_encoders: Dict[str, LabelEncoder] = {}
-        self.binary_encoder: ce.BinaryEncoder | None = None
+        self.label_encoders: Dict[str, "LabelEncoder"] = {}
+        self.binary_encoder: "ce.BinaryEncoder | None" = None
         self.onehot_encode_features: List[str] = []
         self.onehot_columns: List[str] = []
         self.feature_names_: List[str] = []
         self.id_mappings: Dict[str, Dict[int, str]] = {}
-
-    def _load_config(self, path: str) -> Dict:
-        with open(path, "r") as f:
-            return yaml.safe_load(f)
-
-    def _setup_logging(self):
-        with open("config/logging.yaml", "r") as f:
-            logging.config.dictConfig(yaml.safe_load(f))
+        self.target_classes_: List[str] = []
+        # one scorable raw record, kept with the artefacts for serving warmup
+        self.example_record_: Optional[Dict[str, Any]] = None
 
     # ------------------------------------------------------------------ #
-    # Helper functions (age / ICD-9 etc.)
+    # Helper functions (age / ICD-9 etc.) – row-wise reference versions of
+    # the vectorised src/data/features.py
     # ------------------------------------------------------------------ #
     @staticmethod
     def _convert_age_bin_to_mean(age_bin: str) -> float:
@@ -128,9 +172,18 @@ class DataPreprocessor:
     # ------------------------------------------------------------------ #
     # Pre-processing (training)
     # ------------------------------------------------------------------ #
-    def preprocess_data(self, data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
-        logger.info("=== Preprocessing (fit) ===")
+    @staticmethod
+    def _as_object(data: pd.DataFrame) -> pd.DataFrame:
+        """Copy with categorical columns (Parquet ingestion) turned back into plain strings."""
         df = data.copy()
+        cats = df.select_dtypes(include="category").columns
+        if len(cats):
+            df[cats] = df[cats].astype(object)
+        return df
+
+    def _clean(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Notebook-identical row / column steps before encoding (target kept)."""
+        df = self._as_object(data)
 
         # ---- load mappings
         if not self.id_mappings:
@@ -154,27 +207,38 @@ class DataPreprocessor:
         df.loc[df["race"] == "?", "race"] = "Other"
         df = df[df["gender"] != "Unknown/Invalid"].reset_index(drop=True)
 
-        drug_cols = [
-            "metformin","repaglinide","nateglinide","chlorpropamide","glimepiride",
-            "acetohexamide","glipizide","glyburide","tolbutamide","pioglitazone",
-            "rosiglitazone","acarbose","miglitol","troglitazone","tolazamide",
-            "examide","citoglipton","insulin","glyburide-metformin",
-            "glipizide-metformin","glimepiride-pioglitazone","metformin-rosiglitazone",
-            "metformin-pioglitazone",
-        ]
-        counts = (
-            df[drug_cols]
-            .apply(lambda r: r.value_counts(), axis=1)
-            .fillna(0)
-            .astype(int)
-            .add_prefix("count_")
-        )
+        drug_cols = DRUG_COLS
+        counts = drug_status_counts(df, drug_cols)
         df = pd.concat([df, counts], axis=1)
         df.drop(columns=drug_cols + ["encounter_id", "patient_nbr"], inplace=True, errors="ignore")
 
-        df["age"] = df["age"].apply(self._convert_age_bin_to_mean)
+        df["age"] = age_bin_means(df["age"])
         for c in ["diag_1", "diag_2", "diag_3"]:
-            df[c] = df[c].apply(self._map_icd9_to_category)
+            df[c] = icd9_categories(df[c])
+        return df
+
+    def _example_record(self, data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """
+        First raw row of ``data`` that ``transform_new_data`` keeps and can
+        encode (none of the ``find_unscorable_rows`` problems), as a
+        JSON-style request payload. Needs the fitted encoders.
+        """
+        target = self.config["features"]["target_column"]
+        head = data.iloc[:_EXAMPLE_CANDIDATES]
+        unscorable = self.find_unscorable_rows(head)
+        pos = next((i for i in range(len(head)) if i not in unscorable), None)
+        if pos is None:
+            return None
+        row = self._as_object(head.iloc[pos:pos + 1]).drop(columns=[target], errors="ignore")
+        return json.loads(row.to_json(orient="records"))[0]
+
+    def preprocess_data(self, data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        import category_encoders as ce
+        from sklearn.preprocessing import LabelEncoder
+
+        logger.info("=== Preprocessing (fit) ===")
+        df = self._clean(data)
+        target = self.config["features"]["target_column"]
 
         # ---- encoding strategy
         cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
@@ -205,6 +269,7 @@ class DataPreprocessor:
             df = self.binary_encoder.fit_transform(df)
 
         self.feature_names_ = [c for c in df.columns if c != target]
+        self.example_record_ = self._example_record(data)
 
         X = df.drop(columns=[target])
         y = df[target]
@@ -212,14 +277,125 @@ class DataPreprocessor:
         logger.info(f"Finished preprocessing. Shape: {X.shape}")
         return X, y
 
+    # ------------------------------------------------------------------ #
+    # Streaming (out-of-core) fit / transform
+    # ------------------------------------------------------------------ #
+    def fit_streaming(self, chunks: Iterable[pd.DataFrame]) -> "DataPreprocessor":
+        """
+        First pass of the out-of-core pipeline: learn the encoders of
+        ``preprocess_data`` from raw chunks, holding one chunk at a time.
+
+        Only the vocabularies are kept across chunks (first-appearance order,
+        which is what the binary encoder's ordinal step uses), so the fitted
+        state matches an in-memory fit of the concatenated chunks.
+        """
+        import category_encoders as ce
+        from sklearn.preprocessing import LabelEncoder
+
+        logger.info("=== Preprocessing (streaming fit) ===")
+        target = self.config["features"]["target_column"]
+
+        columns: List[str] | None = None
+        count_cols: set = set()
+        vocab: Dict[str, Dict] = {}
+        n_rows = 0
+        candidates: Optional[pd.DataFrame] = None  # raw rows for the warmup record, checked once fitted
+        for chunk in chunks:
+            if candidates is None:
+                candidates = chunk.iloc[:_EXAMPLE_CANDIDATES].copy()
+            df = self._clean(chunk)
+            if columns is None:
+                columns = [c for c in df.columns if not c.startswith("count_")]
+            count_cols.update(c for c in df.columns if c.startswith("count_"))
+            for c in df.select_dtypes(include=["object"]).columns:
+                seen = vocab.setdefault(c, {})
+                for v in pd.unique(df[c]):
+                    seen.setdefault(_NA if pd.isna(v) else v, None)
+            n_rows += len(df)
+        if not n_rows:
+            raise ValueError("No rows left after cleaning – nothing to fit")
+
+        def values(c: str) -> List:
+            return [v for v in vocab[c] if v is not _NA]
+
+        # ---- encoding strategy (same thresholds as preprocess_data)
+        cat_cols = [c for c in columns if c in vocab and c != target]
+        label_feats, oh_feats, bin_feats = [], [], []
+        for c in cat_cols:
+            n = len(values(c))
+            if n <= 4:
+                label_feats.append(c)
+            elif n <= 5:
+                oh_feats.append(c)
+            else:
+                bin_feats.append(c)
+        self.onehot_encode_features = oh_feats
+
+        self.label_encoders = {c: LabelEncoder().fit(np.array(values(c), dtype=object)) for c in label_feats}
+        self.target_classes_ = sorted(values(target))
+
+        # counts are appended after the cleaned columns, get_dummies appends
+        # its (sorted) indicator columns after the rest
+        ordered = columns + sorted(count_cols)
+        self.onehot_columns = [c for c in ordered if c not in oh_feats] + [
+            f"{c}_{v}" for c in oh_feats for v in sorted(values(c))
+        ]
+
+        self.binary_encoder = None
+        if bin_feats:
+            # a frame holding every vocabulary in first-appearance order
+            n = max(len(vocab[c]) for c in bin_feats)
+            probe = pd.DataFrame(0, index=range(n), columns=self.onehot_columns)
+            for c in bin_feats:
+                vals = [np.nan if v is _NA else v for v in vocab[c]]
+                probe[c] = pd.Series(vals + vals[-1:] * (n - len(vals)), dtype=object)
+            self.binary_encoder = ce.BinaryEncoder(cols=bin_feats).fit(probe)
+            feature_cols = self.binary_encoder.transform(probe.iloc[:1]).columns
+        else:
+            feature_cols = self.onehot_columns
+        self.feature_names_ = [c for c in feature_cols if c != target]
+        self.example_record_ = self._example_record(candidates)
+
+        logger.info(f"Fitted encoders on {n_rows} rows ({len(self.feature_names_)} features)")
+        return self
+
+    def transform_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+        """
+        Second pass: lazily encode raw chunks with the fitted encoders into
+        ``(X, y)`` in ``feature_names_`` order – row for row what
+        ``preprocess_data`` returns for the concatenated chunks.
+        """
+        if not self.feature_names_:
+            raise RuntimeError("Preprocessor not fitted / loaded.")
+        target = self.config["features"]["target_column"]
+
+        for chunk in chunks:
+            df = self._clean(chunk)
+            if df.empty:
+                continue
+            for c, le in self.label_encoders.items():
+                df[c] = le.transform(df[c])
+            df = pd.get_dummies(df, columns=self.onehot_encode_features)
+            # categories or drug statuses absent from this chunk are all-zero columns
+            df = df.reindex(columns=self.onehot_columns, fill_value=0)
+            if self.binary_encoder:
+                df = self.binary_encoder.transform(df)
+            yield df[self.feature_names_], df[target]
+
     # ------------------------------------------------------------------ #
     # Transform (inference)
     # ------------------------------------------------------------------ #
-    def transform_new_data(self, data: pd.DataFrame) -> pd.DataFrame:
+    def transform_new_data(self, data: pd.DataFrame, timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+        """
+        Encode raw records with the fitted encoders. Pass a dict as
+        ``timings`` to get the seconds spent per stage added to it.
+        """
         if not self.feature_names_:
             raise RuntimeError("Preprocessor not fitted / loaded.")
 
-        df = data.copy()
+        watch = Stopwatch(timings)
+        df = self._as_object(data)
+        watch.lap("copy")
 
         # mappings
         if not self.id_mappings:
@@ -227,6 +403,7 @@ class DataPreprocessor:
         for col, mapping in self.id_mappings.items():
             if col in df.columns:
                 df[col] = df[col].map(mapping)
+        watch.lap("id_mappings")
 
         # replicate notebook steps (same as fit, but without drops that
         # would remove unseen columns if missing)
@@ -241,77 +418,130 @@ class DataPreprocessor:
         df.dropna(subset=[c for c in ["diag_1", "diag_2", "diag_3"] if c in df.columns], inplace=True)
 
         df = df[df.get("gender", "Valid") != "Unknown/Invalid"].reset_index(drop=True)
+        watch.lap("row_filters")
 
         # counts
-        drug_cols = [
-            "metformin","repaglinide","nateglinide","chlorpropamide","glimepiride",
-            "acetohexamide","glipizide","glyburide","tolbutamide","pioglitazone",
-            "rosiglitazone","acarbose","miglitol","troglitazone","tolazamide",
-            "examide","citoglipton","insulin","glyburide-metformin",
-            "glipizide-metformin","glimepiride-pioglitazone","metformin-rosiglitazone",
-            "metformin-pioglitazone",
-        ]
+        drug_cols = DRUG_COLS
         for c in drug_cols:
             if c not in df:
                 df[c] = "No"
-        counts = (
-            df[drug_cols]
-            .apply(lambda r: r.value_counts(), axis=1)
-            .fillna(0)
-            .astype(int)
-            .add_prefix("count_")
-        )
+        counts = drug_status_counts(df, drug_cols)
         for c in drug_cols + ["encounter_id", "patient_nbr"]:
             df.drop(columns=c, inplace=True, errors="ignore")
         df = pd.concat([df, counts], axis=1)
+        watch.lap("drug_counts")
 
-        df["age"] = df["age"].apply(self._convert_age_bin_to_mean)
+        df["age"] = age_bin_means(df["age"])
         for c in ["diag_1", "diag_2", "diag_3"]:
             if c in df.columns:
-                df[c] = df[c].apply(self._map_icd9_to_category)
+                df[c] = icd9_categories(df[c])
+        watch.lap("age_icd9")
 
         # ---------- replay encoders (fit-objects) ------------------------
         for c, le in self.label_encoders.items():
             if c in df.columns:
                 df[c] = le.transform(df[c])
+        watch.lap("label_encoders")
 
         if self.onehot_encode_features:
             df = pd.get_dummies(df, columns=self.onehot_encode_features)
         for c in self.onehot_columns:
             if c not in df.columns:
                 df[c] = 0
+        watch.lap("onehot")
 
         if self.binary_encoder:
             df = self.binary_encoder.transform(df)
+        watch.lap("binary_encoder")
 
         # reorder / fill
         df = df.reindex(columns=self.feature_names_, fill_value=0)
 
         df = df.apply(pd.to_numeric, errors="ignore")
-        
+        watch.lap("reindex")
+
         return df
 
+    def find_unscorable_rows(self, data: pd.DataFrame) -> Dict[int, List[str]]:
+        """
+        Rows that ``transform_new_data`` would silently drop or fail on
+        (missing diagnoses, invalid gender, values the fitted encoders have
+        never seen). Returns {row position: [problems]}.
+        """
+        if not self.feature_names_:
+            raise RuntimeError("Preprocessor not fitted / loaded.")
+        if not self.id_mappings:
+            self._load_id_mappings()
+
+        errors: Dict[int, List[str]] = {}
+
+        def flag(mask: pd.Series, msg: str):
+            for pos in np.flatnonzero(mask.to_numpy()):
+                errors.setdefault(int(pos), []).append(msg)
+
+        for c in DIAG_COLS:
+            if c in data.columns:
+                flag(data[c].isna() | (data[c] == "?"), f"missing diagnosis code '{c}'")
+        if "gender" in data.columns:
+            flag(data["gender"] == "Unknown/Invalid", "gender is 'Unknown/Invalid'")
+
+        for c, le in self.label_encoders.items():
+            if c not in data.columns:
+                continue
+            values = data[c].map(self.id_mappings[c]) if c in self.id_mappings else data[c]
+            if c in DIAG_COLS:
+                values = icd9_categories(values)
+            flag(~values.isin(le.classes_), f"unseen value for '{c}'")
+
+        for c in self.onehot_encode_features:
+            if c not in data.columns:
+                continue
+            known = {col[len(c) + 1:] for col in self.onehot_columns if col.startswith(f"{c}_")}
+            values = data[c].map(self.id_mappings[c]) if c in self.id_mappings else data[c]
+            flag(values.notna() & ~values.astype(str).isin(known), f"unseen value for '{c}'")
+
+        return errors
+
     # ------------------------------------------------------------------ #
     # Persist / load
     # ------------------------------------------------------------------ #
-    def save_preprocessor(self, path: str = "models/preprocessor.joblib"):
-        joblib.dump(
-            {
-                "label_encoders": self.label_encoders,
-                "binary_encoder": self.binary_encoder,
-                "onehot_encode_features": self.onehot_encode_features,
-                "onehot_columns": self.onehot_columns,
-                "feature_names_": self.feature_names_,
-            },
-            path,
-        )
-        logger.info(f"Preprocessor saved → {path}")
-
-    def load_preprocessor(self, path: str = "models/preprocessor.joblib"):
-        obj = joblib.load(path)
+    def get_state(self) -> Dict:
+        """The fitted encoders, as persisted by ``save_preprocessor``."""
+        if not self.id_mappings:
+            self._load_id_mappings()
+        return {
+            "label_encoders": self.label_encoders,
+            "binary_encoder": self.binary_encoder,
+            "onehot_encode_features": self.onehot_encode_features,
+            "onehot_columns": self.onehot_columns,
+            "feature_names_": self.feature_names_,
+            "id_mappings": self.id_mappings,
+            "example_record": self.example_record_,
+        }
+
+    def set_state(self, obj: Dict):
         self.label_encoders = obj["label_encoders"]
         self.binary_encoder = obj["binary_encoder"]
         self.onehot_encode_features = obj["onehot_encode_features"]
         self.onehot_columns = obj["onehot_columns"]
         self.feature_names_ = obj["feature_names_"]
+        # artefacts saved before these were persisted fall back to IDS_mapping.csv
+        self.id_mappings = obj.get("id_mappings") or {}
+        self.example_record_ = obj.get("example_record")
+
+    def save_preprocessor(self, path: str = "models/preprocessor.joblib"):
+        """
+        Save the encoders to ``path`` and their compiled lookup tables as a
+        bundle at ``compiled_path(path)``, which serving memory-maps without
+        unpickling sklearn / category_encoders objects.
+        """
+        from src.data.compiled import CompiledTransformer
+
+        joblib.dump(self.get_state(), f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)  # a hot-reloading API never reads a half-written file
+        CompiledTransformer.from_preprocessor(self).save_bundle(compiled_path(path))
+        logger.info(f"Preprocessor saved → {path}")
+
+    def load_preprocessor(self, path: str = "models/preprocessor.joblib"):
+        self.set_state(joblib.load(path))
         logger.info(f"Preprocessor loaded ← {path}")
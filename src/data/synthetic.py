@@ -0,0 +1,96 @@
+"""
+Synthetic records in the raw ``diabetic_data.csv`` schema.
+
+Used by the benchmarks (any size, no dataset download needed) and for
+warming up the serving path. Values follow the UCI file's vocabularies,
+including its quirks: ``?`` placeholders, ``V``/``E`` diagnosis codes,
+codes that fall in the gaps between ICD-9 chapters, ``Unknown/Invalid``
+gender.
+
+Admission / discharge / source ids are drawn from the ids listed in
+``IDS_mapping.csv``, so every generated id maps to a description.
+"""
+import csv
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.data.preprocessing import DRUG_COLS
+
+AGE_BINS = [f"[{i}-{i + 10})" for i in range(0, 100, 10)]
+DRUG_STATUS = ["No", "Steady", "Up", "Down"]
+ID_COLS = ["admission_type_id", "discharge_disposition_id", "admission_source_id"]
+
+
+@lru_cache(maxsize=None)
+def mapping_ids(mapping_file: str = "data/raw/IDS_mapping.csv") -> Dict[str, List[int]]:
+    """{id column: ids listed for it in IDS_mapping.csv}."""
+    ids: Dict[str, List[int]] = {}
+    current = None
+    with open(mapping_file, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            if row[0] in ID_COLS:
+                current = row[0]
+                ids[current] = []
+            elif current:
+                ids[current].append(int(row[0]))
+    return ids
+
+
+def _icd9_codes(rng: np.random.Generator, n: int) -> np.ndarray:
+    kind = rng.random(n)
+    numeric = rng.uniform(0.5, 1000, n)
+    codes = np.where(
+        rng.random(n) < 0.5,
+        np.char.mod("%.2f", numeric),
+        np.char.mod("%d", numeric.astype(int)),
+    ).astype(object)
+    codes[kind < 0.05] = np.char.add("V", rng.integers(10, 80, n).astype(str))[kind < 0.05]
+    external = (kind >= 0.05) & (kind < 0.07)
+    codes[external] = np.char.add("E", rng.integers(800, 999, n).astype(str))[external]
+    codes[(kind >= 0.07) & (kind < 0.08)] = "?"
+    return codes
+
+
+def make_raw_data(n_rows: int, seed: int = 0, mapping_file: str = "data/raw/IDS_mapping.csv") -> pd.DataFrame:
+    """``n_rows`` raw records (all columns of diabetic_data.csv, target included)."""
+    rng = np.random.default_rng(seed)
+    n = int(n_rows)
+    ids = mapping_ids(mapping_file)
+    data = {
+        "encounter_id": np.arange(n, dtype=np.int64),
+        "patient_nbr": rng.integers(0, 10 ** 8, n),
+        "race": rng.choice(["Caucasian", "AfricanAmerican", "?", "Other", "Asian", "Hispanic"], n,
+                           p=[.74, .19, .02, .015, .01, .025]).astype(object),
+        "gender": rng.choice(["Female", "Male", "Unknown/Invalid"], n, p=[.537, .46, .003]).astype(object),
+        "age": rng.choice(AGE_BINS, n).astype(object),
+        "weight": "?",
+        "admission_type_id": rng.choice(ids["admission_type_id"], n),
+        "discharge_disposition_id": rng.choice(ids["discharge_disposition_id"], n),
+        "admission_source_id": rng.choice(ids["admission_source_id"], n),
+        "time_in_hospital": rng.integers(1, 15, n),
+        "payer_code": "?",
+        "medical_specialty": "?",
+        "num_lab_procedures": rng.integers(1, 133, n),
+        "num_procedures": rng.integers(0, 7, n),
+        "num_medications": rng.integers(1, 82, n),
+        "number_outpatient": rng.integers(0, 43, n),
+        "number_emergency": rng.integers(0, 77, n),
+        "number_inpatient": rng.integers(0, 22, n),
+        "diag_1": _icd9_codes(rng, n),
+        "diag_2": _icd9_codes(rng, n),
+        "diag_3": _icd9_codes(rng, n),
+        "number_diagnoses": rng.integers(1, 17, n),
+        "max_glu_serum": "None",
+        "A1Cresult": "None",
+    }
+    for drug in DRUG_COLS:
+        data[drug] = rng.choice(DRUG_STATUS, n, p=[.75, .18, .035, .035]).astype(object)
+    data["change"] = rng.choice(["Ch", "No"], n).astype(object)
+    data["diabetesMed"] = rng.choice(["Yes", "No"], n, p=[.77, .23]).astype(object)
+    data["readmitted"] = rng.choice(["NO", ">30", "<30"], n, p=[.54, .35, .11]).astype(object)
+    return pd.DataFrame(data)
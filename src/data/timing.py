@@ -0,0 +1,23 @@
+"""
+Per-stage wall-time accounting for the transform paths.
+
+Callers that want a breakdown pass a dict as ``timings``; each
+``Stopwatch.lap(stage)`` adds the time since the previous lap to
+``timings[stage]``. With ``timings=None`` every lap is a no-op, so the
+uninstrumented path pays nothing but a ``None`` check.
+"""
+import time
+from typing import Dict, Optional
+
+
+class Stopwatch:
+    def __init__(self, timings: Optional[Dict[str, float]]):
+        self.timings = timings
+        self._last = time.perf_counter() if timings is not None else 0.0
+
+    def lap(self, stage: str):
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
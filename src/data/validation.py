@@ -4,6 +4,7 @@ Light-weight schema validation using config – no value mutations.
 import logging
 from typing import Dict, List
 
+import numpy as np
 import pandas as pd
 
 logger = logging.getLogger("data_pipeline")
@@ -27,6 +28,30 @@ class DataValidator:
         # **Do not** touch/clean the data – let the pre-processor handle it
         return data
 
+    def validate_rows(self, data: pd.DataFrame) -> Dict[int, List[str]]:
+        """
+        Per-row check used by batch scoring: every feature column from the
+        config must be present and numerical columns must parse as numbers.
+        Returns {row position: [problems]} for the rows that fail.
+        """
+        feats = self.config["features"]
+        errors: Dict[int, List[str]] = {}
+
+        for col in feats["categorical_columns"] + feats["numerical_columns"]:
+            missing = data[col].isna() if col in data.columns else pd.Series(True, index=data.index)
+            for pos in np.flatnonzero(missing.to_numpy()):
+                errors.setdefault(int(pos), []).append(f"missing field '{col}'")
+
+        for col in feats["numerical_columns"]:
+            if col not in data.columns:
+                continue
+            parsed = pd.to_numeric(data[col], errors="coerce")
+            bad = parsed.isna() & data[col].notna()
+            for pos in np.flatnonzero(bad.to_numpy()):
+                errors.setdefault(int(pos), []).append(f"non-numeric value for '{col}'")
+
+        return errors
+
     # ------------------------------------------------------------------ #
     # Private
     # ------------------------------------------------------------------ #
@@ -0,0 +1,158 @@
+"""
+Single-file, memory-mapped artefact bundles.
+
+    magic "MLBUNDLE" | uint32 schema version | uint32 header length
+    header JSON {"kind", "meta", "arrays": {name: dtype/shape/offset/nbytes}, "sha256"}
+    data region: each array 64-byte aligned
+
+Readers ``np.memmap`` the file and hand out read-only views into it, so
+processes loading the same bundle share its pages instead of each holding
+an unpickled copy. ``sha256`` covers the data region and is checked on load.
+
+Models are stored as their booster's native format (LightGBM model text,
+XGBoost UBJSON) with the label classes in ``meta``; other estimators are
+pickled with protocol 5, their numpy buffers stored out-of-band as arrays.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import struct
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("model_pipeline")
+
+MAGIC = b"MLBUNDLE"
+SCHEMA_VERSION = 1
+_PREAMBLE = struct.Struct("<II")
+_ALIGN = 64
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+# ---------------------------------------------------------------------- #
+# Container
+# ---------------------------------------------------------------------- #
+def write_bundle(path: str, kind: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """Write atomically (temp file + rename), so a hot-reloading reader never sees half a bundle."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    layout, h, offset = {}, hashlib.sha256(), 0
+    for name, a in arrays.items():
+        if a.dtype.hasobject:
+            raise TypeError(f"Bundle array '{name}' has object dtype")
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset, "nbytes": a.nbytes}
+        h.update(a.tobytes())
+        h.update(b"\x00" * _pad(a.nbytes))
+        offset += a.nbytes + _pad(a.nbytes)
+
+    header = json.dumps({"kind": kind, "meta": meta, "arrays": layout, "sha256": h.hexdigest()}).encode()
+    head = MAGIC + _PREAMBLE.pack(SCHEMA_VERSION, len(header)) + header
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(head + b"\x00" * _pad(len(head)))
+        for a in arrays.values():
+            f.write(a.tobytes())
+            f.write(b"\x00" * _pad(a.nbytes))
+    os.replace(tmp, path)
+
+
+def read_bundle(path: str, verify: bool = True) -> Tuple[str, Dict[str, Any], Dict[str, np.ndarray]]:
+    """(kind, meta, {name: read-only memory-mapped array})."""
+    raw = np.memmap(path, dtype=np.uint8, mode="r")
+    n = len(MAGIC) + _PREAMBLE.size
+    if bytes(raw[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not an artefact bundle")
+    version, header_len = _PREAMBLE.unpack(bytes(raw[len(MAGIC):n]))
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"{path} has bundle schema {version}; this code reads up to {SCHEMA_VERSION}")
+    header = json.loads(bytes(raw[n:n + header_len]))
+    start = n + header_len
+    data = raw[start + _pad(start):]
+
+    if verify and hashlib.sha256(data).hexdigest() != header["sha256"]:
+        raise ValueError(f"Checksum mismatch in {path}")
+    arrays = {
+        name: data[spec["offset"]:spec["offset"] + spec["nbytes"]].view(np.dtype(spec["dtype"])).reshape(spec["shape"])
+        for name, spec in header["arrays"].items()
+    }
+    return header["kind"], header["meta"], arrays
+
+
+# ---------------------------------------------------------------------- #
+# Vocabularies: values of any JSON type as a fixed-width unicode array
+# ---------------------------------------------------------------------- #
+def pack_values(values: List[Any]) -> np.ndarray:
+    return np.array([json.dumps(v.item() if isinstance(v, np.generic) else v) for v in values], dtype=np.str_)
+
+
+def unpack_values(arr: np.ndarray) -> List[Any]:
+    return [json.loads(v) for v in arr.tolist()]
+
+
+# ---------------------------------------------------------------------- #
+# Models
+# ---------------------------------------------------------------------- #
+def _booster_kind(model: Any) -> str:
+    from src.models.streaming import BoosterClassifier
+
+    if isinstance(model, BoosterClassifier):
+        return model.kind
+    module = type(model).__module__.split(".")[0]
+    return module if module in ("lightgbm", "xgboost") else "pickle"
+
+
+def save_model_bundle(model: Any, classes: List[Any], path: str):
+    """Write ``model`` (+ its label classes) as a bundle; boosters in their native format."""
+    from src.models.streaming import BoosterClassifier
+
+    kind = _booster_kind(model)
+    meta: Dict[str, Any] = {"classes": [c.item() if isinstance(c, np.generic) else c for c in classes]}
+    arrays: Dict[str, np.ndarray] = {}
+    if kind == "lightgbm":
+        booster = model.booster if isinstance(model, BoosterClassifier) else model.booster_
+        arrays["booster"] = np.frombuffer(booster.model_to_string().encode(), dtype=np.uint8)
+    elif kind == "xgboost":
+        booster = model.booster if isinstance(model, BoosterClassifier) else model.get_booster()
+        arrays["booster"] = np.frombuffer(bytes(booster.save_raw("ubj")), dtype=np.uint8)
+    else:
+        buffers: List[pickle.PickleBuffer] = []
+        arrays["pickle"] = np.frombuffer(pickle.dumps(model, protocol=5, buffer_callback=buffers.append),
+                                         dtype=np.uint8)
+        for i, buf in enumerate(buffers):
+            arrays[f"buffer_{i}"] = np.frombuffer(buf.raw(), dtype=np.uint8)
+        meta["n_buffers"] = len(buffers)
+    write_bundle(path, f"model/{kind}", meta, arrays)
+    logger.info(f"Model bundle written → {path}")
+
+
+def load_model_bundle(path: str, verify: bool = True) -> Tuple[Any, np.ndarray]:
+    """(model with ``predict_proba``, label classes) from ``save_model_bundle`` output."""
+    from src.models.streaming import BoosterClassifier
+
+    kind, meta, arrays = read_bundle(path, verify)
+    kind = kind.split("/", 1)[1]
+    if kind == "lightgbm":
+        import lightgbm as lgb
+
+        booster = lgb.Booster(model_str=arrays["booster"].tobytes().decode())
+        model = BoosterClassifier(booster, kind, booster.feature_name())
+    elif kind == "xgboost":
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(bytearray(arrays["booster"]))
+        names = booster.feature_names or []
+        # requests arrive as bare float32 matrices already in feature order
+        booster.feature_names = None
+        booster.feature_types = None
+        model = BoosterClassifier(booster, kind, names)
+    else:
+        # out-of-band buffers are rebuilt as views into the mapping, not copies
+        buffers = [arrays[f"buffer_{i}"] for i in range(meta["n_buffers"])]
+        model = pickle.loads(arrays["pickle"], buffers=buffers)
+    return model, np.asarray(meta["classes"])
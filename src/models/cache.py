@@ -0,0 +1,81 @@
+"""
+Content-addressed on-disk cache for training artefacts.
+
+Keys are hashes of the *content* that produced an artefact (feature frame,
+labels, relevant config), so a re-run with unchanged inputs loads the result
+instead of recomputing it, and any change to the inputs misses naturally.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("model_pipeline")
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable hex digest over frames, arrays and JSON-able values."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            h.update(json.dumps([list(map(str, part.columns)), list(map(str, part.dtypes))]).encode())
+            h.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        elif isinstance(part, pd.Series):
+            h.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        elif isinstance(part, np.ndarray):
+            h.update(str(part.dtype).encode() + str(part.shape).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"\x00")
+    return h.hexdigest()[:20]
+
+
+class ArtifactCache:
+    def __init__(self, root: str = "models/.cache", enabled: bool = True):
+        self.root = root
+        self.enabled = enabled
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, f"{kind}-{key}.joblib")
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        path = self._path(kind, key)
+        if not self.enabled or not os.path.exists(path):
+            return None
+        try:
+            obj = joblib.load(path)
+        except Exception:
+            logger.warning(f"Ignoring unreadable cache entry {path}")
+            return None
+        logger.info(f"Cache hit: {kind} {key}")
+        return obj
+
+    def put(self, kind: str, key: str, obj: Any):
+        if not self.enabled:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(kind, key)
+        joblib.dump(obj, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    # ------------------------------------------------------------------ #
+    # Published files (models/*.joblib) → key of the artefact they hold
+    # ------------------------------------------------------------------ #
+    def deployed(self) -> Dict[str, str]:
+        path = os.path.join(self.root, "deployed.json")
+        if not self.enabled or not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def set_deployed(self, deployed: Dict[str, str]):
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, "deployed.json"), "w") as f:
+                json.dump(deployed, f, indent=2)
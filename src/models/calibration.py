@@ -0,0 +1,199 @@
+"""
+Post-training probability calibration and decision thresholds.
+
+The models are fitted on SMOTE-balanced data, so their probabilities
+overstate the real positive rate. ``fit_calibration`` maps raw probabilities
+to observed risk on held-out rows that were never resampled (isotonic or
+Platt scaling) and keeps the map as a small monotone lookup table, which
+serving evaluates with ``np.interp`` – no sklearn object on the hot path.
+
+Operating points (``model.calibration.operating_points``) are thresholds on
+the calibrated risk, chosen on the same rows:
+
+    {name: screening, target_recall: 0.8}      # highest threshold reaching this recall
+    {name: confident, target_precision: 0.5}   # lowest threshold keeping this precision
+    {name: fixed,     threshold: 0.2}          # a calibrated-risk cut as is
+    {name: legacy,    raw_threshold: 0.5}      # the old ``proba >= 0.5`` rule, unchanged
+
+A ``raw_threshold`` point is applied to the raw probability: the isotonic
+map is a step function, so no cut on the calibrated scale reproduces
+``proba >= 0.5`` when 0.5 falls inside a flat step. Its ``thresholds`` entry
+(the calibrated risk at the cut) is informational.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("model_pipeline")
+
+_CLIP = 1e-6
+
+
+class Calibration:
+    """Raw probability → calibrated risk (piecewise linear) + named risk thresholds."""
+
+    def __init__(self, knots, values, thresholds: Dict[str, float], default: str, method: str = "isotonic",
+                 report: Optional[Dict[str, Any]] = None, raw_thresholds: Optional[Dict[str, float]] = None):
+        self.knots = np.asarray(knots, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.thresholds = {k: float(v) for k, v in thresholds.items()}
+        # policies decided on the raw probability (``raw_threshold`` operating points)
+        self.raw_thresholds = {k: float(v) for k, v in (raw_thresholds or {}).items()}
+        self.default = default
+        self.method = method
+        self.report = report or {}
+
+    def risk(self, proba) -> np.ndarray:
+        return np.interp(proba, self.knots, self.values)
+
+    def threshold(self, policy: Optional[str] = None) -> float:
+        """Risk cut of ``policy`` (default: ``default``); ValueError for an unknown name."""
+        name = policy or self.default
+        if name not in self.thresholds:
+            raise ValueError(f"Unknown policy '{name}' (available: {sorted(self.thresholds)})")
+        return self.thresholds[name]
+
+    def flags(self, proba, policy: Optional[str] = None) -> np.ndarray:
+        """Rows flagged positive by ``policy``; ValueError for an unknown name."""
+        threshold = self.threshold(policy)
+        name = policy or self.default
+        if name in self.raw_thresholds:
+            return np.asarray(proba) >= self.raw_thresholds[name]
+        return self.risk(proba) >= threshold
+
+    # ------------------------------------------------------------------ #
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "knots": self.knots.tolist(),
+            "values": self.values.tolist(),
+            "thresholds": self.thresholds,
+            "raw_thresholds": self.raw_thresholds,
+            "default": self.default,
+            "report": self.report,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Calibration":
+        return cls(d["knots"], d["values"], d["thresholds"], d["default"], d.get("method", "isotonic"),
+                   d.get("report"), d.get("raw_thresholds"))
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Calibration":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+# ---------------------------------------------------------------------- #
+# Fitting (training time)
+# ---------------------------------------------------------------------- #
+def _isotonic(proba: np.ndarray, y: np.ndarray):
+    from sklearn.isotonic import IsotonicRegression
+
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(proba, y)
+    # IsotonicRegression.predict interpolates linearly between these, as np.interp does
+    return iso.X_thresholds_, iso.y_thresholds_
+
+
+def _platt(proba: np.ndarray, y: np.ndarray, n_points: int):
+    from sklearn.linear_model import LogisticRegression
+
+    p = np.clip(proba, _CLIP, 1 - _CLIP)
+    logit = np.log(p / (1 - p)).reshape(-1, 1)
+    lr = LogisticRegression(C=1e6).fit(logit, y)
+    # tabulated where the scores are dense; np.interp clips beyond the ends
+    knots = np.unique(np.concatenate([[0.0, 1.0], np.quantile(proba, np.linspace(0, 1, n_points))]))
+    k = np.clip(knots, _CLIP, 1 - _CLIP)
+    values = 1.0 / (1.0 + np.exp(-(lr.coef_[0, 0] * np.log(k / (1 - k)) + lr.intercept_[0])))
+    return knots, values
+
+
+def _cut(risk: np.ndarray, y: np.ndarray, spec: Dict[str, Any], calibrate) -> float:
+    """Risk threshold of one operating point (rows are flagged when ``risk >= threshold``, see ``Calibration.flags``)."""
+    if "threshold" in spec:
+        return float(spec["threshold"])
+    if "raw_threshold" in spec:
+        return float(calibrate(float(spec["raw_threshold"])))
+
+    order = np.argsort(-risk, kind="stable")
+    r, hits = risk[order], np.cumsum(y[order])
+    # candidate cuts at the end of each run of tied scores
+    ends = np.flatnonzero(np.append(r[1:] != r[:-1], True))
+    recall = hits[ends] / max(hits[-1], 1)
+    precision = hits[ends] / (ends + 1)
+    if "target_recall" in spec:
+        ok = np.flatnonzero(recall >= float(spec["target_recall"]))
+        return float(r[ends[ok[0]]]) if len(ok) else float(r[-1])
+    if "target_precision" in spec:
+        ok = np.flatnonzero(precision >= float(spec["target_precision"]))
+        if not len(ok):
+            logger.warning(f"Operating point '{spec['name']}': no cut reaches precision {spec['target_precision']}")
+            return float(r[0])
+        return float(r[ends[ok[-1]]])
+    raise ValueError(f"Operating point '{spec.get('name')}' needs threshold, raw_threshold, "
+                     f"target_recall or target_precision")
+
+
+def _point_report(flagged: np.ndarray, y: np.ndarray, threshold: float) -> Dict[str, float]:
+    tp = int((flagged & (y == 1)).sum())
+    return {
+        "threshold": round(threshold, 6),
+        "recall": round(tp / max(int(y.sum()), 1), 4),
+        "precision": round(tp / max(int(flagged.sum()), 1), 4),
+        "alert_rate": round(float(flagged.mean()), 4),
+    }
+
+
+def fit_calibration(proba, y, cfg: Dict[str, Any]) -> Calibration:
+    """
+    Fit the ``model.calibration`` map on held-out, non-resampled rows
+    (raw positive-class probabilities ``proba``, 0/1 labels ``y``) and
+    resolve its operating points on them.
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+    method = cfg.get("method", "isotonic")
+    if method == "isotonic":
+        knots, values = _isotonic(proba, y)
+    elif method == "platt":
+        knots, values = _platt(proba, y, int(cfg.get("n_points", 200)))
+    else:
+        raise ValueError(f"Unknown calibration method '{method}' (isotonic | platt)")
+
+    def calibrate(p):
+        return np.interp(p, knots, values)
+
+    risk = calibrate(proba)
+    points: List[Dict[str, Any]] = cfg.get("operating_points") or [{"name": "default", "raw_threshold": 0.5}]
+    thresholds = {p["name"]: _cut(risk, y, p, calibrate) for p in points}
+    raw_thresholds = {p["name"]: float(p["raw_threshold"]) for p in points
+                      if "raw_threshold" in p and "threshold" not in p}
+    default = cfg.get("default_policy") or points[0]["name"]
+    if default not in thresholds:
+        raise ValueError(f"model.calibration.default_policy '{default}' is not an operating point")
+    calibration = Calibration(knots, values, thresholds, default, method, raw_thresholds=raw_thresholds)
+
+    report = {
+        "method": method,
+        "n_rows": int(len(y)),
+        "n_knots": int(len(knots)),
+        "prevalence": round(float(y.mean()), 4),
+        "mean_raw_proba": round(float(proba.mean()), 4),
+        "brier_raw": round(float(np.mean((proba - y) ** 2)), 5),
+        "brier_calibrated": round(float(np.mean((risk - y) ** 2)), 5),
+        "default_policy": default,
+        "operating_points": {name: _point_report(calibration.flags(proba, name), y, t) for name, t in thresholds.items()},
+    }
+    logger.info(f"Calibrated ({method}, {len(knots)} knots): Brier {report['brier_raw']} → "
+                f"{report['brier_calibrated']}, prevalence {report['prevalence']}")
+    calibration.report = report
+    return calibration
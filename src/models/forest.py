@@ -0,0 +1,231 @@
+"""
+Gradient-boosted trees compiled to flat node tables, evaluated with NumPy.
+
+``compile_forest`` flattens a LightGBM or XGBoost binary classifier (sklearn
+wrapper, ``BoosterClassifier`` or bare booster) into one set of arrays over
+the nodes of all trees:
+
+    feature       int32    split feature (0 at leaves)
+    threshold     float64  rows go left when ``x <= threshold``
+    left, right   int32    child node indices; a leaf points at itself
+    default_left  bool     direction of missing values
+    missing       int8     what counts as missing: ``NAN``, ``ZERO``
+                           (LightGBM zero-as-missing) or ``NONE`` (NaN read as 0)
+    value         float64  leaf output (0 at inner nodes)
+    roots         int32    first node of each tree
+
+``CompiledForest.predict_margin`` puts every row at every root and moves all
+(row, tree) pairs down one level per step, ``max_depth`` steps in total: no
+per-row Python and none of the wrapper's input validation, DataFrame
+conversion or thread-pool setup. XGBoost's float32 ``x < split`` is stored
+as ``x <= nextafter(split, -inf)``, so both libraries share the ``<=`` rule
+and the comparison stays exact.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.models.bundle import read_bundle, write_bundle
+
+logger = logging.getLogger("model_pipeline")
+
+FOREST_VERSION = 1
+NONE, ZERO, NAN = 0, 1, 2
+_LGB_MISSING = {"None": NONE, "Zero": ZERO, "NaN": NAN}
+_ZERO_THRESHOLD = 1e-35  # LightGBM's kZeroThreshold
+_CHUNK_ROWS = 4096
+
+_ARRAYS = ("feature", "threshold", "left", "right", "default_left", "missing", "value", "roots")
+
+
+class CompiledForest:
+    """``predict_proba`` over flattened trees: sigmoid(``sigmoid`` * (Σ leaves + ``base_margin``))."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], base_margin: float, sigmoid: float, max_depth: int,
+                 source: str):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.base_margin = float(base_margin)
+        self.sigmoid = float(sigmoid)
+        self.max_depth = int(max_depth)
+        self.source = source
+        self.n_trees = len(self.roots)
+        self._zero_missing = bool((self.missing == ZERO).any())
+
+    # ------------------------------------------------------------------ #
+    def predict_margin(self, X) -> np.ndarray:
+        # float32 first: the values the native libraries see for a serving matrix
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        out = np.empty(len(X))
+        for lo in range(0, len(X), _CHUNK_ROWS):
+            out[lo:lo + _CHUNK_ROWS] = self._margin(X[lo:lo + _CHUNK_ROWS])
+        return out
+
+    def _margin(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        plain = not self._zero_missing and not np.isnan(X).any()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            if plain:
+                go_left = x <= self.threshold[node]
+            else:
+                m = self.missing[node]
+                nan = np.isnan(x)
+                x = np.where(nan & (m != NAN), 0.0, x)
+                missing = np.where(m == NAN, nan, (m == ZERO) & (np.abs(x) <= _ZERO_THRESHOLD))
+                go_left = np.where(missing, self.default_left[node], x <= self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1) + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_margin(X)))
+        return np.column_stack([1 - p, p])
+
+    # ------------------------------------------------------------------ #
+    def save(self, path: str):
+        meta = {"version": FOREST_VERSION, "base_margin": self.base_margin, "sigmoid": self.sigmoid,
+                "max_depth": self.max_depth, "source": self.source}
+        write_bundle(path, "model/forest", meta, {name: getattr(self, name) for name in _ARRAYS})
+
+    @classmethod
+    def load(cls, path: str, verify: bool = True) -> "CompiledForest":
+        """Node tables stay read-only views into the memory-mapped file."""
+        kind, meta, arrays = read_bundle(path, verify)
+        if kind != "model/forest" or meta.get("version") != FOREST_VERSION:
+            raise ValueError(f"{path} is not a version {FOREST_VERSION} compiled forest")
+        return cls(arrays, meta["base_margin"], meta["sigmoid"], meta["max_depth"], meta["source"])
+
+
+# ---------------------------------------------------------------------- #
+# Flattening
+# ---------------------------------------------------------------------- #
+class _Nodes:
+    def __init__(self):
+        self.columns: Dict[str, List] = {name: [] for name in _ARRAYS if name != "roots"}
+        self.roots: List[int] = []
+        self.max_depth = 0
+
+    def add(self, feature=0, threshold=0.0, default_left=False, missing=NAN, value=0.0) -> int:
+        i = len(self.columns["feature"])
+        for name, v in (("feature", feature), ("threshold", threshold), ("left", i), ("right", i),
+                        ("default_left", default_left), ("missing", missing), ("value", value)):
+            self.columns[name].append(v)
+        return i
+
+    def link(self, i: int, left: int, right: int):
+        self.columns["left"][i], self.columns["right"][i] = left, right
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        dtypes = {"feature": np.int32, "threshold": np.float64, "left": np.int32, "right": np.int32,
+                  "default_left": np.bool_, "missing": np.int8, "value": np.float64}
+        out = {name: np.asarray(v, dtype=dtypes[name]) for name, v in self.columns.items()}
+        out["roots"] = np.asarray(self.roots, dtype=np.int32)
+        return out
+
+
+def _lightgbm(booster) -> CompiledForest:
+    dump = booster.dump_model()
+    objective = dump.get("objective", "").split()
+    if not objective or objective[0] != "binary":
+        raise NotImplementedError(f"LightGBM objective '{dump.get('objective')}' is not binary")
+    if dump.get("average_output"):
+        raise NotImplementedError("LightGBM random-forest mode (average_output) is not supported")
+    sigmoid = next((float(t.split(":", 1)[1]) for t in objective[1:] if t.startswith("sigmoid:")), 1.0)
+
+    nodes = _Nodes()
+    for tree in dump["tree_info"]:
+        stack = [(tree["tree_structure"], None, 0)]
+        while stack:
+            n, parent, depth = stack.pop()
+            if "leaf_value" in n:
+                i = nodes.add(value=n["leaf_value"])
+            else:
+                if n.get("decision_type", "<=") != "<=":
+                    raise NotImplementedError("LightGBM categorical splits are not supported")
+                i = nodes.add(n["split_feature"], n["threshold"], n["default_left"], _LGB_MISSING[n["missing_type"]])
+                # children are pushed right, then left: the left one is added (and linked) first
+                stack.append((n["right_child"], (i, "right"), depth + 1))
+                stack.append((n["left_child"], (i, "left"), depth + 1))
+            nodes.max_depth = max(nodes.max_depth, depth)
+            if parent is None:
+                nodes.roots.append(i)
+            else:
+                nodes.columns[parent[1]][parent[0]] = i
+    return CompiledForest(nodes.arrays(), 0.0, sigmoid, nodes.max_depth, "lightgbm")
+
+
+def _xgboost(booster) -> CompiledForest:
+    learner = json.loads(bytes(booster.save_raw("json")))["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in ("binary:logistic", "reg:logistic"):
+        raise NotImplementedError(f"XGBoost objective '{objective}' is not supported")
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise NotImplementedError(f"XGBoost booster '{gbm['name']}' is not supported")
+    # "5E-1" (2.x) or "[5E-1]" (3.x), in probability space for logistic objectives
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]").split(",")[0])
+
+    nodes = _Nodes()
+    for tree in gbm["model"]["trees"]:
+        left, right = tree["left_children"], tree["right_children"]
+        if any(tree.get("split_type", [])):
+            raise NotImplementedError("XGBoost categorical splits are not supported")
+        split = np.asarray(tree["split_conditions"], dtype=np.float32)
+        below = np.nextafter(split, np.float32(-np.inf))
+        offset = len(nodes.columns["feature"])
+        depth = np.zeros(len(left), dtype=np.int64)
+        for i in range(len(left)):
+            if left[i] == -1:
+                nodes.add(value=float(split[i]))  # leaves keep their weight in split_conditions
+            else:
+                nodes.add(tree["split_indices"][i], float(below[i]), bool(tree["default_left"][i]), NAN)
+        for i in range(len(left)):
+            if left[i] != -1:
+                nodes.link(offset + i, offset + left[i], offset + right[i])
+                depth[left[i]] = depth[right[i]] = depth[i] + 1
+        nodes.roots.append(offset)
+        nodes.max_depth = max(nodes.max_depth, int(depth.max()))
+    return CompiledForest(nodes.arrays(), float(np.log(base_score / (1 - base_score))), 1.0, nodes.max_depth,
+                          "xgboost")
+
+
+def _native(model: Any) -> Tuple[str, Any]:
+    from src.models.streaming import BoosterClassifier
+
+    if isinstance(model, BoosterClassifier):
+        return model.kind, model.booster
+    module = type(model).__module__.split(".")[0]
+    if module == "lightgbm":
+        return module, getattr(model, "booster_", model)
+    if module == "xgboost":
+        return module, model.get_booster() if hasattr(model, "get_booster") else model
+    raise NotImplementedError(f"{type(model).__name__} is not a LightGBM / XGBoost model")
+
+
+def compilable(model: Any) -> bool:
+    try:
+        _native(model)
+    except NotImplementedError:
+        return False
+    return True
+
+
+def compile_forest(model: Any) -> CompiledForest:
+    kind, booster = _native(model)
+    forest = _lightgbm(booster) if kind == "lightgbm" else _xgboost(booster)
+    logger.info(f"Compiled {kind} model: {forest.n_trees} trees, {len(forest.feature)} nodes, "
+                f"depth {forest.max_depth}")
+    return forest
+
+
+def max_difference(forest: CompiledForest, model: Any, X) -> float:
+    """Largest |probability difference| between ``forest`` and ``model.predict_proba`` on ``X``."""
+    import pandas as pd
+
+    X32 = np.asarray(X, dtype=np.float32)
+    native = pd.DataFrame(X32, columns=X.columns) if hasattr(X, "columns") else X32
+    expected = np.asarray(model.predict_proba(native))[:, 1]
+    return float(np.max(np.abs(forest.predict_proba(X32)[:, 1] - expected), initial=0.0))
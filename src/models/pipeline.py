@@ -0,0 +1,137 @@
+"""
+Content-addressed training stages.
+
+A stage's key hashes its upstream keys, its config section and the source
+of the modules implementing it, so every key is known before anything runs.
+Stages are materialised lazily from the end of the DAG: a stage found in the
+``ArtifactCache`` is loaded and nothing upstream of it runs at all.
+"""
+import hashlib
+import inspect
+import logging
+import os
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.models.cache import ArtifactCache, content_hash
+
+logger = logging.getLogger("model_pipeline")
+
+
+def code_version(*modules: ModuleType) -> str:
+    """Digest of the source files of ``modules``."""
+    h = hashlib.sha256()
+    for module in modules:
+        with open(inspect.getsourcefile(module), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:20]
+
+
+class Stage:
+    def __init__(self, name: str, compute: Callable, deps: List["Stage"], key: str, persist: bool, forced: bool):
+        self.name = name
+        self.compute = compute
+        self.deps = deps
+        self.key = key
+        self.persist = persist
+        self.forced = forced
+        # stages computed together (e.g. every model fit in one pool wave)
+        self.group: Optional[List["Stage"]] = None
+
+
+class StagePipeline:
+    """
+    Stage DAG over an ``ArtifactCache``. ``force`` names stages to rerun
+    (``"all"``, a stage name, or a prefix such as ``"fit"`` for every
+    ``fit-<model>``); stages downstream of a forced one rerun too.
+    """
+
+    def __init__(self, cache: ArtifactCache, force: Iterable[str] = ()):
+        self.cache = cache
+        self.force = set(force)
+        self.stages: Dict[str, Stage] = {}
+        self.report: Dict[str, Dict[str, Any]] = {}
+        self._values: Dict[str, Any] = {}
+
+    def _forced(self, name: str) -> bool:
+        return bool({"all", name, name.split("-", 1)[0]} & self.force)
+
+    def add(self, name: str, compute: Callable, deps: Iterable[Stage] = (), params: Any = None,
+            code: Iterable[ModuleType] = (), key: Optional[str] = None, persist: bool = True) -> Stage:
+        """Register ``compute(*dep_values)``; ``key`` overrides the derived one (e.g. a content hash)."""
+        deps = list(deps)
+        if key is None:
+            key = content_hash(name, [d.key for d in deps], params, code_version(*code))
+        stage = Stage(name, compute, deps, key, persist, self._forced(name) or any(d.forced for d in deps))
+        self.stages[name] = stage
+        return stage
+
+    def add_group(self, params: Dict[str, Any], compute_many: Callable, deps: Iterable[Stage] = (),
+                  code: Iterable[ModuleType] = ()) -> Dict[str, Stage]:
+        """
+        One stage per ``params`` entry, cached separately but computed
+        together: ``compute_many(names_to_compute, *dep_values)`` returns
+        {name: value} for the members that missed the cache.
+        """
+        deps = list(deps)
+        group = [self.add(name, compute_many, deps, p, code) for name, p in params.items()]
+        for stage in group:
+            stage.group = group
+        return {stage.name: stage for stage in group}
+
+    # ------------------------------------------------------------------ #
+    def get(self, stage: Stage) -> Any:
+        """Value of ``stage``: cached, or computed after its dependencies."""
+        if stage.name in self._values:
+            return self._values[stage.name]
+
+        group = stage.group or [stage]
+        todo = [s for s in group if s.name not in self._values and not self._load(s)]
+        if todo:
+            inputs = [self.get(d) for d in stage.deps]
+            start = time.perf_counter()
+            if stage.group is None:
+                values = {stage.name: stage.compute(*inputs)}
+            else:
+                values = stage.compute([s.name for s in todo], *inputs)
+            seconds = time.perf_counter() - start
+            for s in todo:
+                self._values[s.name] = values[s.name]
+                if s.persist:
+                    self.cache.put(f"stage-{s.name}", s.key, values[s.name])
+                self._record(s, "forced" if s.forced else "run", seconds)
+        return self._values[stage.name]
+
+    def _load(self, stage: Stage) -> bool:
+        if not stage.persist or stage.forced:
+            return False
+        start = time.perf_counter()
+        value = self.cache.get(f"stage-{stage.name}", stage.key)
+        if value is None:
+            return False
+        self._values[stage.name] = value
+        self._record(stage, "hit", time.perf_counter() - start)
+        return True
+
+    def _record(self, stage: Stage, status: str, seconds: float):
+        self.report[stage.name] = {"status": status, "seconds": round(seconds, 3), "key": stage.key}
+        logger.info(f"Stage {stage.name}: {status} ({seconds:.2f}s)")
+
+    # ------------------------------------------------------------------ #
+    def publish(self, name: str, key: str, path: str, write: Callable[[], None]) -> bool:
+        """Run ``write`` unless ``path`` already holds the artefact with ``key``."""
+        deployed = self.cache.deployed()
+        if deployed.get(name) == key and os.path.exists(path):
+            return False
+        write()
+        deployed[name] = key
+        self.cache.set_deployed(deployed)
+        return True
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-stage status (hit / run / forced / skipped) and wall time, in registration order."""
+        return [
+            {"stage": name} | self.report.get(name, {"status": "skipped", "seconds": 0.0, "key": stage.key})
+            for name, stage in self.stages.items()
+        ]
@@ -0,0 +1,130 @@
+"""
+Out-of-core training: LightGBM / XGBoost fitted from an on-disk
+``FeatureMatrix`` in row batches instead of an in-memory frame.
+
+LightGBM builds its binned ``Dataset`` from a ``lightgbm.Sequence`` over the
+memory-mapped matrix; XGBoost uses a ``DataIter`` with a ``cache_prefix``,
+i.e. its external-memory ``DMatrix``. Neither ever holds the raw float
+matrix in memory.
+"""
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.matrix import FeatureMatrix, FeatureMatrixWriter
+
+logger = logging.getLogger("model_pipeline")
+
+# ``model.models`` classes that have an out-of-core fit
+STREAMING_KINDS = {"lightgbm.LGBMClassifier": "lightgbm", "xgboost.XGBClassifier": "xgboost"}
+
+
+class BoosterClassifier:
+    """``predict_proba`` over a native booster, so streamed fits are served like the in-memory ones."""
+
+    def __init__(self, booster: Any, kind: str, feature_names):
+        self.booster = booster
+        self.kind = kind
+        self.feature_names = list(feature_names)
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if self.kind == "xgboost":
+            import xgboost as xgb
+
+            p = self.booster.predict(xgb.DMatrix(X))
+        else:
+            p = self.booster.predict(X)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+    def predict_contrib(self, X) -> np.ndarray:
+        """Tree SHAP log-odds contributions per feature, bias last."""
+        X = np.asarray(X, dtype=np.float32)
+        if self.kind == "xgboost":
+            import xgboost as xgb
+
+            return np.asarray(self.booster.predict(xgb.DMatrix(X), pred_contribs=True), dtype=np.float64)
+        return np.asarray(self.booster.predict(X, pred_contrib=True), dtype=np.float64)
+
+
+def write_split(
+    chunks: Iterable[Tuple[pd.DataFrame, pd.Series]],
+    root: str,
+    encode: Callable[[pd.Series], np.ndarray],
+    test_size: float,
+    seed: int = 42,
+) -> Tuple[FeatureMatrix, FeatureMatrix]:
+    """Stream encoded chunks into ``<root>/train`` and ``<root>/test``, each row held out with p=``test_size``."""
+    rng = np.random.default_rng(seed)
+    with FeatureMatrixWriter(os.path.join(root, "train")) as train, \
+            FeatureMatrixWriter(os.path.join(root, "test")) as test:
+        for X, y in chunks:
+            held_out = rng.random(len(X)) < test_size
+            y_num = encode(y)
+            train.append(X[~held_out], y_num[~held_out])
+            test.append(X[held_out], y_num[held_out])
+    return FeatureMatrix(train.root), FeatureMatrix(test.root)
+
+
+def _native_params(params: Dict[str, Any], kind: str, n_jobs: int) -> Tuple[Dict[str, Any], int]:
+    """sklearn-style ``model.models`` params → (native booster params, boosting rounds)."""
+    params = dict(params)
+    rounds = int(params.pop("n_estimators", 100))
+    params["seed"] = params.pop("random_state", 42)
+    params.pop("n_jobs", None)
+    if kind == "lightgbm":
+        params.update(objective="binary", num_threads=max(0, n_jobs), verbose=-1)
+    else:
+        params.update(objective="binary:logistic", nthread=max(0, n_jobs))
+        params.setdefault("tree_method", "hist")  # external memory needs hist / approx
+    return params, rounds
+
+
+def fit_booster(kind: str, train: FeatureMatrix, params: Dict[str, Any], n_jobs: int,
+                batch_rows: int, scale_pos_weight: float) -> BoosterClassifier:
+    params, rounds = _native_params(params, kind, n_jobs)
+    params.setdefault("scale_pos_weight", scale_pos_weight)
+
+    if kind == "lightgbm":
+        import lightgbm as lgb
+
+        class _Rows(lgb.Sequence):
+            batch_size = batch_rows
+
+            def __getitem__(self, idx):
+                # Dataset construction only accepts float64 rows; cast one batch at a time
+                return np.asarray(train.X[idx], dtype=np.float64)
+
+            def __len__(self):
+                return len(train)
+
+        dataset = lgb.Dataset(_Rows(), label=np.asarray(train.y, dtype=np.float32), params={"verbose": -1})
+        booster = lgb.train(params, dataset, num_boost_round=rounds)
+    else:
+        import xgboost as xgb
+
+        class _Batches(xgb.DataIter):
+            def __init__(self):
+                self._lo = 0
+                super().__init__(cache_prefix=os.path.join(os.path.dirname(train.root), "xgb-cache"))
+
+            def next(self, input_data):
+                if self._lo >= len(train):
+                    return 0
+                hi = min(self._lo + batch_rows, len(train))
+                input_data(data=np.asarray(train.X[self._lo:hi]), label=np.asarray(train.y[self._lo:hi]))
+                self._lo = hi
+                return 1
+
+            def reset(self):
+                self._lo = 0
+
+        booster = xgb.train(params, xgb.DMatrix(_Batches()), num_boost_round=rounds)
+
+    return BoosterClassifier(booster, kind, train.feature_names)
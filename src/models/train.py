@@ -1,21 +1,22 @@
 """
 Model training & evaluation.
 """
+import importlib
 import logging
-import logging.config
+import math
 import os
-from typing import Dict, Tuple
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import joblib
-import lightgbm as lgb
 import numpy as np
 import pandas as pd
-import xgboost as xgb
-import yaml
 from imblearn.over_sampling import SMOTE
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
 from sklearn.metrics import (
+    get_scorer,
     classification_report,
     roc_auc_score,
     accuracy_score,
@@ -23,12 +24,110 @@ from sklearn.metrics import (
     recall_score,
     f1_score,
 )
-from sklearn.model_selection import StratifiedKFold, train_test_split, cross_val_score
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, train_test_split, cross_val_score
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler
+from threadpoolctl import threadpool_limits
+
+from src.data.preprocessing import load_config, setup_logging
+from src.models.bundle import save_model_bundle
+from src.models.calibration import Calibration, fit_calibration
+from src.models.forest import compilable, compile_forest, max_difference
+from src.models.cache import ArtifactCache, content_hash
+from src.models.pipeline import Stage, StagePipeline, code_version
+from src.models.streaming import STREAMING_KINDS, fit_booster, write_split
+from src.monitoring.drift import build_reference, save_reference
 
 logger = logging.getLogger("model_pipeline")
 
+SPLIT_CONFIG = {
+    "smote": {"sampling_strategy": "minority", "random_state": 42},
+    "test_size": 0.2,
+    "random_state": 42,
+}
+
+
+# ---------------------------------------------------------------------- #
+# Process-pool workers: the split is handed over once per worker (inherited
+# on fork) instead of being pickled with every task.
+# ---------------------------------------------------------------------- #
+_SPLIT: Dict[str, Any] = {}
+
+
+def _init_worker(X_train, X_test, y_train, y_test):
+    _SPLIT.update(X_train=X_train, X_test=X_test, y_train=y_train, y_test=y_test)
+
+
+def _set_n_jobs(model, n_threads: int):
+    params = {k: n_threads for k in model.get_params() if k == "n_jobs" or k.endswith("__n_jobs")}
+    if params:
+        model.set_params(**params)
+
+
+def _fit_and_score(name: str, model, n_threads: int):
+    """Fit one model on the shared split within ``n_threads`` CPUs."""
+    start = time.perf_counter()
+    _set_n_jobs(model, n_threads)
+    with threadpool_limits(limits=n_threads):
+        model.fit(_SPLIT["X_train"], _SPLIT["y_train"])
+        y_pred = model.predict(_SPLIT["X_test"])
+        y_proba = model.predict_proba(_SPLIT["X_test"])[:, 1]
+
+    metrics = _holdout_metrics(_SPLIT["y_test"], y_pred, y_proba)
+    return name, model, metrics, time.perf_counter() - start
+
+
+def _holdout_metrics(y_test, y_pred, y_proba) -> Dict[str, float]:
+    return {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred),
+        "recall": recall_score(y_test, y_pred),
+        "f1": f1_score(y_test, y_pred),
+        "roc_auc": roc_auc_score(y_test, y_proba),
+    }
+
+
+def _take(X, idx: np.ndarray):
+    return X.iloc[idx] if isinstance(X, (pd.DataFrame, pd.Series)) else X[idx]
+
+
+def _score_fold(model, train_idx: np.ndarray, val_idx: np.ndarray, n_threads: int, scoring: str):
+    """Fit a fresh copy of ``model`` on one CV fold of the training split."""
+    model = clone(model)
+    _set_n_jobs(model, n_threads)
+    X, y = _SPLIT["X_train"], _SPLIT["y_train"]
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_threads):
+        model.fit(_take(X, train_idx), _take(y, train_idx))
+        fit_seconds = time.perf_counter() - start
+        score = get_scorer(scoring)(model, _take(X, val_idx), _take(y, val_idx))
+    return float(score), fit_seconds
+
+
+class _TaskRunner:
+    """Runs ``(fn, *args)`` tasks in the training process pool, or inline for one worker."""
+
+    def __init__(self, workers: int, split: tuple):
+        self.workers = workers
+        self.split = split
+        self._pool = None
+
+    def __enter__(self):
+        _init_worker(*self.split)  # the parent also reads the split (fold indices)
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=self.split)
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def run(self, tasks: List[tuple]) -> List[Any]:
+        if self._pool is None:
+            return [fn(*args) for fn, *args in tasks]
+        futures = [self._pool.submit(fn, *args) for fn, *args in tasks]
+        return [f.result() for f in futures]
+
 
 class ModelTrainer:
     # ------------------------------------------------------------------ #
@@ -39,82 +138,466 @@ class ModelTrainer:
         self.label_encoder = LabelEncoder()
         self.best_model = None
         self.best_model_name = None
+        self.calibration = None
+
+        train_cfg = self.config["model"].get("training", {})
+        self.cache = ArtifactCache(train_cfg.get("cache_dir", "models/.cache"), train_cfg.get("cache", True))
 
     # ------------------------------------------------------------------ #
     def _load_config(self, path: str) -> Dict:
-        with open(path, "r") as f:
-            return yaml.safe_load(f)
+        return load_config(path)
 
     def _setup_logging(self):
-        with open("config/logging.yaml", "r") as f:
-            logging.config.dictConfig(yaml.safe_load(f))
+        setup_logging()
 
     # ------------------------------------------------------------------ #
     def train_models(self, X: pd.DataFrame, y: pd.Series) -> Dict:
+        """Resample, fit and evaluate ``(X, y)``; stages with unchanged inputs load from the cache."""
+        pipeline = StagePipeline(self.cache)
+        data = pipeline.add("data", lambda: (X, y), key=content_hash(X, y), persist=False)
+        return self.run_stages(pipeline, data)
+
+    def run_stages(self, pipeline: StagePipeline, data: Stage,
+                   before_publish: Optional[Callable[[], None]] = None) -> Dict:
+        """
+        Add ``resample`` → ``fit-<model>`` → ``evaluate`` on top of ``data``
+        (a stage whose value starts with ``X, y``), run them and publish
+        every model whose file on disk is not already that exact fit.
+        ``before_publish`` runs once every model is fitted, before any model
+        file is written (e.g. to publish the preprocessor they were fitted on).
+        """
         logger.info("=== Training models ===")
+        models = self._build_models()
+        code = [sys.modules[__name__], sys.modules[fit_calibration.__module__]]
+        search_cfg = self.config["model"].get("search", {})
+        cv = {k: self.config["model"].get(k) for k in ("cv_folds", "scoring")}
+        calibration = self.config["model"].get("calibration", {})
 
-        y_num = self.label_encoder.fit_transform(y)
+        resample = pipeline.add("resample", self._resample, [data], params=SPLIT_CONFIG, code=code)
+        fit_params = {
+            f"fit-{name}": {
+                "class": type(model).__name__,
+                "params": self._params(model),
+                "cv": cv,
+                "calibration": calibration if calibration.get("enabled", True) else None,
+                "search": (
+                    {"space": spec["search_space"], **search_cfg}
+                    if search_cfg.get("enabled", False) and spec.get("search_space") else None
+                ),
+            }
+            for name, (model, spec) in models.items()
+        }
+        fits = pipeline.add_group(
+            fit_params, lambda names, resampled: self._fit_stage(names, resampled, models), [resample], code=code
+        )
+        evaluate = pipeline.add(
+            "evaluate", lambda *fitted: self._evaluate(list(models), fitted), list(fits.values()), persist=False
+        )
+        results = pipeline.get(evaluate)
+        if before_publish is not None:
+            before_publish()
 
-        sm = SMOTE(sampling_strategy="minority", random_state=42)
-        X_res, y_res = sm.fit_resample(X, y_num)
+        def save(name: str, stage: Stage):
+            model, _, label_encoder, calibration = pipeline.get(stage)
+            self._save_model(model, name, label_encoder, calibration)
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_res, y_res, test_size=0.2, random_state=42, stratify=y_res
-        )
+        # the forest is compiled at publish time, so its code versions the file, not the fit
+        forest_code = code_version(sys.modules[compile_forest.__module__])
+        for name in models:
+            stage = fits[f"fit-{name}"]
+            pipeline.publish(name, stage.key, f"models/{name}.joblib", lambda: save(name, stage))
+            if self._compiles(pipeline.get(stage)[0]):
+                # after the model, so the registry sees a forest at least as new as it
+                pipeline.publish(
+                    f"forest-{name}", f"{stage.key}:{forest_code}", f"models/{name}.forest",
+                    lambda: self._export_forest(pipeline.get(stage)[0], name, pipeline.get(resample)[1]),
+                )
 
-        models = {
-            "logistic_regression": Pipeline(
-                [("scaler", StandardScaler()), ("clf", LogisticRegression(max_iter=1000, random_state=42))]
+        # profile for online drift monitoring, on the real held-out rows as in streaming mode
+        drift_cfg = self.config.get("monitoring", {}).get("drift", {})
+        reference = pipeline.add(
+            "reference",
+            lambda r, *fitted: build_reference(
+                _take(r[1], np.flatnonzero(r[5])), list(r[1].columns), {n: f[0] for n, f in zip(models, fitted)},
+                max_rows=int(drift_cfg.get("reference_rows", 50_000)),
             ),
-            "random_forest": RandomForestClassifier(random_state=42),
-            "lightgbm": lgb.LGBMClassifier(random_state=42),
-            "xgboost": xgb.XGBClassifier(random_state=42),
-        }
+            [resample, *fits.values()], params={"rows": drift_cfg.get("reference_rows", 50_000)},
+            code=[sys.modules[build_reference.__module__]],
+        )
+        path = drift_cfg.get("reference_path", "models/drift_reference.json")
+        pipeline.publish("drift_reference", reference.key, path, lambda: save_reference(pipeline.get(reference), path))
+        return results
+
+    # ------------------------------------------------------------------ #
+    # Stage bodies
+    # ------------------------------------------------------------------ #
+    def _resample(self, data: tuple) -> tuple:
+        """
+        SMOTE + stratified train/test split → (X_train, X_test, y_train,
+        y_test, label encoder, mask of the ``X_test`` rows that are real
+        encounters rather than SMOTE samples).
+        """
+        X, y = data[0], data[1]
+        label_encoder = LabelEncoder()
+        y_num = label_encoder.fit_transform(y)
+
+        start = time.perf_counter()
+        X_res, y_res = SMOTE(**SPLIT_CONFIG["smote"]).fit_resample(X, y_num)
+        # split positions (same draw as splitting the arrays): SMOTE appends its
+        # synthetic rows after the originals, so position < len(X) marks a real row
+        train_idx, test_idx = train_test_split(
+            np.arange(len(y_res)), test_size=SPLIT_CONFIG["test_size"], random_state=SPLIT_CONFIG["random_state"],
+            stratify=y_res,
+        )
+        split = (_take(X_res, train_idx), _take(X_res, test_idx), y_res[train_idx], y_res[test_idx])
+        logger.info(f"SMOTE + split in {time.perf_counter() - start:.1f}s")
+        return (*split, label_encoder, test_idx < len(X))
+
+    def _fit_stage(self, names: List[str], resampled: tuple, models: Dict[str, Tuple[Any, Dict]]) -> Dict:
+        """
+        Search (optional), CV and holdout fit of the ``fit-<model>`` stages
+        that missed, as one pool wave, then the calibration of each fit on
+        the real (non-SMOTE) test rows.
+        """
+        split, label_encoder, real = resampled[:4], resampled[4], resampled[5]
+        todo = {name[len("fit-"):]: models[name[len("fit-"):]] for name in names}
+        workers, per_model = self._cpu_plan(len(todo))
+
+        with _TaskRunner(workers, split) as runner:
+            # optional hyper-parameter search; its result fixes the params fitted below
+            searches: Dict[str, Dict] = {}
+            if self.config["model"].get("search", {}).get("enabled", False):
+                for name, (model, spec) in todo.items():
+                    if spec.get("search_space"):
+                        searches[name] = self._search(runner, name, model, spec, per_model)
+                        model.set_params(**searches[name]["best_params"])
+
+            logger.info(f"Fitting {list(todo)} with {workers} worker(s) x {per_model} thread(s)")
+            fitted = self._fit_and_validate(runner, {n: m for n, (m, _) in todo.items()}, searches, per_model)
 
+        X_cal, y_cal = _take(split[1], np.flatnonzero(real)), np.asarray(split[3])[real]
+        out = {}
+        for name, (model, metrics) in fitted.items():
+            calibration = self._calibrate(model.predict_proba(X_cal)[:, 1], y_cal)
+            if calibration is not None:
+                metrics["calibration"] = calibration.report
+            out[f"fit-{name}"] = (model, metrics, label_encoder, calibration)
+        return out
+
+    def _calibrate(self, proba: np.ndarray, y: np.ndarray):
+        """``model.calibration`` fitted on held-out, non-resampled rows (None when disabled)."""
+        cfg = self.config["model"].get("calibration", {})
+        if not cfg.get("enabled", True):
+            return None
+        return fit_calibration(proba, y, cfg)
+
+    def _evaluate(self, names: List[str], fitted: Tuple[tuple, ...]) -> Dict:
+        """Per-model metrics table; the best ROC-AUC becomes ``best_model``."""
         results = {}
-        for name, model in models.items():
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            y_proba = model.predict_proba(X_test)[:, 1]
-
-            metrics = {
-                "accuracy": accuracy_score(y_test, y_pred),
-                "precision": precision_score(y_test, y_pred),
-                "recall": recall_score(y_test, y_pred),
-                "f1": f1_score(y_test, y_pred),
-                "roc_auc": roc_auc_score(y_test, y_proba),
-            }
+        for name, (model, metrics, label_encoder, calibration) in zip(names, fitted):
             results[name] = metrics
-            logger.info(f"{name}: {metrics}")
+            logger.info(f"{name}: { {k: v for k, v in metrics.items() if not isinstance(v, dict)} }")
+            if self.best_model is None or metrics["roc_auc"] > results[self.best_model_name]["roc_auc"]:
+                self.best_model = model
+                self.best_model_name = name
+                self.label_encoder = label_encoder
+                self.calibration = calibration
+        return results
+
+    # ------------------------------------------------------------------ #
+    def train_streaming(self, chunks: Iterable[Tuple[pd.DataFrame, pd.Series]], classes: List[str],
+                        before_publish: Optional[Callable[[], None]] = None) -> Dict:
+        """
+        Out-of-core variant of ``train_models`` for data larger than RAM.
 
-            # save model & encoder
-            self._save_model(model, name)
+        ``chunks`` (e.g. ``DataPreprocessor.transform_chunks``) is written
+        once to on-disk train/test matrices under ``model.streaming.dir``;
+        the LightGBM / XGBoost entries of ``model.models`` are then fitted
+        from the training matrix in batches, other models are skipped.
+        SMOTE needs the whole frame in memory, so the class imbalance is
+        handled with ``scale_pos_weight`` instead; CV, the search and the
+        artefact cache stay in-memory features. ``before_publish`` is called
+        as in ``run_stages``, between the last fit and the first model file.
+        """
+        logger.info("=== Training models (streaming) ===")
+        cfg = self.config["model"].get("streaming", {})
+        batch_rows = int(cfg.get("batch_rows", 100_000))
+        n_jobs = int(self.config["model"].get("training", {}).get("n_jobs", -1))
 
-            # keep best
+        self.label_encoder.fit(list(classes))
+        train, test = write_split(
+            chunks, cfg.get("dir", "data/processed/streaming"), self.label_encoder.transform,
+            float(cfg.get("test_size", 0.2)),
+        )
+        if not len(train) or not len(test):
+            raise ValueError(f"Streaming split is empty ({len(train)} train / {len(test)} test rows)")
+        n_pos = int(train.y.sum())
+        scale_pos_weight = (len(train) - n_pos) / max(n_pos, 1)
+        logger.info(f"Feature matrix on disk: {len(train)} train / {len(test)} test rows, "
+                    f"scale_pos_weight {scale_pos_weight:.3f}")
+
+        results, fitted, calibrations = {}, {}, {}
+        for spec in self.config["model"]["models"]:
+            name, kind = spec["name"], STREAMING_KINDS.get(spec["class"])
+            if kind is None:
+                logger.warning(f"Skipping {name}: {spec['class']} has no out-of-core fit")
+                continue
+
+            start = time.perf_counter()
+            model = fit_booster(kind, train, spec.get("params") or {}, n_jobs, batch_rows, scale_pos_weight)
+            seconds = time.perf_counter() - start
+            logger.info(f"Fitted {name} in {seconds:.1f}s")
+
+            y_proba = np.concatenate([model.predict_proba(X)[:, 1] for X, _ in test.batches(batch_rows)])
+            y_test = np.asarray(test.y)
+            metrics = _holdout_metrics(y_test, (y_proba >= 0.5).astype(int), y_proba)
+            metrics["training"] = {
+                "fit_seconds": round(seconds, 3),
+                "streaming": {"n_train": len(train), "n_test": len(test), "scale_pos_weight": scale_pos_weight},
+            }
+            # no SMOTE here: the held-out rows have the real class balance
+            calibration = self._calibrate(y_proba, y_test)
+            if calibration is not None:
+                metrics["calibration"] = calibration.report
+            results[name] = metrics
+            logger.info(f"{name}: { {k: v for k, v in metrics.items() if not isinstance(v, dict)} }")
+
+            fitted[name], calibrations[name] = model, calibration
             if self.best_model is None or metrics["roc_auc"] > results[self.best_model_name]["roc_auc"]:
                 self.best_model = model
                 self.best_model_name = name
+                self.calibration = calibration
+
+        if not results:
+            raise ValueError("Streaming mode needs at least one LightGBM or XGBoost entry in model.models")
 
+        if before_publish is not None:
+            before_publish()
+        for name, model in fitted.items():
+            self._save_model(model, name, self.label_encoder, calibrations[name])
+            if self._compiles(model):
+                self._export_forest(model, name, test.X[:2_000])
+        drift_cfg = self.config.get("monitoring", {}).get("drift", {})
+        save_reference(
+            build_reference(test.X, test.feature_names, fitted, max_rows=int(drift_cfg.get("reference_rows", 50_000))),
+            drift_cfg.get("reference_path", "models/drift_reference.json"),
+        )
+        # the files on disk no longer hold the cached in-memory fits (models, their
+        # compiled forests) nor the in-memory drift reference
+        stale = set(results) | {f"forest-{name}" for name in results} | {"drift_reference"}
+        deployed = self.cache.deployed()
+        self.cache.set_deployed({k: v for k, v in deployed.items() if k not in stale})
         return results
 
     # ------------------------------------------------------------------ #
-    def _save_model(self, model, name: str):
+    def _build_models(self) -> Dict[str, Tuple[Any, Dict]]:
+        """Instantiate ``model.models`` from their class paths and params."""
+        models = {}
+        for spec in self.config["model"]["models"]:
+            module_name, cls_name = spec["class"].rsplit(".", 1)
+            cls = getattr(importlib.import_module(module_name), cls_name)
+            params = dict(spec.get("params") or {})
+            if "random_state" in cls().get_params():
+                params.setdefault("random_state", 42)
+            model = cls(**params)
+            if spec.get("scale", False):
+                model = Pipeline([("scaler", StandardScaler()), ("clf", model)])
+            models[spec["name"]] = (model, spec)
+        return models
+
+    def _cpu_plan(self, n_models: int) -> Tuple[int, int]:
+        """(pool workers, threads per task) within ``model.training`` CPU budget."""
+        train_cfg = self.config["model"].get("training", {})
+        budget = int(train_cfg.get("n_jobs", -1))
+        budget = (os.cpu_count() or 1) if budget <= 0 else budget
+        per_model = max(1, min(int(train_cfg.get("cpus_per_model", 2)), budget))
+        folds = max(1, int(self.config["model"].get("cv_folds", 0)))
+        return max(1, min(n_models * folds, budget // per_model)), per_model
+
+    @staticmethod
+    def _params(model) -> Dict[str, Any]:
+        return {
+            k: v for k, v in model.get_params().items()
+            if not hasattr(v, "get_params") and k != "steps" and not k.endswith("n_jobs")
+        }
+
+    # ------------------------------------------------------------------ #
+    def _cv_splits(self, n_folds: int, idx: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        y = np.asarray(_SPLIT["y_train"])[idx]
+        skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+        return [(idx[tr], idx[va]) for tr, va in skf.split(np.zeros(len(idx)), y)]
+
+    def _fit_and_validate(self, runner: _TaskRunner, models: Dict[str, Any], searches: Dict[str, Dict],
+                          per_model: int) -> Dict:
+        """K-fold CV plus the final holdout fit for every model, as one wave of pool tasks."""
+        n_folds = int(self.config["model"].get("cv_folds", 0))
+        scoring = self.config["model"].get("scoring", "roc_auc")
+        folds = self._cv_splits(n_folds, np.arange(len(_SPLIT["y_train"]))) if n_folds > 1 else []
+
+        tasks, owners = [], []
+        for name, model in models.items():
+            tasks.append((_fit_and_score, name, model, per_model))
+            owners.append((name, None))
+            for i, (tr, va) in enumerate(folds):
+                tasks.append((_score_fold, model, tr, va, per_model, scoring))
+                owners.append((name, i))
+
+        fitted, fold_results = {}, {name: [] for name in models}
+        for (name, fold), result in zip(owners, runner.run(tasks)):
+            if fold is None:
+                _, model, metrics, seconds = result
+                logger.info(f"Fitted {name} in {seconds:.1f}s")
+                fitted[name] = (model, metrics | {"fit_seconds": round(seconds, 3)})
+            else:
+                score, seconds = result
+                fold_results[name].append({"fold": fold, "score": score, "fit_seconds": round(seconds, 3)})
+
+        for name, (model, metrics) in fitted.items():
+            training = {k: metrics.pop(k) for k in ("fit_seconds",)}
+            if fold_results[name]:
+                scores = [f["score"] for f in fold_results[name]]
+                training["cv"] = {
+                    "scoring": scoring,
+                    "mean": float(np.mean(scores)),
+                    "std": float(np.std(scores)),
+                    "folds": fold_results[name],
+                }
+                logger.info(f"{name}: CV {scoring} {np.mean(scores):.4f} ± {np.std(scores):.4f}")
+            if name in searches:
+                training["search"] = searches[name]
+            metrics["training"] = training
+        return fitted
+
+    def _search(self, runner: _TaskRunner, name: str, model, spec: Dict, per_model: int) -> Dict:
+        """
+        Successive halving over ``spec["search_space"]``: every candidate is
+        cross-validated on a small subsample, the best ``1/factor`` advance to
+        a ``factor``-times larger one, until one is left, the full training
+        split is used, or ``time_budget_seconds`` runs out.
+        """
+        cfg = self.config["model"].get("search", {})
+        prefix = "clf__" if isinstance(model, Pipeline) else ""
+        space = {prefix + k: v for k, v in spec["search_space"].items()}
+
+        n_candidates = int(cfg.get("n_candidates", 27))
+        factor = max(2, int(cfg.get("factor", 3)))
+        n_folds = max(2, int(cfg.get("cv_folds", 3)))
+        scoring = self.config["model"].get("scoring", "roc_auc")
+        budget = float(cfg.get("time_budget_seconds", 300))
+
+        if all(isinstance(v, list) for v in space.values()):
+            n_candidates = min(n_candidates, math.prod(len(v) for v in space.values()))
+        candidates = [{}] + list(ParameterSampler(space, n_iter=n_candidates, random_state=42))
+        n_total = len(_SPLIT["y_train"])
+        n_rounds = max(1, math.ceil(math.log(len(candidates), factor)))
+        n_samples = max(int(cfg.get("min_samples", 1000)), n_total // factor ** (n_rounds - 1))
+        order = np.random.RandomState(42).permutation(n_total)
+
+        start, rounds, exhausted = time.perf_counter(), [], False
+        while True:
+            round_start = time.perf_counter()
+            folds = self._cv_splits(n_folds, np.sort(order[:min(n_samples, n_total)]))
+            tasks = [
+                (_score_fold, clone(model).set_params(**cand), tr, va, per_model, scoring)
+                for cand in candidates for tr, va in folds
+            ]
+            scores = np.array([score for score, _ in runner.run(tasks)]).reshape(len(candidates), n_folds).mean(axis=1)
+            ranked = [candidates[i] for i in np.argsort(-scores, kind="stable")]
+            best_score = float(scores.max())
+            rounds.append({
+                "n_samples": min(n_samples, n_total),
+                "n_candidates": len(candidates),
+                "best_score": best_score,
+                "seconds": round(time.perf_counter() - round_start, 3),
+            })
+            logger.info(f"{name} search: {len(candidates)} candidate(s) on {min(n_samples, n_total)} rows, "
+                        f"best {scoring} {best_score:.4f}")
+
+            if time.perf_counter() - start > budget:
+                exhausted = len(candidates) > 1
+                break
+            keep = math.ceil(len(candidates) / factor)
+            if keep == 1 or n_samples >= n_total:
+                break
+            candidates = ranked[:keep]
+            n_samples = min(n_samples * factor, n_total)
+
+        result = {
+            "best_params": ranked[0],
+            "best_score": best_score,
+            "budget_exhausted": exhausted,
+            "seconds": round(time.perf_counter() - start, 3),
+            "rounds": rounds,
+        }
+        return result
+
+    # ------------------------------------------------------------------ #
+    def _save_model(self, model, name: str, label_encoder, calibration: Calibration = None):
         os.makedirs("models", exist_ok=True)
-        joblib.dump(model, f"models/{name}.joblib")
-        joblib.dump(self.label_encoder, f"models/{name}_label_encoder.joblib")
+        # write-then-rename so a serving process hot-reloading the file never
+        # sees it half written; the encoder and calibration go first as the
+        # model file is what the registry watches
+        calibration_path = f"models/{name}_calibration.json"
+        if calibration is not None:
+            calibration.save(calibration_path)
+        elif os.path.exists(calibration_path):
+            os.remove(calibration_path)  # stale: belongs to an earlier fit
+        for obj, path in (
+            (label_encoder, f"models/{name}_label_encoder.joblib"),
+            (model, f"models/{name}.joblib"),
+        ):
+            joblib.dump(obj, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        if self.config["model"].get("bundles", True):
+            # written last, so it is the newer file and the registry prefers it
+            save_model_bundle(model, label_encoder.classes_, f"models/{name}.bundle")
         logger.info(f"Saved model {name}")
 
+    def _compiles(self, model) -> bool:
+        return self.config["model"].get("compile_trees", {}).get("enabled", True) and compilable(model)
+
+    def _export_forest(self, model, name: str, sample):
+        """
+        Write ``models/<name>.forest`` (src/models/forest.py) if it reproduces
+        the native probabilities on ``sample`` within ``model.compile_trees.tolerance``.
+        """
+        cfg = self.config["model"].get("compile_trees", {})
+        path = f"models/{name}.forest"
+        try:
+            forest = compile_forest(model)
+            rows = min(len(sample), int(cfg.get("parity_rows", 2_000)))
+            diff = max_difference(forest, model, sample[:rows])
+        except NotImplementedError as exc:
+            logger.warning(f"Not compiling {name}: {exc}")
+            diff, forest = None, None
+        if forest is not None and diff <= float(cfg.get("tolerance", 1e-5)):
+            forest.save(path)
+            logger.info(f"Compiled forest written → {path} (max |Δp| {diff:.2e} on {rows} rows)")
+        else:
+            if diff is not None:
+                logger.warning(f"Not writing {path}: max |Δp| {diff:.2e} vs the native model")
+            if os.path.exists(path):
+                os.remove(path)  # stale: compiled from an earlier fit
+
     # ------------------------------------------------------------------ #
     def load_model(self, name: str):
         self.best_model = joblib.load(f"models/{name}.joblib")
         self.label_encoder = joblib.load(f"models/{name}_label_encoder.joblib")
         self.best_model_name = name
+        path = f"models/{name}_calibration.json"
+        self.calibration = Calibration.load(path) if os.path.exists(path) else None
 
     # ------------------------------------------------------------------ #
-    def predict(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    def predict(self, X: pd.DataFrame, policy: str = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (labels, risk): calibrated risk and the labels of operating point
+        ``policy`` when the model has a calibration, else the raw
+        probability cut at 0.5.
+        """
         if self.best_model is None:
             raise RuntimeError("Model not loaded")
         proba = self.best_model.predict_proba(X)[:, 1]
-        y_num = (proba >= 0.5).astype(int)
-        y_label = self.label_encoder.inverse_transform(y_num)
-        return y_label, proba
+        if self.calibration is None:
+            return self.label_encoder.classes_[(proba >= 0.5).astype(int)], proba
+        flags = self.calibration.flags(proba, policy)
+        return self.label_encoder.classes_[flags.astype(int)], self.calibration.risk(proba)
@@ -0,0 +1,259 @@
+"""
+Feature and prediction drift against the training distribution.
+
+Training writes a reference profile (``build_reference``): for every
+``feature_names_`` column a histogram – one bin per value for discrete
+columns (label / one-hot / binary codes, counts), decile bins for
+continuous ones, plus a missing-value bin – and, per model, a histogram
+of predicted probabilities on the same rows. The rows are the real
+held-out ones, which the models were not fitted on, so their predicted
+probabilities look like the served ones.
+
+Serving keeps the same histograms as decayed counts (``DriftMonitor``).
+``observe`` only appends the encoded rows to a bounded buffer; a
+background thread bins the buffer every ``interval_seconds``, decays the
+old counts by ``half_life_minutes`` and recomputes PSI and (for continuous
+features) the binned KS distance, which are exported as Prometheus gauges
+and served by ``/monitoring/drift``.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from prometheus_client import Gauge
+
+logger = logging.getLogger("monitoring")
+
+REFERENCE_VERSION = 1
+PROBABILITY_EDGES = np.linspace(0.0, 1.0, 21)[1:-1].tolist()
+_EPS = 1e-4
+
+FEATURE_PSI = Gauge(
+    "feature_drift_psi", "Population stability index of a feature vs training", ["feature"], multiprocess_mode="max"
+)
+FEATURE_KS = Gauge(
+    "feature_drift_ks", "Binned KS distance of a continuous feature vs training", ["feature"], multiprocess_mode="max"
+)
+PREDICTION_PSI = Gauge(
+    "prediction_drift_psi", "PSI of predicted probabilities vs training", ["model"], multiprocess_mode="max"
+)
+DRIFT_SAMPLES = Gauge(
+    "drift_window_samples", "Effective (decayed) number of rows behind the drift scores", multiprocess_mode="max"
+)
+
+
+# ---------------------------------------------------------------------- #
+# Reference (training time)
+# ---------------------------------------------------------------------- #
+def _bin(values: np.ndarray, edges: List[float]) -> np.ndarray:
+    """Bin index per value; NaN goes to the last bin (``len(edges) + 1``)."""
+    idx = np.searchsorted(np.asarray(edges, dtype=np.float64), values, side="right")
+    return np.where(np.isnan(values), len(edges) + 1, idx)
+
+
+def _histogram(values: np.ndarray, edges: List[float]) -> List[int]:
+    return np.bincount(_bin(values, edges), minlength=len(edges) + 2).tolist()
+
+
+def _feature_spec(col: np.ndarray, max_categories: int) -> Dict[str, Any]:
+    present = col[~np.isnan(col)]
+    distinct = np.unique(present)
+    if len(distinct) <= max_categories:
+        # one bin per training value; unseen values fall into a neighbour
+        return {"kind": "discrete", "edges": ((distinct[:-1] + distinct[1:]) / 2).tolist()}
+    quantiles = np.quantile(present, np.linspace(0.1, 0.9, 9))
+    return {"kind": "continuous", "edges": np.unique(quantiles).tolist()}
+
+
+def build_reference(X, feature_names: List[str], models: Dict[str, Any], max_rows: int = 50_000,
+                    max_categories: int = 20, seed: int = 42) -> Dict[str, Any]:
+    """Reference profile of encoded rows ``X`` and of each model's probabilities on them."""
+    frame = X
+    n = len(X)
+    rows = np.sort(np.random.default_rng(seed).choice(n, max_rows, replace=False)) if n > max_rows else None
+    if rows is not None:
+        frame = X.iloc[rows] if hasattr(X, "iloc") else X[rows]
+    matrix = np.asarray(frame, dtype=np.float64)
+
+    features = {}
+    for j, name in enumerate(feature_names):
+        spec = _feature_spec(matrix[:, j], max_categories)
+        spec["counts"] = _histogram(matrix[:, j], spec["edges"])
+        features[name] = spec
+    predictions = {
+        name: {"edges": PROBABILITY_EDGES,
+               "counts": _histogram(np.asarray(model.predict_proba(frame)[:, 1], dtype=np.float64), PROBABILITY_EDGES)}
+        for name, model in models.items()
+    }
+    logger.info(f"Drift reference built from {len(matrix)} rows ({len(features)} features, {len(predictions)} models)")
+    return {"version": REFERENCE_VERSION, "n_rows": len(matrix), "features": features, "predictions": predictions}
+
+
+def save_reference(reference: Dict[str, Any], path: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(reference, f)
+    os.replace(tmp, path)
+
+
+def load_reference(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        reference = json.load(f)
+    if reference.get("version") != REFERENCE_VERSION:
+        logger.warning(f"Ignoring {path}: reference version {reference.get('version')}")
+        return None
+    return reference
+
+
+# ---------------------------------------------------------------------- #
+# Scores
+# ---------------------------------------------------------------------- #
+def _proportions(counts: np.ndarray) -> np.ndarray:
+    total = counts.sum()
+    return (counts + _EPS) / (total + _EPS * len(counts))
+
+
+def psi(reference: np.ndarray, current: np.ndarray) -> float:
+    p, q = _proportions(np.asarray(reference, dtype=np.float64)), _proportions(current)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def binned_ks(reference: np.ndarray, current: np.ndarray) -> float:
+    """KS distance evaluated at the bin edges (missing-value bin excluded)."""
+    p, q = np.asarray(reference[:-1], dtype=np.float64), current[:-1]
+    if not p.sum() or not q.sum():
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(p) / p.sum() - np.cumsum(q) / q.sum())))
+
+
+# ---------------------------------------------------------------------- #
+# Serving
+# ---------------------------------------------------------------------- #
+class DriftMonitor:
+    def __init__(self, reference: Dict[str, Any], feature_names: List[str], interval_seconds: float = 30.0,
+                 half_life_minutes: float = 60.0, max_buffered: int = 10_000, min_samples: int = 100):
+        self.reference = reference
+        self.interval = float(interval_seconds)
+        self.decay = 0.5 ** (self.interval / (60.0 * float(half_life_minutes)))
+        self.min_samples = int(min_samples)
+
+        self.counts = {n: np.zeros(len(f["counts"])) for n, f in reference["features"].items()}
+        self.prediction_counts: Dict[str, np.ndarray] = {}
+
+        self._buffer: deque = deque(maxlen=max(1, int(max_buffered)))
+        self._lock = threading.Lock()
+        self.set_feature_names(feature_names)
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self.report: Dict[str, Any] = {"status": "warming up", "samples": 0.0}
+
+    @classmethod
+    def from_config(cls, config: Dict, feature_names: List[str]) -> Optional["DriftMonitor"]:
+        cfg = config.get("monitoring", {}).get("drift", {})
+        if not cfg.get("enabled", False):
+            return None
+        reference = load_reference(cfg.get("reference_path", "models/drift_reference.json"))
+        if reference is None:
+            logger.warning("Drift monitoring enabled but no reference profile found – train to create one")
+            return None
+        return cls(reference, feature_names, cfg.get("interval_seconds", 30.0), cfg.get("half_life_minutes", 60.0),
+                   cfg.get("max_buffered", 10_000), cfg.get("min_samples", 100))
+
+    def set_feature_names(self, feature_names: List[str]):
+        """Follow a new served column layout (preprocessor hot swap); rows buffered in the old one are dropped."""
+        # columns of the served matrix that have a reference, in served order
+        names = [n for n in feature_names if n in self.reference["features"]]
+        columns = np.asarray([feature_names.index(n) for n in names], dtype=np.intp)
+        with self._lock:
+            self.names, self.columns, self.width = names, columns, len(feature_names)
+            self._buffer.clear()
+
+    # ------------------------------------------------------------------ #
+    def observe(self, X: np.ndarray, proba: np.ndarray, model: str):
+        """Queue scored rows (request thread: one append, no binning)."""
+        self._ensure_worker()
+        self._buffer.append((X, proba, model))
+
+    def _ensure_worker(self):
+        # threads do not survive fork(); one per process, started on first use
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._buffer.clear()
+                self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.update()
+            except Exception:
+                logger.exception("Drift update failed")
+
+    def update(self):
+        """Fold the buffered rows into the decayed histograms and recompute the scores."""
+        with self._lock:
+            names, columns, width = self.names, self.columns, self.width
+        items = []
+        while self._buffer:
+            x, proba, model = self._buffer.popleft()
+            if np.shape(x)[1] == width:  # skip rows encoded before a layout change
+                items.append((x, proba, model))
+
+        for n in self.counts:
+            self.counts[n] *= self.decay
+        for c in self.prediction_counts.values():
+            c *= self.decay
+
+        if items:
+            X = np.concatenate([np.asarray(x, dtype=np.float64) for x, _, _ in items])
+            for j, n in zip(columns, names):
+                ref = self.reference["features"][n]
+                self.counts[n] += np.bincount(_bin(X[:, j], ref["edges"]), minlength=len(ref["counts"]))
+            for x, proba, model in items:
+                if model not in self.reference["predictions"]:
+                    continue
+                counts = self.prediction_counts.setdefault(model, np.zeros(len(PROBABILITY_EDGES) + 2))
+                counts += np.bincount(_bin(np.asarray(proba, dtype=np.float64), PROBABILITY_EDGES),
+                                      minlength=len(counts))
+        self._score()
+
+    def _score(self):
+        samples = float(self.counts[self.names[0]].sum()) if self.names else 0.0
+        DRIFT_SAMPLES.set(samples)
+        report: Dict[str, Any] = {"updated_at": datetime.now().isoformat(), "samples": round(samples, 1),
+                                  "reference_rows": self.reference["n_rows"]}
+        if samples < self.min_samples:
+            self.report = report | {"status": f"warming up (< {self.min_samples} samples)"}
+            return
+
+        features = []
+        for n in self.names:
+            ref = self.reference["features"][n]
+            row = {"feature": n, "kind": ref["kind"], "psi": round(psi(np.asarray(ref["counts"]), self.counts[n]), 5)}
+            FEATURE_PSI.labels(feature=n).set(row["psi"])
+            if ref["kind"] == "continuous":
+                row["ks"] = round(binned_ks(np.asarray(ref["counts"]), self.counts[n]), 5)
+                FEATURE_KS.labels(feature=n).set(row["ks"])
+            features.append(row)
+        features.sort(key=lambda r: -r["psi"])
+
+        predictions = {}
+        for model, counts in self.prediction_counts.items():
+            if counts.sum() < self.min_samples:
+                continue
+            value = psi(np.asarray(self.reference["predictions"][model]["counts"]), counts)
+            PREDICTION_PSI.labels(model=model).set(value)
+            predictions[model] = {"psi": round(value, 5), "samples": round(float(counts.sum()), 1)}
+        self.report = report | {"status": "ok", "features": features, "predictions": predictions}
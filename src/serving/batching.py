@@ -0,0 +1,114 @@
+"""
+Dynamic micro-batching for single-record prediction requests.
+
+Concurrent callers ``submit`` one item each and block on a future. A
+background worker gathers items until ``max_batch_size`` are queued or the
+oldest has waited ``max_delay_ms``. It scores them with one call to
+``score_fn`` and resolves every caller's future with its own result.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger("api")
+
+QUEUE_DEPTH = Gauge(
+    "microbatch_queue_depth",
+    "Single-record requests waiting to be batched",
+    multiprocess_mode="livesum",
+)
+BATCH_SIZE = Histogram(
+    "microbatch_size",
+    "Requests scored per micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+WAIT_TIME = Histogram(
+    "microbatch_wait_seconds",
+    "Time a request spent queued before its micro-batch was scored",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+# score_fn(items) -> one result per item; an Exception instance fails that item only
+ScoreFn = Callable[[Sequence[Any]], Sequence[Any]]
+
+
+class MicroBatcher:
+    def __init__(self, score_fn: ScoreFn, max_batch_size: int = 64, max_delay_ms: float = 2.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000
+
+        self._queue: "queue.Queue[tuple[Any, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def submit(self, item: Any) -> Future:
+        """Queue one item; the returned future resolves to its result."""
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((item, fut, time.perf_counter()))
+        QUEUE_DEPTH.inc()
+        return fut
+
+    def score(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Blocking convenience wrapper around ``submit``."""
+        return self.submit(item).result(timeout=timeout)
+
+    # ------------------------------------------------------------------ #
+    # Worker
+    # ------------------------------------------------------------------ #
+    def _ensure_worker(self):
+        # started lazily and once per process, so forked workers get their own
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="microbatcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            QUEUE_DEPTH.dec(len(batch))
+            BATCH_SIZE.observe(len(batch))
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                WAIT_TIME.observe(now - queued_at)
+
+            try:
+                results = list(self.score_fn([item for item, _, _ in batch]))
+                if len(results) != len(batch):
+                    # a short result list would leave the remaining callers blocked forever
+                    raise RuntimeError(f"score_fn returned {len(results)} result(s) for {len(batch)} item(s)")
+            except Exception as exc:
+                logger.exception("Micro-batch scoring failed")
+                results = [exc] * len(batch)
+
+            for (_, fut, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
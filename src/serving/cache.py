@@ -0,0 +1,135 @@
+"""
+Bounded cache of /predict results.
+
+Two levels, both LRU with a TTL:
+
+* ``raw``      – digest of the canonical request payload; a hit skips the
+                 transform and the model.
+* ``features`` – digest of the encoded float32 row; catches payloads that
+                 differ only in ways the encoding ignores (``"1"`` vs ``1``,
+                 unknown-to-zero categories, ...) and skips the model.
+
+``explanations`` holds the per-field contributions of ``/explain`` under the
+same encoded-row keys.
+
+Every key includes the model's and the preprocessor's artefact versions, and
+the first lookup after either changes drops that model's entries, so a
+retrained artefact never serves a cached answer from its predecessor.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+CACHE_EVENTS = Counter(
+    "prediction_cache_events_total",
+    "Prediction cache lookups and evictions",
+    ["level", "event"],  # event: hit | miss | eviction | expired | invalidated
+)
+CACHE_ENTRIES = Gauge(
+    "prediction_cache_entries",
+    "Entries held by the prediction cache",
+    ["level"],
+    multiprocess_mode="livesum",
+)
+
+
+class LRUCache:
+    """Thread-safe LRU map with per-entry TTL (``ttl_seconds <= 0``: no expiry)."""
+
+    def __init__(self, level: str, max_entries: int, ttl_seconds: float):
+        self.level = level
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value (never ``None``), or ``None``."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < now:
+                del self._data[key]
+                CACHE_EVENTS.labels(level=self.level, event="expired").inc()
+                entry = None
+            if entry is None:
+                CACHE_EVENTS.labels(level=self.level, event="miss").inc()
+                return None
+            self._data.move_to_end(key)
+        CACHE_EVENTS.labels(level=self.level, event="hit").inc()
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else float("inf")
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+            size = len(self._data)
+        if evicted:
+            CACHE_EVENTS.labels(level=self.level, event="eviction").inc(evicted)
+        CACHE_ENTRIES.labels(level=self.level).set(size)
+
+    def drop(self, model: str):
+        """Remove every entry of ``model`` (keys are ``(model, version, digest)``)."""
+        with self._lock:
+            stale = [k for k in self._data if k[0] == model]
+            for k in stale:
+                del self._data[k]
+            size = len(self._data)
+        if stale:
+            CACHE_EVENTS.labels(level=self.level, event="invalidated").inc(len(stale))
+        CACHE_ENTRIES.labels(level=self.level).set(size)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        CACHE_ENTRIES.labels(level=self.level).set(0)
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 300.0):
+        self.raw = LRUCache("raw", max_entries, ttl_seconds)
+        self.features = LRUCache("features", max_entries, ttl_seconds)
+        self.explanations = LRUCache("explanations", max_entries, ttl_seconds)
+        self._versions: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["PredictionCache"]:
+        cfg = config["api"].get("prediction_cache", {})
+        if not cfg.get("enabled", False):
+            return None
+        return cls(max_entries=cfg.get("max_entries", 10_000), ttl_seconds=cfg.get("ttl_seconds", 300.0))
+
+    def _version(self, model: str, version: Tuple) -> Tuple:
+        """``version`` for ``model``, dropping its entries if the artefacts changed since last seen."""
+        with self._lock:
+            previous = self._versions.get(model)
+            self._versions[model] = version
+        if previous is not None and previous != version:
+            self.raw.drop(model)
+            self.features.drop(model)
+            self.explanations.drop(model)
+        return version
+
+    # ------------------------------------------------------------------ #
+    def raw_key(self, model: str, version: Tuple, canonical: bytes) -> Tuple:
+        return model, self._version(model, version), hashlib.blake2b(canonical, digest_size=16).digest()
+
+    def feature_key(self, model: str, version: Tuple, row: np.ndarray) -> Tuple:
+        row = np.ascontiguousarray(row, dtype=np.float32)
+        return model, self._version(model, version), hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+    def clear(self):
+        self.raw.clear()
+        self.features.clear()
+        self.explanations.clear()
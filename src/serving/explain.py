@@ -0,0 +1,92 @@
+"""
+Per-prediction explanations from the boosters' native tree SHAP.
+
+``tree_contributions`` is one vectorised ``pred_contrib`` / ``pred_contribs``
+call: per row, the log-odds contribution of every encoded feature plus the
+bias, summing to the model's raw margin (so the probability comes from the
+same call, no second ``predict_proba``).
+
+``FeatureGroups`` folds the encoded columns back onto the request fields
+they came from – the one-hot columns of ``admission_source_id``, the binary
+code columns of ``diag_1``, ... – using the compiled preprocessor's tables,
+as one matrix product. SHAP values are additive, so a field's contribution
+is the sum over its columns.
+"""
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from src.data.compiled import CompiledTransformer
+
+
+def supports_contributions(model: Any) -> bool:
+    from src.models.streaming import BoosterClassifier
+
+    return isinstance(model, BoosterClassifier) or type(model).__module__.split(".")[0] in ("lightgbm", "xgboost")
+
+
+def tree_contributions(model: Any, X) -> np.ndarray:
+    """(n_rows, n_features + 1) log-odds contributions, the last column being the bias."""
+    from src.models.streaming import BoosterClassifier
+
+    if isinstance(model, BoosterClassifier):
+        return model.predict_contrib(X)
+    module = type(model).__module__.split(".")[0]
+    if module == "lightgbm":
+        return np.asarray(model.predict(X, pred_contrib=True), dtype=np.float64)
+    if module == "xgboost":
+        import xgboost as xgb
+
+        return np.asarray(model.get_booster().predict(xgb.DMatrix(X), pred_contribs=True), dtype=np.float64)
+    raise NotImplementedError(f"{type(model).__name__} has no native feature contributions")
+
+
+class FeatureGroups:
+    """Encoded ``feature_names_`` columns → the raw request fields they encode."""
+
+    def __init__(self, compiled: CompiledTransformer):
+        index = {name: i for i, name in enumerate(compiled.feature_names_)}
+        owner: Dict[int, str] = {}
+        for c in compiled.label_tables:
+            owner[index[c]] = c
+        for c, table in compiled.onehot_tables.items():
+            owner.update({j: c for j in table.values() if j >= 0})
+        for c, (cols, _, _) in compiled.binary_tables.items():
+            owner.update({j: c for j in cols})
+        # numeric fields and the drug-count columns stand for themselves
+
+        self.fields: List[str] = []
+        position: Dict[str, int] = {}
+        columns = []
+        for j, name in enumerate(compiled.feature_names_):
+            field = owner.get(j, name)
+            if field not in position:
+                position[field] = len(self.fields)
+                self.fields.append(field)
+            columns.append(position[field])
+        self.matrix = np.zeros((compiled.n_features, len(self.fields)), dtype=np.float64)
+        self.matrix[np.arange(compiled.n_features), columns] = 1.0
+        # fields echoed from the request (the drug counts are derived from several)
+        derived = {f"count_{v}" for v in compiled.count_index}
+        self.raw = {f for f in self.fields if f in compiled.input_columns and f not in derived}
+
+    def fold(self, contributions: np.ndarray) -> np.ndarray:
+        """(n_rows, n_features + 1) → (n_rows, n_fields), bias column dropped."""
+        return contributions[:, :-1] @ self.matrix
+
+    def describe(self, folded: np.ndarray, records: Sequence[Mapping], top_k: int = 0) -> List[List[Dict[str, Any]]]:
+        """Per row, the ``top_k`` fields by absolute contribution (0: all), with the request's value."""
+        k = len(self.fields) if top_k <= 0 else min(top_k, len(self.fields))
+        order = np.argsort(-np.abs(folded), axis=1, kind="stable")[:, :k]
+        out = []
+        for row, record, idx in zip(folded, records, order):
+            items = []
+            for j in idx.tolist():
+                field = self.fields[j]
+                item = {"feature": field, "contribution": round(float(row[j]), 6)}
+                if field in self.raw:
+                    item["value"] = record.get(field)
+                items.append(item)
+            out.append(items)
+        return out
+
@@ -0,0 +1,109 @@
+"""
+Asynchronous logging for the API process.
+
+``enable_async_logging`` swaps the handlers that ``logging.yaml`` attached to
+each logger for a ``_QueueHandler``: the request thread only puts the
+unformatted ``LogRecord`` on a bounded queue, and one background thread
+formats it and runs the original handlers (console, rotating JSON files).
+When the queue is full, records are dropped and counted rather than
+blocking a request.
+
+Log structured fields through ``extra=`` (the JSON formatter emits them as
+keys) and keep the message constant, e.g.
+
+    logger.info("prediction", extra={"model": name, "prediction": label})
+
+Records are formatted later on the writer thread, so objects passed in
+``extra`` or ``args`` must not be mutated after the call.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the async log queue was full",
+)
+
+_STOP = object()
+
+
+class AsyncLogWriter:
+    """One queue + writer thread per process; restarted in forked children."""
+
+    def __init__(self, queue_size: int = 10_000):
+        self.queue_size = max(1, int(queue_size))
+        self._queue: "queue.Queue" = queue.Queue(self.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start()
+        os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.stop)
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="async-log-writer", daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        # the parent's writer thread (and any lock it held) does not exist here
+        self._queue = queue.Queue(self.queue_size)
+        self._start()
+
+    def put(self, handlers: Tuple[logging.Handler, ...], record: logging.LogRecord):
+        try:
+            self._queue.put_nowait((handlers, record))
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def _run(self):
+        q = self._queue
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            handlers, record = item
+            for handler in handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def stop(self, timeout: float = 2.0):
+        """Flush what is queued (up to ``timeout``) and stop the writer."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class _QueueHandler(logging.Handler):
+    def __init__(self, writer: AsyncLogWriter, handlers: List[logging.Handler]):
+        super().__init__()
+        self.writer = writer
+        self.handlers = tuple(handlers)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # no filtering / formatting / handler lock on the calling thread
+        self.writer.put(self.handlers, record)
+        return True
+
+
+def enable_async_logging(queue_size: int = 10_000) -> AsyncLogWriter:
+    """Move the handlers of the root logger and every configured logger behind one writer thread."""
+    writer = AsyncLogWriter(queue_size)
+    loggers = [logging.getLogger()] + [
+        lg for lg in logging.root.manager.loggerDict.values() if isinstance(lg, logging.Logger)
+    ]
+    for lg in loggers:
+        if not lg.handlers or any(isinstance(h, _QueueHandler) for h in lg.handlers):
+            continue
+        handlers = list(lg.handlers)
+        for h in handlers:
+            lg.removeHandler(h)
+        lg.addHandler(_QueueHandler(writer, handlers))
+    return writer
@@ -0,0 +1,46 @@
+"""
+Sampling profiler for the live process.
+
+Every ``interval`` seconds the stack of every other thread is captured via
+``sys._current_frames``. Identical stacks are counted and returned in the
+collapsed format read by flamegraph.pl / speedscope / inferno:
+
+    thread;module:function;module:function 42
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Dict[str, int]:
+    """{collapsed stack: samples} for all threads except the caller's."""
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return dict(counts)
+
+
+def collapsed(counts: Dict[str, int]) -> str:
+    """Render ``sample_stacks`` output, heaviest stacks first."""
+    lines = [f"{stack} {n}" for stack, n in sorted(counts.items(), key=lambda kv: -kv[1])]
+    return "\n".join(lines) + ("\n" if lines else "")
@@ -0,0 +1,380 @@
+"""
+In-process model registry for serving.
+
+Any model written by ``ModelTrainer._save_model`` (``models/<name>.joblib``
++ ``models/<name>_label_encoder.joblib``, or the single-file
+``models/<name>.bundle`` when it is at least as new) can be served, with
+its ``models/<name>_calibration.json`` when training wrote one. A LightGBM /
+XGBoost model with an up-to-date ``models/<name>.forest`` is scored by
+that NumPy evaluator (src/models/forest.py); the native model is still
+loaded for ``explain``. Models are loaded
+on first use, at most ``max_resident`` of them (and ``memory_budget_mb`` of
+artefacts) stay in memory under LRU eviction, and a model whose file
+changes on disk is reloaded and swapped in atomically – requests already
+holding the previous ``LoadedModel`` finish on it undisturbed.
+
+``PreprocessorWatcher`` does the same for ``models/preprocessor.joblib``
+and its compiled bundle: a retrain that changes the encoded layout swaps
+in new ``ServingTables`` (compiled transformer + explanation groups), so
+models are never fed stale encodings and cache keys built from
+``compiled.version`` change with it.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data.compiled import CompiledTransformer
+from src.data.preprocessing import compiled_path
+from src.models.bundle import load_model_bundle
+from src.models.calibration import Calibration
+from src.models.forest import CompiledForest
+from src.serving.explain import FeatureGroups, supports_contributions, tree_contributions
+
+logger = logging.getLogger("api")
+
+_NOT_MODELS = ("preprocessor",)
+_MODEL_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class LoadedModel:
+    """One resident model + its label classes and calibration, pinned to a file version."""
+
+    def __init__(self, name: str, model: Any, classes: Any, version: Tuple[int, ...], size_bytes: int,
+                 calibration: Optional[Calibration] = None, forest: Optional[CompiledForest] = None):
+        self.name = name
+        self.model = model
+        self.calibration = calibration
+        self.forest = forest
+        self.version = version
+        self.size_bytes = size_bytes
+        self.loaded_at = datetime.now()
+        self.classes_ = np.asarray(classes)
+        # sklearn estimators fitted on a DataFrame warn on bare arrays
+        self._columns: Optional[List[str]] = (
+            list(model.feature_names_in_) if getattr(model, "feature_names_in_", None) is not None else None
+        )
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Positive-class probability for each row of the encoded matrix."""
+        if self.forest is not None:
+            return self.forest.predict_proba(X)[:, 1]
+        if self._columns is not None:
+            X = pd.DataFrame(X, columns=self._columns)
+        return self.model.predict_proba(X)[:, 1]
+
+    @property
+    def explainable(self) -> bool:
+        return supports_contributions(self.model)
+
+    def explain(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(positive-class probability, tree SHAP contributions) from one vectorised call."""
+        if self._columns is not None:
+            X = pd.DataFrame(X, columns=self._columns)
+        contributions = tree_contributions(self.model, X)
+        # the contributions sum to the raw margin of the binary objective
+        return 1.0 / (1.0 + np.exp(-contributions.sum(axis=1))), contributions
+
+    def risk(self, proba) -> np.ndarray:
+        """Calibrated risk (the raw probability for a model trained without calibration)."""
+        if self.calibration is None:
+            return np.asarray(proba, dtype=np.float64)
+        return self.calibration.risk(proba)
+
+    def threshold(self, policy: Optional[str] = None) -> float:
+        """Risk cut of operating point ``policy``; ValueError if the model has no such policy."""
+        if self.calibration is None:
+            if policy is not None:
+                raise ValueError(f"Model '{self.name}' has no calibration / operating points")
+            return 0.5
+        return self.calibration.threshold(policy)
+
+    def labels(self, proba: np.ndarray, policy: Optional[str] = None) -> np.ndarray:
+        if self.calibration is None:
+            self.threshold(policy)
+            return self.classes_[(np.asarray(proba) >= 0.5).astype(int)]
+        return self.classes_[self.calibration.flags(proba, policy).astype(int)]
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        model_dir: str = "models",
+        max_resident: int = 2,
+        memory_budget_mb: float = 1024,
+        reload_check_interval: float = 2.0,
+        mmap: bool = True,
+        pinned: Optional[List[str]] = None,
+        verify_bundles: bool = True,
+        compiled_trees: bool = True,
+    ):
+        self.model_dir = model_dir
+        self.max_resident = max(1, int(max_resident))
+        self.memory_budget = float(memory_budget_mb) * 1024 ** 2
+        self.reload_check_interval = reload_check_interval
+        self.mmap = mmap
+        self.verify_bundles = verify_bundles
+        self.compiled_trees = compiled_trees
+        self.pinned = set(pinned or [])  # never evicted (e.g. the default model)
+
+        self._resident: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._last_check: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ModelRegistry":
+        cfg = config.get("api", {}).get("models", {})
+        return cls(
+            model_dir=config["model"].get("model_save_path", "models/").rstrip("/"),
+            max_resident=cfg.get("max_resident", 2),
+            memory_budget_mb=cfg.get("memory_budget_mb", 1024),
+            reload_check_interval=cfg.get("reload_check_interval", 2.0),
+            mmap=cfg.get("mmap", True),
+            pinned=[cfg.get("default", "lightgbm")],
+            verify_bundles=cfg.get("verify_bundles", True),
+            compiled_trees=cfg.get("compiled_trees", True),
+        )
+
+    # ------------------------------------------------------------------ #
+    # Paths / discovery
+    # ------------------------------------------------------------------ #
+    def _paths(self, name: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.model_dir, f"{name}.joblib"),
+            os.path.join(self.model_dir, f"{name}_label_encoder.joblib"),
+        )
+
+    def _calibration(self, name: str) -> Optional[Calibration]:
+        path = os.path.join(self.model_dir, f"{name}_calibration.json")
+        return Calibration.load(path) if os.path.exists(path) else None
+
+    def _bundle(self, name: str) -> Optional[str]:
+        """``<name>.bundle`` if it exists and is not older than ``<name>.joblib``."""
+        path = os.path.join(self.model_dir, f"{name}.bundle")
+        if not os.path.exists(path):
+            return None
+        model_path, _ = self._paths(name)
+        if os.path.exists(model_path) and os.stat(model_path).st_mtime_ns > os.stat(path).st_mtime_ns:
+            return None
+        return path
+
+    def _forest(self, name: str) -> Optional[str]:
+        """``<name>.forest`` if enabled, present and not older than the model file it was compiled from."""
+        path = os.path.join(self.model_dir, f"{name}.forest")
+        if not self.compiled_trees or not os.path.exists(path):
+            return None
+        model_path = self._bundle(name) or self._paths(name)[0]
+        if os.path.exists(model_path) and os.stat(model_path).st_mtime_ns > os.stat(path).st_mtime_ns:
+            return None
+        return path
+
+    def _version(self, name: str) -> Tuple[Tuple[int, ...], int]:
+        """(mtime_ns, size[, forest mtime_ns]) of the files that will be loaded + total artefact size."""
+        bundle = self._bundle(name)
+        if bundle is not None:
+            st = os.stat(bundle)
+            version, size = (st.st_mtime_ns, st.st_size), st.st_size
+        else:
+            model_path, enc_path = self._paths(name)
+            st = os.stat(model_path)
+            version, size = (st.st_mtime_ns, st.st_size), st.st_size + os.path.getsize(enc_path)
+        forest = self._forest(name)
+        if forest is not None:
+            # written just after the model: picked up even if the model was loaded in between
+            st = os.stat(forest)
+            version, size = version + (st.st_mtime_ns,), size + st.st_size
+        return version, size
+
+    def servable(self, name: str) -> bool:
+        """Whether ``name`` is a plain model name with a model file on disk (never a path)."""
+        if not isinstance(name, str) or not _MODEL_NAME.match(name):
+            return False
+        if name in _NOT_MODELS or name.endswith("_label_encoder"):
+            return False
+        model_path, enc_path = self._paths(name)
+        return self._bundle(name) is not None or (os.path.exists(model_path) and os.path.exists(enc_path))
+
+    def available(self) -> List[str]:
+        """Names of every servable model on disk."""
+        if not os.path.isdir(self.model_dir):
+            return []
+        names = set()
+        for fname in os.listdir(self.model_dir):
+            name, ext = os.path.splitext(fname)
+            if ext not in (".joblib", ".bundle") or name.endswith("_label_encoder") or name in _NOT_MODELS:
+                continue
+            if self.servable(name):
+                names.add(name)
+        return sorted(names)
+
+    def resident(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "name": m.name,
+                    "size_mb": round(m.size_bytes / 1024 ** 2, 2),
+                    "loaded_at": m.loaded_at.isoformat(),
+                    "compiled_trees": m.forest is not None,
+                }
+                for m in self._resident.values()
+            ]
+
+    # ------------------------------------------------------------------ #
+    # Lookup
+    # ------------------------------------------------------------------ #
+    def get(self, name: str) -> LoadedModel:
+        """
+        Resident model for ``name``, loading or hot-reloading it if needed.
+        KeyError for anything that is not a servable model name.
+        """
+        with self._lock:
+            loaded = self._resident.get(name)
+            if loaded is not None:
+                self._resident.move_to_end(name)
+                now = time.monotonic()
+                if now - self._last_check.get(name, 0.0) < self.reload_check_interval:
+                    return loaded
+                self._last_check[name] = now
+
+        # validated before any path is built or a load lock is created for it
+        if not self.servable(name):
+            raise KeyError(f"Unknown model '{name}'")
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        version, _ = self._version(name)
+        if loaded is not None and loaded.version == version:
+            return loaded
+
+        # load outside the registry lock; one loader per model name
+        with load_lock:
+            with self._lock:
+                current = self._resident.get(name)
+            if current is not None and current.version == version:
+                return current
+            try:
+                fresh = self._load(name)
+            except Exception:
+                if current is None:
+                    raise
+                # e.g. a half-written file – keep serving the old version
+                logger.exception(f"Reload of model '{name}' failed; keeping the resident version")
+                return current
+            with self._lock:
+                self._resident[name] = fresh
+                self._resident.move_to_end(name)
+                self._last_check[name] = time.monotonic()
+                self._evict(keep=name)
+            if current is not None:
+                logger.info(f"Hot-swapped model '{name}' (file changed on disk)")
+            return fresh
+
+    def _load(self, name: str) -> LoadedModel:
+        model_path, enc_path = self._paths(name)
+        version, size = self._version(name)
+        bundle = self._bundle(name)
+        start = time.perf_counter()
+        if bundle is not None:
+            model, classes = load_model_bundle(bundle, verify=self.verify_bundles)
+        else:
+            model = joblib.load(model_path, mmap_mode="r" if self.mmap else None)
+            classes = joblib.load(enc_path).classes_
+        forest_path = self._forest(name)
+        forest = CompiledForest.load(forest_path, verify=self.verify_bundles) if forest_path else None
+        logger.info(f"Loaded model '{name}' from {bundle or model_path}{' + ' + forest_path if forest else ''} "
+                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return LoadedModel(name, model, classes, version, size, self._calibration(name), forest)
+
+    def _evict(self, keep: str):
+        """Drop least-recently-used models over the count / memory budget (lock held)."""
+        def over_budget() -> bool:
+            total = sum(m.size_bytes for m in self._resident.values())
+            return len(self._resident) > self.max_resident or total > self.memory_budget
+
+        while over_budget():
+            victim = next((n for n in self._resident if n != keep and n not in self.pinned), None)
+            if victim is None:
+                break
+            del self._resident[victim]
+            logger.info(f"Evicted model '{victim}' from the registry")
+
+
+class ServingTables:
+    """One version of the compiled preprocessor and the explanation groups built from it."""
+
+    def __init__(self, compiled: CompiledTransformer, file_version: Tuple[int, ...]):
+        self.compiled = compiled
+        self.groups = FeatureGroups(compiled)
+        self.file_version = file_version
+
+
+class PreprocessorWatcher:
+    """
+    ``ServingTables`` for ``path``, reloaded when ``path`` or its compiled
+    bundle changes on disk (checked at most every ``reload_check_interval``
+    seconds). Take one ``get()`` per request so a request never mixes two
+    encoder layouts.
+    """
+
+    def __init__(self, path: str = "models/preprocessor.joblib", reload_check_interval: float = 2.0,
+                 on_swap: Optional[Callable[[ServingTables], None]] = None):
+        self.path = path
+        self.reload_check_interval = reload_check_interval
+        self.on_swap = on_swap
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self.current = self._load(self._file_version())
+
+    @classmethod
+    def from_config(cls, config: Dict, on_swap: Optional[Callable[[ServingTables], None]] = None
+                    ) -> "PreprocessorWatcher":
+        cfg = config.get("api", {}).get("models", {})
+        model_dir = config["model"].get("model_save_path", "models/").rstrip("/")
+        return cls(os.path.join(model_dir, "preprocessor.joblib"), cfg.get("reload_check_interval", 2.0), on_swap)
+
+    def _file_version(self) -> Tuple[int, ...]:
+        version: Tuple[int, ...] = ()
+        for path in (self.path, compiled_path(self.path)):
+            try:
+                st = os.stat(path)
+                version += (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                version += (0, 0)
+        return version
+
+    def _load(self, file_version: Tuple[int, ...]) -> ServingTables:
+        return ServingTables(CompiledTransformer.from_artifacts(self.path), file_version)
+
+    def get(self) -> ServingTables:
+        current = self.current
+        if time.monotonic() - self._last_check < self.reload_check_interval:
+            return current
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_check < self.reload_check_interval:
+                return self.current
+            self._last_check = now
+            version = self._file_version()
+            if version == self.current.file_version:
+                return self.current
+            try:
+                fresh = self._load(version)
+            except Exception:
+                # e.g. a half-written file – retried at the next check
+                logger.exception("Reload of the preprocessor failed; keeping the loaded version")
+                return self.current
+            changed = fresh.compiled.feature_names_ != self.current.compiled.feature_names_
+            self.current = fresh
+        logger.info(f"Hot-swapped preprocessor ({'new' if changed else 'same'} feature layout, "
+                    f"{fresh.compiled.n_features} features)")
+        if self.on_swap is not None:
+            self.on_swap(fresh)
+        return fresh
@@ -0,0 +1,225 @@
+"""
+Shadow scoring and canary routing of challenger models.
+
+``ShadowScorer.submit`` hands the live model's encoded matrix and results to
+a small thread pool and returns at once; the pool scores the same matrix
+with every challenger (``api.shadow.models``, plus the default model when a
+canary served the request) and records, per challenger:
+
+* Prometheus – agreement counts, |risk delta| and scoring latency;
+* the prediction store – a ``shadow`` field on the live record, which is
+  written by the pool after scoring (or right away if shadowing is skipped);
+* ``report`` – running totals per (live, challenger) pair in this process,
+  served by ``/monitoring/shadow``.
+
+The pool threads run at a lower OS scheduling priority, and work beyond
+``max_pending`` queued requests is dropped (``shadow_dropped_total``) rather
+than queued, so shadowing never delays a live response.
+
+``Canary`` sends ``fraction`` of the requests that do not name a model to
+its challenger instead of the default model.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger("api")
+
+SHADOW_PREDICTIONS = Counter(
+    "shadow_predictions_total",
+    "Rows scored by a challenger next to the live model",
+    ["live", "challenger", "agree"],
+)
+SHADOW_DELTA = Histogram(
+    "shadow_risk_delta",
+    "|challenger risk - live risk| per row",
+    ["live", "challenger"],
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0),
+)
+SHADOW_LATENCY = Histogram(
+    "shadow_latency_seconds",
+    "Time a challenger took to score one shadowed request",
+    ["model"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+SHADOW_DROPPED = Counter(
+    "shadow_dropped_total",
+    "Requests not shadowed because the shadow pool was saturated",
+)
+SHADOW_ERRORS = Counter(
+    "shadow_errors_total",
+    "Challenger scoring failures",
+    ["model"],
+)
+
+
+class Canary:
+    def __init__(self, model: str, fraction: float):
+        self.model = model
+        self.fraction = min(max(float(fraction), 0.0), 1.0)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["Canary"]:
+        cfg = config["api"].get("canary", {})
+        if not cfg.get("model") or not cfg.get("fraction"):
+            return None
+        return cls(cfg["model"], cfg["fraction"])
+
+    def route(self) -> bool:
+        return random.random() < self.fraction
+
+
+class ShadowScorer:
+    def __init__(self, get_model: Callable[[str], Any], challengers: List[str], default: str,
+                 save: Callable[[Dict[str, Any]], None], workers: int = 1, max_pending: int = 256, nice: int = 10):
+        self.get_model = get_model
+        self.challengers = list(challengers)
+        self.default = default
+        self.save = save
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.nice = int(nice)
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._totals: Dict[tuple, Dict[str, float]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict, get_model: Callable[[str], Any], default: str,
+                    save: Callable[[Dict[str, Any]], None]) -> Optional["ShadowScorer"]:
+        cfg = config["api"].get("shadow", {})
+        if not cfg.get("enabled", False) or not cfg.get("models"):
+            return None
+        return cls(get_model, cfg["models"], default, save, cfg.get("workers", 1), cfg.get("max_pending", 256),
+                   cfg.get("nice", 10))
+
+    def targets(self, live: str) -> List[str]:
+        """Challengers of ``live``; a canary is always compared with the default model."""
+        names = [c for c in self.challengers if c != live]
+        if live != self.default and self.default not in names:
+            names.append(self.default)
+        return names
+
+    # ------------------------------------------------------------------ #
+    def submit(self, live: Any, X: np.ndarray, labels: Sequence[Any], proba: np.ndarray,
+               records: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Queue the shadow scoring of ``X`` (already scored by ``live``) and
+        return immediately. ``records`` (one per row, or None) are saved to
+        the prediction store once the challengers' results are attached –
+        or right away when the pool is saturated. False if dropped.
+        """
+        with self._lock:
+            accepted = self._pending < self.max_pending
+            if accepted:
+                self._pending += 1
+        if not accepted:
+            SHADOW_DROPPED.inc()
+            for rec in records or ():
+                self.save(rec)
+            return False
+        try:
+            self._executor().submit(self._score, live, X, list(labels), np.asarray(proba), records)
+        except RuntimeError:  # pool shut down (interpreter exit)
+            with self._lock:
+                self._pending -= 1
+            for rec in records or ():
+                self.save(rec)
+            return False
+        return True
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # threads do not survive fork(); one pool per process, created on first use
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="shadow",
+                                                    initializer=self._lower_priority)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _lower_priority(self):
+        try:
+            # Linux schedules threads individually, so this only demotes the pool thread
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError):
+            pass
+
+    def _score(self, live: Any, X: np.ndarray, labels: List[Any], proba: np.ndarray,
+               records: Optional[List[Dict[str, Any]]]):
+        try:
+            live_risk = live.risk(proba)
+            shadow: List[Dict[str, Any]] = [{} for _ in range(len(X))]
+            for name in self.targets(live.name):
+                try:
+                    challenger = self.get_model(name)
+                    start = time.perf_counter()
+                    p = challenger.predict_proba(X)
+                    seconds = time.perf_counter() - start
+                    c_labels, c_risk = challenger.labels(p), challenger.risk(p)
+                except Exception:
+                    SHADOW_ERRORS.labels(model=name).inc()
+                    logger.exception("shadow scoring failed", extra={"event": "shadow_error", "model": name})
+                    continue
+                SHADOW_LATENCY.labels(model=name).observe(seconds)
+                agree = np.asarray([str(a) == str(b) for a, b in zip(c_labels, labels)])
+                delta = c_risk - live_risk
+                self._record(live.name, name, agree, delta, seconds)
+                for row, a, label, r, d in zip(shadow, agree, c_labels, c_risk, delta):
+                    row[name] = {"prediction": label, "risk": round(float(r), 6), "delta": round(float(d), 6),
+                                 "agree": bool(a), "latency_ms": round(seconds * 1000, 3)}
+            for rec, row in zip(records or (), shadow):
+                self.save(rec | {"shadow": row})
+        except Exception:
+            logger.exception("shadow scoring failed", extra={"event": "shadow_error", "model": live.name})
+            for rec in records or ():
+                self.save(rec)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _record(self, live: str, challenger: str, agree: np.ndarray, delta: np.ndarray, seconds: float):
+        n_agree = int(agree.sum())
+        SHADOW_PREDICTIONS.labels(live=live, challenger=challenger, agree="true").inc(n_agree)
+        SHADOW_PREDICTIONS.labels(live=live, challenger=challenger, agree="false").inc(len(agree) - n_agree)
+        histogram = SHADOW_DELTA.labels(live=live, challenger=challenger)
+        for d in np.abs(delta).tolist():
+            histogram.observe(d)
+        with self._lock:
+            t = self._totals.setdefault((live, challenger), {"rows": 0, "agree": 0, "abs_delta": 0.0,
+                                                             "delta": 0.0, "calls": 0, "seconds": 0.0})
+            t["rows"] += len(agree)
+            t["agree"] += n_agree
+            t["abs_delta"] += float(np.abs(delta).sum())
+            t["delta"] += float(delta.sum())
+            t["calls"] += 1
+            t["seconds"] += seconds
+
+    # ------------------------------------------------------------------ #
+    def report(self) -> Dict[str, Any]:
+        """Running comparison per (live, challenger) pair in this process."""
+        with self._lock:
+            totals = {k: dict(v) for k, v in self._totals.items()}
+            pending = self._pending
+        pairs = [
+            {
+                "live": live,
+                "challenger": challenger,
+                "rows": t["rows"],
+                "agreement_rate": round(t["agree"] / t["rows"], 4) if t["rows"] else None,
+                "mean_abs_risk_delta": round(t["abs_delta"] / t["rows"], 6) if t["rows"] else None,
+                "mean_risk_delta": round(t["delta"] / t["rows"], 6) if t["rows"] else None,
+                "mean_latency_ms": round(t["seconds"] / t["calls"] * 1000, 3) if t["calls"] else None,
+            }
+            for (live, challenger), t in sorted(totals.items())
+        ]
+        return {"pid": os.getpid(), "challengers": self.challengers, "pending": pending, "pairs": pairs}
@@ -0,0 +1,452 @@
+"""
+Prediction log store – replaces the read-modify-write ``predictions.json``.
+
+Backends are picked by ``api.prediction_store.backend`` in the config:
+
+* ``sqlite`` (default) – one table in WAL mode with a timestamp index, so
+  appends are O(1) and concurrent workers never lose writes.
+* ``memory`` – process-local list, handy for local runs without disk I/O.
+
+``BufferedPredictionStore`` wraps any backend with a background writer
+thread: ``append`` only enqueues, so ``/predict`` never waits on disk.
+
+Per-minute buckets are kept for ``retention_minutes``, the largest window
+``/predictions/summary`` serves; older ones are deleted as records arrive.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.serving.summary import Deltas, build_summary, minute_key
+
+logger = logging.getLogger("api")
+
+# columns with their own SQL column; everything else goes to the JSON blob
+_CORE_FIELDS = ("timestamp", "prediction", "response_time")
+DEFAULT_RETENTION_MINUTES = 1440
+
+
+def retention_cutoff(retention_minutes: int) -> str:
+    """Oldest minute bucket still kept."""
+    return minute_key((datetime.now() - timedelta(minutes=retention_minutes)).isoformat())
+
+
+class PredictionStore(ABC):
+    """
+    Append-only log of served predictions.
+
+    ``query`` returns records newest first. ``before`` / ``after`` are
+    record ids used as keyset cursors over (timestamp, id); ``start`` /
+    ``end`` bound the ISO timestamp (inclusive / exclusive).
+    """
+
+    @abstractmethod
+    def append_many(self, records: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        limit: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def summary(self, window_minutes: int = 60) -> Dict[str, Any]:
+        """Label counts, latency percentiles and per-minute buckets of the last ``window_minutes``."""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def append(self, record: Dict[str, Any]):
+        self.append_many([record])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLitePredictionStore(PredictionStore):
+    def __init__(self, path: str = "data/predictions.db", retention_minutes: int = DEFAULT_RETENTION_MINUTES):
+        self.path = path
+        self.retention_minutes = retention_minutes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS predictions (
+                    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp     TEXT NOT NULL,
+                    prediction    TEXT,
+                    response_time REAL,
+                    extra         TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_predictions_ts ON predictions (timestamp)")
+            # incrementally maintained aggregates for /predictions/summary
+            conn.execute("CREATE TABLE IF NOT EXISTS agg_labels (label TEXT PRIMARY KEY, n INTEGER)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agg_minutes "
+                "(minute TEXT, label TEXT, n INTEGER, total_ms REAL, PRIMARY KEY (minute, label))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agg_minute_latency "
+                "(minute TEXT, bucket INTEGER, n INTEGER, total_ms REAL, PRIMARY KEY (minute, bucket))"
+            )
+            # all-time latency histogram of earlier versions, replaced by agg_minute_latency
+            conn.execute("DROP TABLE IF EXISTS agg_latency")
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread *and* per process (connections must not cross a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(rec: Dict[str, Any]) -> tuple:
+        extra = {k: v for k, v in rec.items() if k not in _CORE_FIELDS}
+        return (
+            rec.get("timestamp") or datetime.now().isoformat(),
+            rec.get("prediction"),
+            rec.get("response_time"),
+            json.dumps(extra, default=str) if extra else None,
+        )
+
+    @staticmethod
+    def _record(row: tuple) -> Dict[str, Any]:
+        rec_id, ts, pred, rt, extra = row
+        rec = {"id": rec_id, "prediction": pred, "response_time": rt, "timestamp": ts}
+        if extra:
+            rec.update(json.loads(extra))
+        return rec
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        rows = [self._row(r) for r in records]
+        deltas = Deltas({"timestamp": ts, "prediction": p, "response_time": rt} for ts, p, rt, _ in rows)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO predictions (timestamp, prediction, response_time, extra) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.executemany(
+                "INSERT INTO agg_labels VALUES (?, ?) ON CONFLICT(label) DO UPDATE SET n = n + excluded.n",
+                deltas.labels.items(),
+            )
+            conn.executemany(
+                "INSERT INTO agg_minutes VALUES (?, ?, ?, ?) ON CONFLICT(minute, label) "
+                "DO UPDATE SET n = n + excluded.n, total_ms = total_ms + excluded.total_ms",
+                [(m, label, n, ms) for (m, label), (n, ms) in deltas.minutes.items()],
+            )
+            conn.executemany(
+                "INSERT INTO agg_minute_latency VALUES (?, ?, ?, ?) ON CONFLICT(minute, bucket) "
+                "DO UPDATE SET n = n + excluded.n, total_ms = total_ms + excluded.total_ms",
+                [(m, b, n, ms) for (m, b), (n, ms) in deltas.latency.items()],
+            )
+            cutoff = retention_cutoff(self.retention_minutes)
+            conn.execute("DELETE FROM agg_minutes WHERE minute < ?", (cutoff,))
+            conn.execute("DELETE FROM agg_minute_latency WHERE minute < ?", (cutoff,))
+
+    def query(
+        self,
+        limit: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = [], []
+        cursor_key = "(SELECT timestamp, id FROM predictions WHERE id = ?)"
+        if before is not None:
+            where.append(f"(timestamp, id) < {cursor_key}")
+            params.append(int(before))
+        if after is not None:
+            where.append(f"(timestamp, id) > {cursor_key}")
+            params.append(int(after))
+        if start:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            where.append("timestamp < ?")
+            params.append(end)
+
+        # paging forward from `after` walks up the index, then flips to newest-first
+        order = "ASC" if after is not None and before is None else "DESC"
+        sql = "SELECT id, timestamp, prediction, response_time, extra FROM predictions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY timestamp {order}, id {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        out = [self._record(r) for r in self._conn().execute(sql, params)]
+        return out[::-1] if order == "ASC" else out
+
+    def summary(self, window_minutes: int = 60) -> Dict[str, Any]:
+        conn = self._conn()
+        cutoff = minute_key((datetime.now() - timedelta(minutes=window_minutes)).isoformat())
+        return build_summary(
+            conn.execute("SELECT minute, label, n, total_ms FROM agg_minutes WHERE minute >= ?", (cutoff,)),
+            conn.execute("SELECT minute, bucket, n, total_ms FROM agg_minute_latency WHERE minute >= ?", (cutoff,)),
+            window_minutes,
+            self.count(),
+        )
+
+    def count(self) -> int:
+        return sum(n for (n,) in self._conn().execute("SELECT n FROM agg_labels"))
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            for table in ("predictions", "agg_labels", "agg_minutes", "agg_minute_latency"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryPredictionStore(PredictionStore):
+    def __init__(self, retention_minutes: int = DEFAULT_RETENTION_MINUTES, **_):
+        self.retention_minutes = retention_minutes
+        self._lock = threading.Lock()
+        self.clear()
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            batch = []
+            for rec in records:
+                self._next_id += 1
+                batch.append({"timestamp": datetime.now().isoformat()} | rec | {"id": self._next_id})
+            self._records.extend(batch)
+            deltas = Deltas(batch)
+            for aggregate, updates in ((self._minutes, deltas.minutes), (self._latency, deltas.latency)):
+                for key, (n, ms) in updates.items():
+                    aggregate[key][0] += n
+                    aggregate[key][1] += ms
+                cutoff = retention_cutoff(self.retention_minutes)
+                for key in [k for k in aggregate if k[0] < cutoff]:
+                    del aggregate[key]
+
+    def query(
+        self,
+        limit: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = {r["id"]: (r["timestamp"], r["id"]) for r in self._records if r["id"] in (before, after)}
+            out = [
+                r for r in self._records
+                if (before is None or (r["timestamp"], r["id"]) < keys.get(before, ("", 0)))
+                and (after is None or (r["timestamp"], r["id"]) > keys.get(after, ("\uffff", 0)))
+                and (not start or r["timestamp"] >= start)
+                and (not end or r["timestamp"] < end)
+            ]
+        out.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+        if limit is None:
+            return out
+        return out[-limit:] if after is not None and before is None else out[:limit]
+
+    def summary(self, window_minutes: int = 60) -> Dict[str, Any]:
+        cutoff = minute_key((datetime.now() - timedelta(minutes=window_minutes)).isoformat())
+        with self._lock:
+            return build_summary(
+                [(m, label, n, ms) for (m, label), (n, ms) in self._minutes.items() if m >= cutoff],
+                [(m, b, n, ms) for (m, b), (n, ms) in self._latency.items() if m >= cutoff],
+                window_minutes,
+                len(self._records),
+            )
+
+    def count(self) -> int:
+        return len(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records: List[Dict[str, Any]] = []
+            self._next_id = 0
+            self._latency: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+            self._minutes: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+
+
+class BufferedPredictionStore(PredictionStore):
+    """
+    Background-writer wrapper: ``append`` puts the record on a queue and a
+    daemon thread writes whatever has accumulated, up to ``max_batch``
+    records per transaction (``flush_interval`` is its idle poll period).
+    Reads flush first, so callers always see their own writes.
+    """
+
+    def __init__(self, backend: PredictionStore, flush_interval: float = 0.5, max_batch: int = 500):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        atexit.register(self.close)
+
+    def _ensure_writer(self):
+        # threads do not survive fork(); start one per process on first use
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="prediction-store-writer", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _drain(self, first: Optional[Dict[str, Any]] = None):
+        batch = [first] if first is not None else []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            try:
+                self.backend.append_many(batch)
+            except Exception:
+                logger.exception(f"Failed to write {len(batch)} prediction record(s)")
+        return len(batch)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            with self._write_lock:
+                self._drain(first)
+
+    def append(self, record: Dict[str, Any]):
+        self._ensure_writer()
+        self._queue.put({"timestamp": datetime.now().isoformat()} | record)
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        for rec in records:
+            self.append(rec)
+
+    def flush(self):
+        with self._write_lock:
+            while self._drain():
+                pass
+
+    def query(self, limit: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        self.flush()
+        return self.backend.query(limit, **filters)
+
+    def summary(self, window_minutes: int = 60) -> Dict[str, Any]:
+        self.flush()
+        return self.backend.summary(window_minutes)
+
+    def count(self) -> int:
+        self.flush()
+        return self.backend.count()
+
+    def clear(self):
+        self.flush()
+        self.backend.clear()
+
+    def close(self):
+        if self._pid == os.getpid():
+            self.flush()
+        self.backend.close()
+
+
+BACKENDS = {
+    "sqlite": SQLitePredictionStore,
+    "memory": MemoryPredictionStore,
+}
+
+
+def migrate_json_log(store: PredictionStore, json_path: str) -> int:
+    """
+    One-shot import of the legacy ``predictions.json`` list; the file is
+    renamed to ``*.migrated`` afterwards so the import never runs twice.
+
+    The file is first claimed by renaming it to ``*.migrating`` and is
+    imported under an exclusive lock. A ``*.migrating`` file nobody holds
+    the lock on was left by an interrupted import, which is resumed.
+    """
+    claimed = json_path + ".migrating"
+    try:
+        os.replace(json_path, claimed)
+    except FileNotFoundError:
+        pass
+    try:
+        f = open(claimed)
+    except FileNotFoundError:
+        return 0
+    with f:
+        try:
+            # only one worker process performs the import
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        try:
+            if os.stat(claimed).st_ino != os.fstat(f.fileno()).st_ino:
+                return 0  # imported and renamed by another worker after we opened it
+        except FileNotFoundError:
+            return 0
+        records: List[Dict[str, Any]] = list(json.load(f))
+        store.append_many(records)
+        os.replace(claimed, json_path + ".migrated")
+    logger.info(f"Migrated {len(records)} prediction(s) from {json_path}")
+    return len(records)
+
+
+def create_store(config: Dict[str, Any]) -> PredictionStore:
+    """Build the store described by ``api.prediction_store``."""
+    cfg = dict(config.get("api", {}).get("prediction_store", {}))
+    backend_name = cfg.get("backend", "sqlite")
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown prediction store backend '{backend_name}'")
+
+    kwargs = {"path": cfg["path"]} if "path" in cfg and backend_name == "sqlite" else {}
+    kwargs["retention_minutes"] = int(cfg.get("max_window_minutes", DEFAULT_RETENTION_MINUTES))
+    backend = BACKENDS[backend_name](**kwargs)
+    if cfg.get("legacy_json"):
+        migrate_json_log(backend, cfg["legacy_json"])
+    return BufferedPredictionStore(
+        backend,
+        flush_interval=float(cfg.get("flush_interval", 0.5)),
+        max_batch=int(cfg.get("max_batch", 500)),
+    )
@@ -0,0 +1,106 @@
+"""
+Incremental aggregates behind ``/predictions/summary``.
+
+Every batch written to the prediction store is folded into small tables –
+all-time counts per label, and per minute the counts per label and a
+log-spaced latency histogram – so the summary costs the same no matter how
+long the history is. Label counts and latency percentiles over a window are
+the sums of its minute buckets.
+"""
+import bisect
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# log-spaced latency bucket upper edges in ms (~10 % relative resolution)
+LATENCY_EDGES_MS: List[float] = np.geomspace(0.05, 120_000, 155).round(4).tolist()
+PERCENTILES = (50, 90, 95, 99)
+
+
+def latency_bucket(ms: float) -> int:
+    return min(bisect.bisect_left(LATENCY_EDGES_MS, ms), len(LATENCY_EDGES_MS) - 1)
+
+
+def minute_key(timestamp: str) -> str:
+    """``2025-05-30T20:34:46.664066`` → ``2025-05-30T20:34``"""
+    return timestamp[:16]
+
+
+class Deltas:
+    """Aggregate contribution of one batch of prediction records."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.labels: Dict[str, int] = defaultdict(int)
+        # (minute, label) → [n, total_ms] and (minute, latency bucket) → [n, total_ms]
+        self.minutes: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.latency: Dict[Tuple[str, int], List[float]] = defaultdict(lambda: [0, 0.0])
+
+        for rec in records:
+            label = str(rec.get("prediction"))
+            rt = rec.get("response_time")
+            key = minute_key(rec["timestamp"])
+            self.labels[label] += 1
+            minute = self.minutes[(key, label)]
+            minute[0] += 1
+            if rt is not None:
+                bucket = self.latency[(key, latency_bucket(float(rt)))]
+                bucket[0] += 1
+                bucket[1] += float(rt)
+                minute[1] += float(rt)
+
+
+def _percentile(hist: Dict[int, int], q: float) -> float | None:
+    total = sum(hist.values())
+    if not total:
+        return None
+    rank, seen = q / 100 * total, 0
+    for b in sorted(hist):
+        n = hist[b]
+        if seen + n >= rank:
+            lo = LATENCY_EDGES_MS[b - 1] if b else 0.0
+            hi = LATENCY_EDGES_MS[b]
+            return round(lo + (hi - lo) * (rank - seen) / n, 2)
+        seen += n
+    return LATENCY_EDGES_MS[max(hist)]
+
+
+def build_summary(
+    minutes: Iterable[Tuple[str, str, int, float]],
+    latency: Iterable[Tuple[str, int, int, float]],
+    window_minutes: int,
+    all_time_total: int,
+) -> Dict[str, Any]:
+    """
+    Shape the stored aggregates into the API response: ``minutes`` are
+    (minute, label, n, total_ms) and ``latency`` (minute, bucket, n,
+    total_ms) rows of the window, summed into its totals.
+    """
+    labels: Dict[str, int] = defaultdict(int)
+    hist: Dict[int, int] = defaultdict(int)
+    n_lat, total_lat = 0, 0.0
+    for _, bucket, n, total_ms in latency:
+        hist[bucket] += n
+        n_lat += n
+        total_lat += total_ms
+    per_minute: Dict[str, Dict[str, Any]] = {}
+    for minute, label, n, total_ms in sorted(minutes):
+        labels[label] += n
+        row = per_minute.setdefault(minute, {"minute": minute, "count": 0, "by_label": {}, "_ms": 0.0})
+        row["count"] += n
+        row["by_label"][label] = row["by_label"].get(label, 0) + n
+        row["_ms"] += total_ms
+    for row in per_minute.values():
+        row["avg_response_time"] = round(row.pop("_ms") / row["count"], 2) if row["count"] else None
+
+    return {
+        "total": sum(labels.values()),
+        "by_label": dict(labels),
+        "response_time": {
+            "mean": round(total_lat / n_lat, 2) if n_lat else None,
+            **{f"p{q}": _percentile(hist, q) for q in PERCENTILES},
+        },
+        "window_minutes": window_minutes,
+        "per_minute": list(per_minute.values()),
+        "all_time_total": all_time_total,
+    }
@@ -0,0 +1,103 @@
+import logging.config
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# tests import the project as ``src.…``, like the entry points run from the repo root
+sys.path.insert(0, ROOT)
+# config/, data/raw/ and models/ are resolved relative to the repo root
+os.chdir(ROOT)
+
+LOG_DIR = tempfile.mkdtemp(prefix="test-logs-")
+
+
+def pytest_configure(config):
+    """Apply logging.yaml once, its file handlers pointed at LOG_DIR instead of the tracked logs/*.log."""
+    from src.data import preprocessing
+
+    with open(os.path.join(ROOT, "config", "logging.yaml")) as f:
+        logging_config = yaml.safe_load(f)
+    for handler in logging_config["handlers"].values():
+        if "filename" in handler:
+            handler["filename"] = os.path.join(LOG_DIR, os.path.basename(handler["filename"]))
+    logging.config.dictConfig(logging_config)
+    # setup_logging() is then a no-op, here and in a Workspace cwd
+    preprocessing._LOGGING_CONFIGURED.add("config/logging.yaml")
+
+
+def pytest_unconfigure(config):
+    logging.shutdown()
+    shutil.rmtree(LOG_DIR, ignore_errors=True)
+
+
+class Workspace:
+    """Throwaway cwd laid out like the repo: config/, data/raw/IDS_mapping.csv, models/, logs/."""
+
+    def __init__(self, root):
+        self.root = root
+        shutil.copytree(os.path.join(ROOT, "config"), root / "config")
+        (root / "data" / "raw").mkdir(parents=True)
+        shutil.copy(os.path.join(ROOT, "data", "raw", "IDS_mapping.csv"), root / "data" / "raw")
+        for d in ("models", "logs"):
+            (root / d).mkdir()
+        with open(root / "config" / "config.yaml") as f:
+            self.config = yaml.safe_load(f)
+
+    def save_config(self):
+        with open(self.root / "config" / "config.yaml", "w") as f:
+            yaml.safe_dump(self.config, f, sort_keys=False)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    ws = Workspace(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return ws
+
+
+@pytest.fixture(scope="session")
+def api_root(tmp_path_factory):
+    """Workspace with a preprocessor and a trained, calibrated LightGBM model, for the Flask app."""
+    from src.data.preprocessing import DataPreprocessor
+    from src.data.synthetic import make_raw_data
+    from src.models.train import ModelTrainer
+
+    root = tmp_path_factory.mktemp("api")
+    ws = Workspace(root)
+    ws.config["model"]["models"] = [m for m in ws.config["model"]["models"] if m["name"] == "lightgbm"]
+    ws.config["model"]["cv_folds"] = 2
+    ws.config["model"]["training"]["cache"] = False
+    ws.config["api"]["startup"]["warmup_rounds"] = 1
+    ws.save_config()
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        pre = DataPreprocessor()
+        X, y = pre.preprocess_data(make_raw_data(3000, seed=0))
+        pre.save_preprocessor()
+        ModelTrainer().train_models(X, y)
+    finally:
+        os.chdir(cwd)
+    return root
+
+
+@pytest.fixture
+def api(api_root, monkeypatch):
+    """The ``app`` module, imported once from ``api_root``, with an empty prediction store."""
+    monkeypatch.chdir(api_root)
+    import app
+
+    app.prediction_store.clear()
+    return app
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from src.serving.batching import MicroBatcher
+
+
+class Recorder:
+    """score_fn that records each batch it is given."""
+
+    def __init__(self, fn=lambda items: [x * 2 for x in items], delay=0.0):
+        self.fn, self.delay = fn, delay
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        time.sleep(self.delay)
+        return self.fn(items)
+
+
+def _submit_concurrently(batcher, items):
+    barrier = threading.Barrier(len(items))
+    results = [None] * len(items)
+
+    def call(i, item):
+        barrier.wait()
+        try:
+            results[i] = batcher.score(item, timeout=5)
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=call, args=(i, x)) for i, x in enumerate(items)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_coalesces_concurrent_submits():
+    score = Recorder()
+    batcher = MicroBatcher(score, max_batch_size=64, max_delay_ms=200)
+    assert _submit_concurrently(batcher, list(range(16))) == [x * 2 for x in range(16)]
+    assert sorted(x for batch in score.batches for x in batch) == list(range(16))
+    assert len(score.batches) < 16
+
+
+def test_max_batch_size_caps_a_batch():
+    score = Recorder(delay=0.01)
+    batcher = MicroBatcher(score, max_batch_size=4, max_delay_ms=200)
+    assert _submit_concurrently(batcher, list(range(12))) == [x * 2 for x in range(12)]
+    assert max(len(b) for b in score.batches) <= 4
+
+
+def test_max_delay_flushes_a_partial_batch():
+    score = Recorder()
+    batcher = MicroBatcher(score, max_batch_size=64, max_delay_ms=20)
+    start = time.perf_counter()
+    assert batcher.score(3, timeout=5) == 6
+    assert 0.015 <= time.perf_counter() - start < 1.0
+    assert score.batches == [[3]]
+
+
+def test_an_exception_result_fails_only_its_caller():
+    score = Recorder(lambda items: [ValueError(x) if x == 2 else x for x in items])
+    batcher = MicroBatcher(score, max_batch_size=8, max_delay_ms=200)
+    results = _submit_concurrently(batcher, [1, 2, 3])
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+
+
+def test_a_failing_score_fn_fails_the_whole_batch():
+    def boom(items):
+        raise RuntimeError("model crashed")
+
+    batcher = MicroBatcher(boom, max_batch_size=8, max_delay_ms=5)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.score(1, timeout=5)
+    # the worker survives
+    batcher.score_fn = Recorder()
+    assert batcher.score(1, timeout=5) == 2
+
+
+def test_short_result_list_fails_every_caller():
+    score = Recorder(lambda items: [x for x in items][:1])
+    batcher = MicroBatcher(score, max_batch_size=8, max_delay_ms=200)
+    results = _submit_concurrently(batcher, [1, 2, 3])
+    # no caller is left blocked; none gets another caller's result
+    assert all(isinstance(r, RuntimeError) for r in results)
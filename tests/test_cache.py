@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from src.serving import cache as cache_module
+from src.serving.cache import LRUCache, PredictionCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_the_ttl(clock):
+    lru = LRUCache("raw", max_entries=10, ttl_seconds=5)
+    lru.put("a", 1)
+    clock[0] += 4.9
+    assert lru.get("a") == 1
+    clock[0] += 0.2
+    assert lru.get("a") is None
+    assert "a" not in lru._data
+
+
+def test_zero_ttl_never_expires(clock):
+    lru = LRUCache("raw", max_entries=10, ttl_seconds=0)
+    lru.put("a", 1)
+    clock[0] += 1e9
+    assert lru.get("a") == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    lru = LRUCache("raw", max_entries=2, ttl_seconds=0)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "b" is now the least recently used
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+
+
+def test_drop_removes_only_that_model():
+    lru = LRUCache("raw", max_entries=10, ttl_seconds=0)
+    lru.put(("lightgbm", (1,), b"x"), 1)
+    lru.put(("xgboost", (1,), b"x"), 2)
+    lru.drop("lightgbm")
+    assert lru.get(("lightgbm", (1,), b"x")) is None
+    assert lru.get(("xgboost", (1,), b"x")) == 2
+
+
+@pytest.mark.parametrize("changed", ["model", "preprocessor"])
+def test_version_change_invalidates_the_model(changed):
+    cache = PredictionCache(max_entries=10, ttl_seconds=0)
+    model_v, pre_v = (1, 100), (7, 200)
+    row = np.arange(4, dtype=np.float32)
+    raw, feat = cache.raw_key("lightgbm", (model_v, pre_v), b"{}"), cache.feature_key("lightgbm", (model_v, pre_v), row)
+    other = cache.raw_key("xgboost", (model_v, pre_v), b"{}")
+    cache.raw.put(raw, "NO")
+    cache.features.put(feat, "NO")
+    cache.explanations.put(feat, [0.1])
+    cache.raw.put(other, "YES")
+
+    # unchanged versions keep the entries
+    assert cache.raw.get(cache.raw_key("lightgbm", (model_v, pre_v), b"{}")) == "NO"
+
+    new = ((2, 100), pre_v) if changed == "model" else (model_v, (8, 300))
+    new_raw = cache.raw_key("lightgbm", new, b"{}")
+    assert new_raw != raw
+    assert cache.raw.get(raw) is None and cache.features.get(feat) is None and cache.explanations.get(feat) is None
+    assert cache.raw.get(other) == "YES"  # other models are untouched
+
+
+def test_predict_invalidates_on_a_new_model_version(api, client, monkeypatch):
+    monkeypatch.setattr(api, "prediction_cache", PredictionCache(max_entries=10, ttl_seconds=0))
+    record = api.preprocessor.get().compiled.example_record
+
+    statuses = [client.post("/predict", json=record).headers["X-Cache"] for _ in range(2)]
+    assert statuses == ["miss", "hit-raw"]
+    # key order does not matter; the encoded row matches as well
+    assert client.post("/predict", json=dict(reversed(list(record.items())))).headers["X-Cache"] == "hit-raw"
+
+    live = api.registry.get("lightgbm")
+    monkeypatch.setattr(live, "version", live.version + (1,))
+    assert client.post("/predict", json=record).headers["X-Cache"] == "miss"
+    assert client.post("/predict", json=record).headers["X-Cache"] == "hit-raw"
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from src.models.calibration import Calibration, fit_calibration
+from src.serving.registry import LoadedModel
+
+
+@pytest.fixture
+def stepped():
+    """Held-out rows whose isotonic map is flat across raw probability 0.5."""
+    rng = np.random.default_rng(0)
+    proba = rng.uniform(size=4000)
+    y = (rng.uniform(size=4000) < np.where((proba > 0.3) & (proba < 0.7), 0.4, proba)).astype(int)
+    return proba, y
+
+
+def test_default_policy_is_proba_at_least_half(stepped):
+    proba, y = stepped
+    calibration = fit_calibration(proba, y, {"method": "isotonic"})
+    risk = calibration.risk(proba)
+    # a flat step around 0.5: no cut on the calibrated scale separates its rows
+    assert np.ptp(risk[(proba > 0.45) & (proba < 0.55)]) == 0
+
+    grid = np.concatenate([proba, [0.5, np.nextafter(0.5, 0), np.nextafter(0.5, 1), 0.0, 1.0]])
+    np.testing.assert_array_equal(calibration.flags(grid), grid >= 0.5)
+    assert calibration.report["operating_points"]["default"]["alert_rate"] == round(float((proba >= 0.5).mean()), 4)
+
+
+def test_raw_policies_survive_a_round_trip(stepped, tmp_path):
+    proba, y = stepped
+    cfg = {"method": "isotonic", "default_policy": "legacy",
+           "operating_points": [{"name": "legacy", "raw_threshold": 0.5}, {"name": "fixed", "threshold": 0.3}]}
+    path = str(tmp_path / "calibration.json")
+    fit_calibration(proba, y, cfg).save(path)
+    calibration = Calibration.load(path)
+
+    np.testing.assert_array_equal(calibration.flags(proba), proba >= 0.5)
+    np.testing.assert_array_equal(calibration.flags(proba, "fixed"), calibration.risk(proba) >= 0.3)
+    with pytest.raises(ValueError):
+        calibration.flags(proba, "missing")
+
+
+def test_loaded_model_labels_follow_the_default_policy(stepped):
+    proba, y = stepped
+    calibration = fit_calibration(proba, y, {"method": "isotonic"})
+    model = LoadedModel("m", None, ["NO", "YES"], (0,), 0, calibration)
+    np.testing.assert_array_equal(model.labels(proba), np.where(proba >= 0.5, "YES", "NO"))
+
+    model.calibration = None
+    np.testing.assert_array_equal(model.labels(proba), np.where(proba >= 0.5, "YES", "NO"))
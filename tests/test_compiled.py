@@ -0,0 +1,118 @@
+"""CompiledTransformer against the pandas reference path, ``transform_new_data``."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.compiled import CompiledTransformer, assert_equivalent
+from src.data.preprocessing import DataPreprocessor
+from src.data.synthetic import make_raw_data
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    pre = DataPreprocessor()
+    pre.preprocess_data(make_raw_data(3000, seed=1))
+    return pre
+
+
+@pytest.fixture(scope="module", params=["compiled", "bundle"])
+def compiled(request, fitted, tmp_path_factory):
+    compiled = CompiledTransformer.from_preprocessor(fitted)
+    if request.param == "bundle":
+        path = str(tmp_path_factory.mktemp("compiled") / "preprocessor.bundle")
+        compiled.save_bundle(path)
+        compiled = CompiledTransformer.load(path)
+    return compiled
+
+
+@pytest.fixture(scope="module")
+def records():
+    # race "?" is only rewritten at fit time; at inference it is an unseen category
+    raw = make_raw_data(400, seed=2).drop(columns=["readmitted"])
+    return raw[raw["race"] != "?"].to_dict("records")
+
+
+def _expected(pre, records):
+    return pre.transform_new_data(pd.DataFrame(records))[pre.feature_names_].to_numpy(dtype=np.float32)
+
+
+def test_normal_records(fitted, compiled, records):
+    assert_equivalent(fitted, compiled, records)
+
+
+def test_single_record(fitted, compiled, records):
+    assert_equivalent(fitted, compiled, records[:1])
+    np.testing.assert_array_equal(compiled.transform(records[0]), compiled.transform(records[:1]))
+
+
+@pytest.mark.parametrize("field, value", [
+    ("diag_1", "V57"),
+    ("diag_2", "E888"),
+    ("diag_3", "V45.81"),
+    ("diag_1", "250.83"),
+    ("diag_2", "1000"),          # beyond the last ICD-9 chapter
+    ("diag_3", 428),             # numeric code, not a string
+    ("admission_source_id", 9999),  # not in IDS_mapping.csv
+    ("admission_type_id", 9999),
+    ("age", "[200-210)"),
+    ("age", "90+"),
+    ("num_medications", "12"),
+    ("number_diagnoses", None),
+])
+def test_edge_values(fitted, compiled, records, field, value):
+    assert_equivalent(fitted, compiled, [records[0] | {field: value}] + records[1:5])
+
+
+@pytest.mark.parametrize("field, value", [
+    ("diag_1", "?"),
+    ("diag_2", None),
+    ("diag_3", np.nan),
+    ("gender", "Unknown/Invalid"),
+])
+def test_dropped_rows(fitted, compiled, records, field, value):
+    batch = records[:3] + [records[3] | {field: value}] + records[4:6]
+    assert_equivalent(fitted, compiled, batch)
+    X, rows, errors = compiled.transform_partial(batch)
+    assert rows.tolist() == [0, 1, 2, 4, 5] and list(errors) == [3]
+
+
+def test_only_dropped_rows(compiled, records):
+    with pytest.raises(ValueError):
+        compiled.transform([records[0] | {"gender": "Unknown/Invalid"}])
+
+
+@pytest.mark.parametrize("field", ["age", "diag_3", "metformin", "admission_source_id", "num_medications", "race"])
+def test_field_missing_from_some_records(fitted, compiled, records, field):
+    batch = [dict(r) for r in records[:6]]
+    del batch[2][field]
+    try:
+        expected = _expected(fitted, batch)
+    except (KeyError, ValueError) as e:
+        with pytest.raises(type(e)):
+            compiled.transform(batch)
+    else:
+        got = compiled.transform(batch)
+        np.testing.assert_array_equal(got, expected)
+
+
+@pytest.mark.parametrize("field", ["metformin", "insulin", "num_medications", "weight", "encounter_id"])
+def test_field_missing_from_every_record(fitted, compiled, records, field):
+    assert_equivalent(fitted, compiled, [{k: v for k, v in r.items() if k != field} for r in records[:20]])
+
+
+@pytest.mark.parametrize("field, value", [
+    ("race", "Martian"),
+    ("race", "?"),
+    ("change", "Maybe"),
+    ("metformin", "Sideways"),
+])
+def test_unknown_categories(fitted, compiled, records, field, value):
+    batch = records[:3] + [records[3] | {field: value}]
+    with pytest.raises(ValueError):
+        fitted.transform_new_data(pd.DataFrame(batch))
+    with pytest.raises(ValueError):
+        compiled.transform(batch)
+
+    X, rows, errors = compiled.transform_partial(batch)
+    assert rows.tolist() == [0, 1, 2] and list(errors) == [3]
+    np.testing.assert_array_equal(X, _expected(fitted, records[:3]))
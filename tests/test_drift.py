@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.data.preprocessing import DataPreprocessor
+from src.data.synthetic import make_raw_data
+from src.models.train import ModelTrainer
+from src.monitoring.drift import DriftMonitor, binned_ks, build_reference, psi
+
+
+class Constant:
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, X):
+        return np.column_stack([1 - np.full(len(X), self.p), np.full(len(X), self.p)])
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(0)
+    n = 5000
+    return np.column_stack([rng.normal(size=n), rng.integers(0, 3, size=n).astype(float),
+                            rng.exponential(size=n)])
+
+
+NAMES = ["lab", "code", "stay"]
+
+
+def _counts(reference, feature, X):
+    monitor = DriftMonitor(reference, NAMES, interval_seconds=3600, min_samples=1)
+    monitor._buffer.append((X, np.full(len(X), 0.3), "m"))
+    monitor.update()
+    return np.asarray(reference["features"][feature]["counts"]), monitor.counts[feature], monitor
+
+
+def test_identical_distribution_scores_near_zero(frame):
+    reference = build_reference(frame[:2500], NAMES, {"m": Constant(0.3)})
+    ref, cur, monitor = _counts(reference, "lab", frame[2500:])
+    assert psi(ref, cur) < 0.02
+    assert binned_ks(ref, cur) < 0.05
+    assert monitor.report["status"] == "ok"
+    assert all(f["psi"] < 0.02 for f in monitor.report["features"])
+    assert monitor.report["predictions"]["m"]["psi"] < 1e-6
+
+
+def test_shifted_distribution_scores_high(frame):
+    reference = build_reference(frame[:2500], NAMES, {"m": Constant(0.3)})
+    shifted = frame[2500:].copy()
+    shifted[:, 0] += 1.5
+    shifted[:, 1] = 2.0
+    shifted[: len(shifted) // 4, 2] = np.nan
+    monitor = DriftMonitor(reference, NAMES, interval_seconds=3600, min_samples=1)
+    monitor._buffer.append((shifted, np.full(len(shifted), 0.9), "m"))
+    monitor.update()
+
+    scores = {f["feature"]: f for f in monitor.report["features"]}
+    assert scores["lab"]["psi"] > 1.0 and scores["lab"]["ks"] > 0.4
+    assert scores["code"]["psi"] > 1.0 and "ks" not in scores["code"]  # discrete: PSI only
+    assert scores["stay"]["psi"] > 0.5  # a quarter of the values now missing
+    assert monitor.report["predictions"]["m"]["psi"] > 5
+
+
+def test_rows_in_an_old_layout_are_skipped(frame):
+    reference = build_reference(frame, NAMES, {})
+    monitor = DriftMonitor(reference, NAMES, interval_seconds=3600, min_samples=1)
+    monitor._buffer.append((frame[:10], np.zeros(10), "m"))
+
+    # the preprocessor was swapped: one more column, served first
+    monitor.set_feature_names(["new"] + NAMES)
+    assert len(monitor._buffer) == 0
+    # a request encoded before the swap reports after it
+    monitor._buffer.append((frame[:10], np.zeros(10), "m"))
+    monitor._buffer.append((np.column_stack([np.zeros(20), frame[:20]]), np.zeros(20), "m"))
+    monitor.update()
+    assert monitor.counts["lab"].sum() == 20
+    # the new column has no reference and is not scored
+    assert [f["feature"] for f in monitor.report["features"]] and "new" not in monitor.counts
+
+
+def test_reference_uses_the_real_held_out_rows(workspace):
+    model_cfg = workspace.config["model"]
+    model_cfg["models"] = [m for m in model_cfg["models"] if m["name"] == "lightgbm"]
+    model_cfg["cv_folds"] = 2
+    model_cfg["training"]["cache"] = False
+    workspace.save_config()
+
+    X, y = DataPreprocessor().preprocess_data(make_raw_data(2000, seed=3))
+    trainer = ModelTrainer()
+    trainer.train_models(X, y)
+
+    with open(workspace.config["monitoring"]["drift"]["reference_path"]) as f:
+        reference = json.load(f)
+    real_test_rows = int(trainer._resample((X, y))[5].sum())
+    assert 0 < reference["n_rows"] == real_test_rows < len(X)
+    assert set(reference["predictions"]) == {"lightgbm"}
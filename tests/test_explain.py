@@ -0,0 +1,94 @@
+"""Tree-SHAP explanations: folding encoded columns onto request fields, and the /explain endpoints."""
+import json
+
+import numpy as np
+import pytest
+
+from src.data.synthetic import make_raw_data
+
+
+@pytest.fixture(scope="module")
+def records():
+    return make_raw_data(40, seed=11).drop(columns=["readmitted"]).to_dict("records")
+
+
+def test_folded_contributions_and_bias_sum_to_raw_margin(api, records):
+    tables = api.preprocessor.get()
+    X, ok, errors = tables.compiled.transform_partial(records)
+    assert len(ok) + len(errors) == len(records) and len(ok) > 30
+    live = api.registry.get("lightgbm")
+
+    proba, contributions = live.explain(X)
+    folded = tables.groups.fold(contributions)
+    booster = getattr(live.model, "booster", None) or live.model.booster_
+    margin = booster.predict(np.asarray(X, dtype=np.float64), raw_score=True)
+
+    assert folded.shape == (len(X), len(tables.groups.fields))
+    np.testing.assert_allclose(folded.sum(axis=1) + contributions[:, -1], margin, atol=1e-6)
+    np.testing.assert_allclose(proba, live.predict_proba(X), atol=1e-6)
+
+
+def test_encoded_columns_fold_onto_their_source_field(api):
+    compiled = api.preprocessor.get().compiled
+    groups = api.preprocessor.get().groups
+    assert compiled.onehot_tables and compiled.binary_tables
+
+    # every encoded column belongs to exactly one field
+    np.testing.assert_array_equal(groups.matrix.sum(axis=1), np.ones(compiled.n_features))
+    owner = {j: groups.fields[k] for j, k in zip(*np.nonzero(groups.matrix))}
+    for field, table in compiled.onehot_tables.items():
+        columns = [j for j in table.values() if j >= 0]
+        assert columns and {owner[j] for j in columns} == {field}
+    for field, (columns, _, _) in compiled.binary_tables.items():
+        assert len(columns) > 1 and {owner[j] for j in columns} == {field}
+
+    # the encoded names themselves never surface as fields
+    encoded = {compiled.feature_names_[j] for j, f in owner.items() if f != compiled.feature_names_[j]}
+    assert encoded and not encoded & set(groups.fields)
+    assert set(compiled.onehot_tables) | set(compiled.binary_tables) <= set(groups.fields)
+
+
+def test_describe_orders_by_magnitude_and_echoes_raw_values(api, records):
+    groups = api.preprocessor.get().groups
+    folded = np.zeros((1, len(groups.fields)))
+    folded[0, :3] = [0.1, -0.5, 0.3]
+
+    items = groups.describe(folded, records[:1], top_k=2)[0]
+    assert [i["feature"] for i in items] == [groups.fields[1], groups.fields[2]]
+    assert [i["contribution"] for i in items] == [-0.5, 0.3]
+    for item in items:
+        assert ("value" in item) == (item["feature"] in groups.raw)
+        if "value" in item:
+            assert item["value"] == records[0][item["feature"]]
+    assert len(groups.describe(folded, records[:1], top_k=0)[0]) == len(groups.fields)
+
+
+def test_explain_endpoint_is_consistent_with_predict(api, client, records):
+    record = json.loads(json.dumps(records[0], default=str))
+    resp = client.post("/explain?top_k=0", json=record)
+    assert resp.status_code == 200, resp.json
+    body = resp.json
+
+    assert body["model"] == "lightgbm"
+    assert {c["feature"] for c in body["contributions"]} == set(api.preprocessor.get().groups.fields)
+    logit = np.log(body["probability"] / (1 - body["probability"]))
+    total = body["base_value"] + sum(c["contribution"] for c in body["contributions"])
+    assert total == pytest.approx(logit, abs=1e-3)
+
+    predicted = client.post("/predict", json=record).json
+    assert body["prediction"] == predicted["prediction"]
+
+
+def test_explain_batch_reports_bad_rows(client, records):
+    batch = [json.loads(json.dumps(r, default=str)) for r in records[:5]]
+    batch[1] = "not a record"
+    batch[2] = {k: v for k, v in batch[2].items() if k != "diag_1"}
+    resp = client.post("/explain/batch?top_k=3", json=batch)
+    assert resp.status_code == 200, resp.json
+    body = resp.json
+
+    assert body["n_rows"] == 5 and body["n_explained"] == 3 and body["n_errors"] == 2
+    assert [r["index"] for r in body["results"]] == list(range(5))
+    assert body["results"][1]["errors"] == ["record is not a JSON object"]
+    assert body["results"][2]["errors"] == ["missing diagnosis code 'diag_1'"]
+    assert all(len(r["contributions"]) == 3 for i, r in enumerate(body["results"]) if i not in (1, 2))
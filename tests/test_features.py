@@ -0,0 +1,35 @@
+"""
+Output parity of the vectorised feature engineering (src/data/features.py)
+with the row-wise pandas steps it replaced in DataPreprocessor. The
+reference implementations and ``check_parity`` live in
+src/data/feature_parity.py, shared with benchmarks/features_benchmark.py.
+"""
+import pandas as pd
+import pytest
+
+from src.data.feature_parity import COLUMNS, STEPS, check_parity, edge_frame, legacy_diag
+from src.data.features import icd9_categories
+from src.data.synthetic import make_raw_data
+
+
+@pytest.mark.parametrize("step", list(STEPS))
+def test_edge_cases(step):
+    check_parity(edge_frame(), [step])
+
+
+@pytest.mark.parametrize("step", list(STEPS))
+def test_synthetic_rows(step):
+    check_parity(make_raw_data(5000, seed=3)[COLUMNS], [step])
+
+
+def test_categorical_input():
+    # Parquet ingestion hands the columns over as pandas categoricals
+    df = make_raw_data(500, seed=4)[COLUMNS]
+    expected = legacy_diag(df["diag_1"])
+    pd.testing.assert_series_equal(icd9_categories(df["diag_1"].astype("category")).astype(object), expected)
+
+
+def test_non_default_index():
+    df = edge_frame()
+    df.index = df.index * 3 + 7
+    check_parity(df)
@@ -0,0 +1,108 @@
+"""CompiledForest against the native LightGBM / XGBoost ``predict_proba``, and its bundle round trip."""
+import lightgbm as lgb
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.models.forest import CompiledForest, compile_forest, max_difference
+
+TOLERANCE = 1e-6
+
+
+def _data(n_rows, seed):
+    """Numeric columns with NaNs, plus integer codes (zeros included) like the label-encoded categoricals."""
+    rng = np.random.default_rng(seed)
+    numeric = rng.normal(size=(n_rows, 4))
+    numeric[rng.uniform(size=numeric.shape) < 0.15] = np.nan
+    codes = rng.integers(0, 6, size=(n_rows, 3)).astype(np.float64)
+    X = np.column_stack([numeric, codes]).astype(np.float32)
+    logit = np.nan_to_num(numeric[:, 0]) - 0.5 * np.isnan(numeric[:, 1]) + (codes[:, 0] == 2) - 0.3 * codes[:, 1]
+    y = (rng.uniform(size=n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = _data(3000, seed=0)
+    X_test, _ = _data(1000, seed=1)
+    X_test[:5] = np.nan  # all-missing rows take every default direction
+    return X, y, X_test
+
+
+MODELS = {
+    "lightgbm": lambda: lgb.LGBMClassifier(n_estimators=60, num_leaves=15, verbose=-1),
+    "lightgbm-zero-as-missing": lambda: lgb.LGBMClassifier(n_estimators=60, num_leaves=15, zero_as_missing=True,
+                                                           verbose=-1),
+    "lightgbm-sigmoid": lambda: lgb.LGBMClassifier(n_estimators=60, max_depth=4, sigmoid=0.7, verbose=-1),
+    "xgboost": lambda: xgb.XGBClassifier(n_estimators=60, max_depth=5, base_score=0.3),
+    "xgboost-base-score": lambda: xgb.XGBClassifier(n_estimators=60, max_depth=3, base_score=0.8,
+                                                     learning_rate=0.3),
+}
+
+
+@pytest.fixture(scope="module", params=sorted(MODELS))
+def fitted(request, data):
+    X, y, _ = data
+    return MODELS[request.param]().fit(X, y)
+
+
+def _native(model, X):
+    return np.asarray(model.predict_proba(X))
+
+
+def test_matches_native_predict_proba(fitted, data):
+    _, _, X_test = data
+    forest = compile_forest(fitted)
+    np.testing.assert_allclose(forest.predict_proba(X_test), _native(fitted, X_test), rtol=0, atol=TOLERANCE)
+    assert max_difference(forest, fitted, X_test) <= TOLERANCE
+
+
+def test_uses_the_configured_base_score(data):
+    X, y, X_test = data
+    model = MODELS["xgboost-base-score"]().fit(X, y)
+    forest = compile_forest(model)
+    assert forest.base_margin == pytest.approx(np.log(0.8 / 0.2), rel=1e-6)
+    np.testing.assert_allclose(forest.predict_proba(X_test), _native(model, X_test), rtol=0, atol=TOLERANCE)
+
+
+def test_save_load_round_trip(fitted, data, tmp_path):
+    _, _, X_test = data
+    forest = compile_forest(fitted)
+    path = str(tmp_path / "model.forest")
+    forest.save(path)
+    loaded = CompiledForest.load(path, verify=True)
+
+    assert (loaded.source, loaded.n_trees, loaded.max_depth) == (forest.source, forest.n_trees, forest.max_depth)
+    assert not loaded.threshold.flags.writeable
+    np.testing.assert_array_equal(loaded.predict_proba(X_test), forest.predict_proba(X_test))
+    np.testing.assert_allclose(loaded.predict_proba(X_test), _native(fitted, X_test), rtol=0, atol=TOLERANCE)
+
+
+def test_load_verifies_the_checksum(data, tmp_path):
+    X, y, _ = data
+    path = tmp_path / "model.forest"
+    compile_forest(MODELS["xgboost"]().fit(X, y)).save(str(path))
+    raw = bytearray(path.read_bytes())
+    raw[-1] ^= 0xFF  # last byte of the data region
+    path.write_bytes(bytes(raw))
+
+    with pytest.raises(ValueError, match="Checksum"):
+        CompiledForest.load(str(path))
+    CompiledForest.load(str(path), verify=False)
+
+
+def test_rejects_other_bundle_kinds(tmp_path):
+    from src.models.bundle import write_bundle
+
+    path = str(tmp_path / "other.bundle")
+    write_bundle(path, "model/native", {}, {"x": np.zeros(3)})
+    with pytest.raises(ValueError):
+        CompiledForest.load(path)
+
+
+def test_refuses_true_categorical_splits(data):
+    X, y, _ = data
+    model = lgb.LGBMClassifier(n_estimators=10, min_data_per_group=5, cat_smooth=1, verbose=-1)
+    model.fit(X, y, categorical_feature=[4])
+    with pytest.raises(NotImplementedError):
+        compile_forest(model)
@@ -0,0 +1,10 @@
+def test_health_is_503_while_starting(api, client, monkeypatch):
+    ready = client.get("/health")
+    assert ready.status_code == 200
+    assert ready.json["status"] == "healthy" and ready.json["warmup"]["status"] == "ok"
+
+    monkeypatch.setitem(api.STARTUP, "ready", False)
+    starting = client.get("/health")
+    # the dashboard accepts this status and shows the body's "starting"
+    assert starting.status_code == 503
+    assert starting.json["status"] == "starting" and starting.json["model_loaded"]
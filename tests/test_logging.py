@@ -0,0 +1,40 @@
+import logging
+import os
+
+from src.data.ingestion import DataIngestion
+from src.data.preprocessing import DataPreprocessor, load_config
+from src.models.train import ModelTrainer
+
+
+def test_components_configure_logging_once():
+    DataPreprocessor()
+    handlers = list(logging.getLogger("model_pipeline").handlers)
+    assert handlers
+
+    # dictConfig would close and replace every handler
+    ModelTrainer()
+    DataIngestion()
+    ModelTrainer()
+    assert logging.getLogger("model_pipeline").handlers == handlers
+    assert logging.getLogger("data_pipeline").handlers
+
+
+def test_components_share_the_parsed_config(workspace, tmp_path, monkeypatch):
+    trainer, ingestion = ModelTrainer(), DataIngestion()
+    assert trainer.config == ingestion.config == DataPreprocessor().config == workspace.config
+    trainer.config["model"]["cv_folds"] = -1  # each caller gets its own copy
+    assert load_config()["model"]["cv_folds"] == workspace.config["model"]["cv_folds"]
+
+    workspace.config["model"]["cv_folds"] = 7
+    workspace.save_config()
+    assert ModelTrainer().config["model"]["cv_folds"] == 7
+    assert DataIngestion().config["model"]["cv_folds"] == 7
+
+    # same relative path and mtime in another directory is another file
+    other = tmp_path / "other"
+    (other / "config").mkdir(parents=True)
+    (other / "config" / "config.yaml").write_text("model: {cv_folds: 2}\n")
+    stat = os.stat("config/config.yaml")
+    os.utime(other / "config" / "config.yaml", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    monkeypatch.chdir(other)
+    assert load_config() == {"model": {"cv_folds": 2}}
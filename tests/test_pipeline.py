@@ -0,0 +1,164 @@
+"""Content-addressed training stages: cache hits / misses, forcing, publishing and the --force CLI check."""
+import importlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.cache import ArtifactCache, content_hash
+from src.models.pipeline import StagePipeline, code_version
+from train_model import STAGES, parse_args
+
+
+class Calls:
+    """Stage functions that record how often they ran."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, name, fn):
+        def run(*args):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return fn(*args)
+        return run
+
+
+def _build(cache, calls, scale=2, force=(), code=()):
+    pipeline = StagePipeline(cache, force=force)
+    load = pipeline.add("load", calls("load", lambda: np.arange(5)), params={"n": 5})
+    double = pipeline.add("transform", calls("transform", lambda x: x * scale), [load], params={"scale": scale}, code=code)
+    fits = pipeline.add_group(
+        {"fit-a": {"k": 1}, "fit-b": {"k": 2}},
+        calls("fit", lambda names, x: {n: (n, int(x.sum())) for n in names}),
+        [double],
+    )
+    return pipeline, double, fits
+
+
+def _statuses(pipeline):
+    return {row["stage"]: row["status"] for row in pipeline.summary()}
+
+
+def test_content_hash_tracks_values_and_frames():
+    frame = pd.DataFrame({"a": [1, 2], "b": [0.5, 1.5]})
+    assert content_hash(frame, {"x": 1}) == content_hash(frame.copy(), {"x": 1})
+    assert content_hash(frame, {"x": 1}) != content_hash(frame, {"x": 2})
+    assert content_hash(frame) != content_hash(frame.astype({"a": "float64"}))
+    assert content_hash(np.zeros(3)) != content_hash(np.zeros((3, 1)))
+
+
+def test_artifact_cache_round_trip(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    assert cache.get("stage-x", "k1") is None
+    cache.put("stage-x", "k1", {"v": 1})
+    assert cache.get("stage-x", "k1") == {"v": 1}
+    assert cache.get("stage-x", "k2") is None
+
+    with open(cache._path("stage-x", "k1"), "wb") as f:
+        f.write(b"not a joblib file")
+    assert cache.get("stage-x", "k1") is None
+
+    disabled = ArtifactCache(str(tmp_path / "off"), enabled=False)
+    disabled.put("stage-x", "k1", 1)
+    disabled.set_deployed({"m": "k"})
+    assert disabled.get("stage-x", "k1") is None and disabled.deployed() == {}
+    assert not os.path.exists(tmp_path / "off")
+
+
+def test_unchanged_inputs_hit_the_cache(tmp_path):
+    cache, calls = ArtifactCache(str(tmp_path)), Calls()
+    pipeline, _, fits = _build(cache, calls)
+    first = {n: pipeline.get(s) for n, s in fits.items()}
+    assert calls.counts == {"load": 1, "transform": 1, "fit": 1}  # the group is one call
+    assert set(_statuses(pipeline).values()) == {"run"}
+
+    again, _, fits = _build(cache, calls)
+    assert {n: again.get(s) for n, s in fits.items()} == first
+    assert calls.counts == {"load": 1, "transform": 1, "fit": 1}
+    # nothing upstream of a hit is even loaded
+    assert _statuses(again) == {"load": "skipped", "transform": "skipped", "fit-a": "hit", "fit-b": "hit"}
+
+
+def test_changed_params_miss_and_rerun_downstream(tmp_path):
+    cache, calls = ArtifactCache(str(tmp_path)), Calls()
+    pipeline, _, fits = _build(cache, calls, scale=2)
+    pipeline.get(fits["fit-a"])
+
+    changed, _, fits = _build(cache, calls, scale=3)
+    assert changed.get(fits["fit-a"]) == ("fit-a", 30)
+    statuses = _statuses(changed)
+    assert statuses["load"] == "hit" and statuses["transform"] == "run" and statuses["fit-a"] == "run"
+    assert calls.counts["load"] == 1 and calls.counts["transform"] == 2
+
+
+def test_changed_code_misses(tmp_path, monkeypatch):
+    (tmp_path / "stage_code.py").write_text("VERSION = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = importlib.import_module("stage_code")
+    try:
+        cache, calls = ArtifactCache(str(tmp_path / "cache")), Calls()
+        pipeline, double, _ = _build(cache, calls, code=[module])
+        before = code_version(module)
+        pipeline.get(double)
+
+        (tmp_path / "stage_code.py").write_text("VERSION = 2\n")
+        assert code_version(module) != before
+        rebuilt, double, _ = _build(cache, calls, code=[module])
+        rebuilt.get(double)
+        assert _statuses(rebuilt)["transform"] == "run" and calls.counts["transform"] == 2
+    finally:
+        sys.modules.pop("stage_code", None)
+
+
+@pytest.mark.parametrize("force, rerun", [
+    (["all"], {"load", "transform", "fit-a", "fit-b"}),
+    (["transform"], {"transform", "fit-a", "fit-b"}),
+    (["fit"], {"fit-a", "fit-b"}),  # prefix
+    (["fit-b"], {"fit-b"}),
+])
+def test_forced_stages_and_their_dependants_rerun(tmp_path, force, rerun):
+    cache, calls = ArtifactCache(str(tmp_path)), Calls()
+    pipeline, _, fits = _build(cache, calls)
+    for stage in fits.values():
+        pipeline.get(stage)
+
+    forced, _, fits = _build(cache, calls, force=force)
+    for stage in fits.values():
+        forced.get(stage)
+    assert {name for name, status in _statuses(forced).items() if status == "forced"} == rerun
+
+
+def test_publish_skips_an_already_deployed_artefact(tmp_path):
+    pipeline = StagePipeline(ArtifactCache(str(tmp_path / "cache")))
+    path = str(tmp_path / "model.joblib")
+    writes = []
+
+    def write():
+        writes.append(1)
+        with open(path, "w") as f:
+            f.write("model")
+
+    assert pipeline.publish("model", "k1", path, write) is True
+    assert pipeline.publish("model", "k1", path, write) is False
+    assert len(writes) == 1 and pipeline.cache.deployed() == {"model": "k1"}
+
+    assert pipeline.publish("model", "k2", path, write) is True  # new key
+    os.remove(path)
+    assert pipeline.publish("model", "k2", path, write) is True  # file gone
+    assert len(writes) == 3
+
+
+@pytest.mark.parametrize("force", [[], ["all"], ["fit-lightgbm"], STAGES])
+def test_force_accepts_known_stages(force):
+    argv = [a for stage in force for a in ("--force", stage)]
+    assert parse_args(argv).force == list(force)
+
+
+@pytest.mark.parametrize("stage", ["bogus", "fit-", "Fit", "evaluation"])
+def test_force_rejects_unknown_stages(stage, capsys):
+    with pytest.raises(SystemExit) as exc:
+        parse_args(["--force", "preprocess", "--force", stage])
+    assert exc.value.code == 2
+    assert f"unknown stage '{stage}'" in capsys.readouterr().err
@@ -0,0 +1,85 @@
+"""POST /predict/batch through the Flask test client."""
+import json
+
+import numpy as np
+import pytest
+
+from src.data.synthetic import make_raw_data
+
+
+@pytest.fixture(scope="module")
+def records():
+    raw = make_raw_data(60, seed=5).drop(columns=["readmitted"])
+    recs = raw.to_dict("records")
+    recs[3] = "not a record"
+    recs[5] = {k: v for k, v in recs[5].items() if k != "num_medications"}
+    recs[8] = recs[8] | {"time_in_hospital": "three"}
+    recs[13] = recs[13] | {"gender": "Unknown/Invalid"}
+    return recs
+
+
+def _post(client, records, **params):
+    query = "&".join(f"{k}={v}" for k, v in params.items())
+    return client.post(f"/predict/batch?{query}", data=json.dumps(records, default=str),
+                       content_type="application/json")
+
+
+def test_scores_valid_rows_and_reports_the_rest(api, client, records):
+    resp = _post(client, records, chunk_size=7)
+    assert resp.status_code == 200, resp.json
+    body = resp.json
+    results = body["results"]
+
+    assert body["model"] == "lightgbm" and body["n_rows"] == len(records)
+    assert [r["index"] for r in results] == list(range(len(records)))
+    assert body["n_scored"] + body["n_errors"] == len(records)
+    assert results[3]["errors"] == ["record is not a JSON object"]
+    assert "missing field 'num_medications'" in results[5]["errors"]
+    assert "non-numeric value for 'time_in_hospital'" in results[8]["errors"]
+    assert results[13]["errors"] and "prediction" not in results[13]
+
+    scored = [r for r in results if "prediction" in r]
+    assert len(scored) == body["n_scored"] > 30
+    assert all("errors" not in r for r in scored)
+    live, compiled = api.registry.get("lightgbm"), api.preprocessor.get().compiled
+    X = compiled.transform([records[r["index"]] for r in scored])
+    proba = live.predict_proba(X)
+    np.testing.assert_allclose([r["probability"] for r in scored], proba, atol=1e-6)
+    np.testing.assert_allclose([r["risk"] for r in scored], live.risk(proba), atol=1e-6)
+    assert [r["prediction"] for r in scored] == list(live.labels(proba))
+
+
+def test_chunking_does_not_change_results(client, records):
+    small = _post(client, records, chunk_size=1).json["results"]
+    large = _post(client, records, chunk_size=10_000).json["results"]
+    assert small == large
+
+
+def test_saves_scored_rows_to_the_store(api, client, records):
+    body = _post(client, records).json
+    stored = api.prediction_store.query()
+    assert len(stored) == body["n_scored"]
+    assert all(r["batch"] and r["model"] == "lightgbm" and r["response_time"] is None for r in stored)
+
+    summary = client.get("/predictions/summary").json
+    assert summary["total"] == body["n_scored"]
+    labels = [r["prediction"] for r in body["results"] if "prediction" in r]
+    assert summary["by_label"] == {label: labels.count(label) for label in set(labels)}
+    assert summary["response_time"]["mean"] is None  # batch rows carry no per-row latency
+
+
+def test_ndjson_body(client, records):
+    lines = [json.dumps(records[0], default=str), "{not json", json.dumps(records[1], default=str)]
+    resp = client.post("/predict/batch", data="\n".join(lines), content_type="application/x-ndjson")
+    results = resp.json["results"]
+    assert resp.status_code == 200
+    assert "prediction" in results[0] and "prediction" in results[2]
+    assert results[1]["errors"][0].startswith("invalid JSON")
+
+
+def test_rejects_bad_requests(api, client, records, monkeypatch):
+    assert client.post("/predict/batch", json={"not": "a list"}).status_code == 400
+    assert _post(client, records, model="missing").status_code == 404
+    assert _post(client, records, policy="missing").status_code == 400
+    monkeypatch.setitem(api.BATCH_CONFIG, "max_rows", 5)
+    assert _post(client, records).status_code == 413
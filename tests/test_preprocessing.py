@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from src.data.compiled import CompiledTransformer
+from src.data.preprocessing import DataPreprocessor
+from src.data.synthetic import make_raw_data
+
+
+def _uci_like(n_rows: int = 2000):
+    # the first rows of diabetic_data.csv have '?' diagnoses and would be dropped
+    raw = make_raw_data(n_rows, seed=5)
+    raw.loc[0, ["diag_2", "diag_3"]] = "?"
+    raw.loc[1, "diag_1"] = np.nan
+    raw.loc[2, "gender"] = "Unknown/Invalid"
+    raw.loc[3, "race"] = "?"  # "Other" when fitting, an unseen category when scoring
+    return raw
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    pre = DataPreprocessor()
+    pre.preprocess_data(_uci_like())
+    return pre
+
+
+def test_example_record_is_scorable(fitted):
+    raw, pre = _uci_like(), fitted
+    record = pre.example_record_
+    assert record["encounter_id"] == raw.loc[4, "encounter_id"]
+    assert "readmitted" not in record
+    assert CompiledTransformer.from_preprocessor(pre).transform(record).shape == (1, len(pre.feature_names_))
+
+
+def test_no_scorable_row(fitted):
+    raw = _uci_like(50)
+    raw["diag_1"] = "?"
+    assert fitted._example_record(raw) is None
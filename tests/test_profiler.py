@@ -0,0 +1,72 @@
+"""Sampling profiler output and the per-stage latency histograms."""
+import re
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.data.synthetic import make_raw_data
+from src.serving.profiler import collapsed, sample_stacks
+
+LINE = re.compile(r"^[^ ;]+(;[^ ;]+:[^ ;]+)+ \d+$")
+
+
+def _spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="busy-worker", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_collapsed_is_heaviest_first_with_trailing_newline():
+    counts = {"main;a:f;a:g": 3, "worker;b:h": 7, "main;a:f": 1}
+    assert collapsed(counts) == "worker;b:h 7\nmain;a:f;a:g 3\nmain;a:f 1\n"
+    assert collapsed({}) == ""
+
+
+def test_sample_stacks_root_at_thread_name_and_skip_the_caller(busy_thread):
+    counts = sample_stacks(0.1, interval=0.002)
+    busy = {stack: n for stack, n in counts.items() if stack.startswith("busy-worker;")}
+
+    assert busy and sum(busy.values()) > 5
+    # outermost frame first, the sampled function last
+    assert any(stack.split(";")[-1] == f"{__name__}:_spin" for stack in busy)
+    assert all(stack.split(";")[1] == "threading:_bootstrap" for stack in busy)
+    assert not any(f"{__name__}:test_sample_stacks" in stack for stack in counts)
+    for line in collapsed(counts).splitlines():
+        assert LINE.match(line), line
+
+
+def test_debug_profile_endpoint(api, client, monkeypatch, busy_thread):
+    monkeypatch.setitem(api.PROFILING_CONFIG, "enabled", False)
+    assert client.get("/debug/profile?seconds=0.05").status_code == 404
+
+    monkeypatch.setitem(api.PROFILING_CONFIG, "enabled", True)
+    assert client.get("/debug/profile?seconds=soon").status_code == 400
+    resp = client.get("/debug/profile?seconds=0.05&interval_ms=2")
+    assert resp.status_code == 200 and resp.content_type.startswith("text/plain")
+    lines = resp.get_data(as_text=True).splitlines()
+    assert any(line.startswith("busy-worker;") for line in lines)
+    assert all(LINE.match(line) for line in lines)
+
+
+def test_predict_observes_each_stage(client):
+    def count(stage):
+        return REGISTRY.get_sample_value(
+            "prediction_stage_latency_seconds_count", {"endpoint": "predict", "stage": stage}
+        ) or 0.0
+
+    stages = ["parse", "log", "save_prediction"]
+    before = {s: count(s) for s in stages}
+    record = make_raw_data(1, seed=21).drop(columns=["readmitted"]).iloc[0]
+    resp = client.post("/predict", data=record.to_json(), content_type="application/json")
+    assert resp.status_code == 200, resp.json
+    assert {s: count(s) - before[s] for s in stages} == {s: 1.0 for s in stages}
@@ -0,0 +1,70 @@
+import os
+import time
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder
+
+from src.data.preprocessing import DataPreprocessor, compiled_path
+from src.data.synthetic import make_raw_data
+from src.serving.registry import ModelRegistry, PreprocessorWatcher
+
+
+@pytest.fixture
+def registry(tmp_path):
+    X, y = np.random.default_rng(0).normal(size=(40, 3)), np.arange(40) % 2
+    joblib.dump(LogisticRegression().fit(X, y), tmp_path / "logreg.joblib")
+    joblib.dump(LabelEncoder().fit(["NO", "YES"]), tmp_path / "logreg_label_encoder.joblib")
+    joblib.dump({"not": "a model"}, tmp_path / "preprocessor.joblib")
+    return ModelRegistry(model_dir=str(tmp_path), reload_check_interval=0.0)
+
+
+def test_serves_models_on_disk(registry):
+    assert registry.available() == ["logreg"]
+    assert registry.get("logreg").predict_proba(np.zeros((2, 3))).shape == (2,)
+
+
+@pytest.mark.parametrize("name", ["../logreg", "../../tmp/x", "/etc/passwd", "logreg.joblib", "preprocessor",
+                                  "logreg_label_encoder", "missing", ""])
+def test_rejects_anything_but_a_model_name(registry, name):
+    with pytest.raises(KeyError):
+        registry.get(name)
+    assert registry._load_locks == {}
+
+
+def _save_preprocessor(path, n_rows, seed, drop=()):
+    pre = DataPreprocessor()
+    pre.preprocess_data(make_raw_data(n_rows, seed=seed).drop(columns=list(drop)))
+    pre.save_preprocessor(str(path))
+    return pre
+
+
+def test_preprocessor_hot_swap(tmp_path):
+    path = tmp_path / "preprocessor.joblib"
+    first = _save_preprocessor(path, 500, seed=1)
+    swapped = []
+    watcher = PreprocessorWatcher(str(path), reload_check_interval=0.0, on_swap=swapped.append)
+    tables = watcher.get()
+    assert tables.compiled.feature_names_ == first.feature_names_ and not swapped
+
+    # a retrain without the admission source changes the encoded layout
+    time.sleep(0.01)
+    second = _save_preprocessor(path, 500, seed=2, drop=["admission_source_id"])
+    fresh = watcher.get()
+    assert swapped == [fresh] and fresh is not tables
+    assert fresh.compiled.feature_names_ == second.feature_names_ != first.feature_names_
+    assert fresh.compiled.version != tables.compiled.version
+    assert set(fresh.groups.fields) != set(tables.groups.fields)
+    assert watcher.get() is fresh
+
+
+def test_preprocessor_reload_failure_keeps_loaded_version(tmp_path):
+    path = tmp_path / "preprocessor.joblib"
+    _save_preprocessor(path, 500, seed=1)
+    watcher = PreprocessorWatcher(str(path), reload_check_interval=0.0)
+    tables = watcher.get()
+    path.write_bytes(b"half-written")
+    os.remove(compiled_path(str(path)))
+    assert watcher.get() is tables
@@ -0,0 +1,78 @@
+"""Offline bulk scoring (score.py) against the serving model."""
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from score import score_file
+from src.data.compiled import CompiledTransformer
+from src.data.synthetic import make_raw_data
+from src.serving.registry import ModelRegistry
+
+MISSING_DIAGNOSIS = [4, 71, 150]
+
+
+@pytest.fixture
+def scoring(api_root, monkeypatch, tmp_path):
+    """Raw encounters with unscorable rows, and the expected probabilities of the rest."""
+    monkeypatch.chdir(api_root)
+    raw = make_raw_data(200, seed=3)
+    raw["encounter_id"] += 1000
+    raw.loc[MISSING_DIAGNOSIS, "diag_1"] = np.nan
+
+    compiled = CompiledTransformer.from_artifacts("models/preprocessor.joblib")
+    X, ok, errors = compiled.transform_partial(raw)
+    assert set(MISSING_DIAGNOSIS) <= set(errors)
+    expected = ModelRegistry("models").get("lightgbm").predict_proba(X)
+    return raw, pd.Series(expected, index=ok), tmp_path
+
+
+def _check(out: pd.DataFrame, raw: pd.DataFrame, expected: pd.Series):
+    assert out["row"].tolist() == list(range(len(raw)))
+    assert out["encounter_id"].tolist() == raw["encounter_id"].tolist()
+
+    bad = out.drop(index=expected.index)
+    assert bad["error"].notna().all()
+    assert bad.loc[MISSING_DIAGNOSIS, "error"].str.contains("diag_1").all()
+    assert bad["prediction"].isna().all() and bad["probability"].isna().all() and bad["risk"].isna().all()
+
+    good = out.loc[expected.index]
+    assert good["error"].isna().all()
+    np.testing.assert_allclose(good["probability"], expected, atol=1e-9)
+    assert set(good["prediction"]) <= {"No", "Yes"}
+    assert ((good["risk"] >= 0) & (good["risk"] <= 1)).all()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_csv_to_parquet_keeps_row_order(scoring, workers):
+    raw, expected, tmp_path = scoring
+    raw.to_csv(tmp_path / "in.csv", index=False)
+
+    summary = score_file(str(tmp_path / "in.csv"), str(tmp_path / "out.parquet"), "lightgbm",
+                         chunk_size=45, workers=workers)
+    assert summary["rows"] == len(raw) and summary["errors"] == len(raw) - len(expected)
+    _check(pd.read_parquet(tmp_path / "out.parquet"), raw, expected)
+    assert not (tmp_path / "out.parquet.tmp").exists()
+
+
+def test_parquet_input_keeps_nullable_and_float_ids(scoring):
+    raw, expected, tmp_path = scoring
+    raw["encounter_id"] = raw["encounter_id"].astype("Int64")
+    raw.loc[[10, 120], "encounter_id"] = pd.NA
+    raw["patient_nbr"] = raw["patient_nbr"].astype(np.float64) + 0.5
+    raw.to_parquet(tmp_path / "in.parquet", index=False)
+
+    score_file(str(tmp_path / "in.parquet"), str(tmp_path / "out.parquet"), "lightgbm", chunk_size=45, workers=1)
+    out = pd.read_parquet(tmp_path / "out.parquet")
+    schema = pq.read_schema(tmp_path / "out.parquet")
+    assert str(schema.field("encounter_id").type) == "int64" and str(schema.field("patient_nbr").type) == "double"
+    assert out["encounter_id"].isna().sum() == 2
+    assert out["patient_nbr"].tolist() == raw["patient_nbr"].tolist()
+    _check(out.assign(encounter_id=raw["encounter_id"]), raw, expected)
+
+
+def test_empty_input_is_an_error(scoring):
+    raw, _, tmp_path = scoring
+    raw.head(0).to_csv(tmp_path / "empty.csv", index=False)
+    with pytest.raises(ValueError, match="No rows"):
+        score_file(str(tmp_path / "empty.csv"), str(tmp_path / "out.parquet"), "lightgbm", workers=1)
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.serving.shadow import SHADOW_DROPPED, SHADOW_ERRORS, Canary, ShadowScorer
+
+
+class Model:
+    """Stand-in for LoadedModel: ``predict_proba`` returns ``proba`` (or raises ``fails``)."""
+
+    def __init__(self, name, proba=None, fails=None, gate=None):
+        self.name, self.proba, self.fails, self.gate = name, proba, fails, gate
+        self.classes_ = np.array(["NO", "YES"])
+
+    def predict_proba(self, X):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fails is not None:
+            raise self.fails
+        return np.asarray(self.proba if self.proba is not None else np.full(len(X), 0.5))
+
+    def risk(self, proba):
+        return np.asarray(proba, dtype=np.float64)
+
+    def labels(self, proba, policy=None):
+        return self.classes_[(np.asarray(proba) >= 0.5).astype(int)]
+
+
+class Saved(list):
+    def wait_for(self, n):
+        deadline = time.monotonic() + 5
+        while len(self) < n and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert len(self) == n
+
+
+def _scorer(models, challengers, **kwargs):
+    saved = Saved()
+    scorer = ShadowScorer(models.__getitem__, challengers, "live", saved.append, **kwargs)
+    return scorer, saved
+
+
+def _counter(metric, **labels):
+    return metric.labels(**labels)._value.get() if labels else metric._value.get()
+
+
+def test_report_agreement_and_delta():
+    live = Model("live")
+    models = {"challenger": Model("challenger", proba=[0.6, 0.2, 0.9, 0.1])}
+    scorer, saved = _scorer(models, ["challenger"])
+    proba = np.array([0.7, 0.6, 0.8, 0.3])
+    records = [{"id": i} for i in range(4)]
+    assert scorer.submit(live, np.zeros((4, 3)), live.labels(proba), proba, records)
+    saved.wait_for(4)
+
+    [pair] = scorer.report()["pairs"]
+    assert (pair["live"], pair["challenger"], pair["rows"]) == ("live", "challenger", 4)
+    assert pair["agreement_rate"] == 0.75  # row 1: YES vs NO
+    assert pair["mean_risk_delta"] == pytest.approx((-0.1 - 0.4 + 0.1 - 0.2) / 4, abs=1e-6)
+    assert pair["mean_abs_risk_delta"] == pytest.approx((0.1 + 0.4 + 0.1 + 0.2) / 4, abs=1e-6)
+    assert saved[1]["shadow"]["challenger"] | {"latency_ms": 0} == {
+        "prediction": "NO", "risk": 0.2, "delta": -0.4, "agree": False, "latency_ms": 0}
+
+
+def test_drop_at_max_pending_still_saves_the_record():
+    gate = threading.Event()
+    scorer, saved = _scorer({"slow": Model("slow", gate=gate)}, ["slow"], max_pending=1)
+    live, proba = Model("live"), np.array([0.9])
+    dropped = _counter(SHADOW_DROPPED)
+
+    assert scorer.submit(live, np.zeros((1, 3)), ["YES"], proba, [{"id": 1}])
+    assert not scorer.submit(live, np.zeros((1, 3)), ["YES"], proba, [{"id": 2}])
+    assert saved == [{"id": 2}]  # saved right away, without a shadow field
+    assert _counter(SHADOW_DROPPED) == dropped + 1
+
+    gate.set()
+    saved.wait_for(2)
+    assert saved[1]["id"] == 1 and "slow" in saved[1]["shadow"]
+    deadline = time.monotonic() + 5
+    while scorer.report()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert scorer.submit(live, np.zeros((1, 3)), ["YES"], proba, [{"id": 3}])  # a slot is free again
+
+
+def test_failing_challenger_counts_an_error_and_keeps_the_record():
+    models = {"broken": Model("broken", fails=RuntimeError("boom")), "ok": Model("ok", proba=[0.9])}
+    scorer, saved = _scorer(models, ["broken", "ok"])
+    errors = _counter(SHADOW_ERRORS, model="broken")
+    live = Model("live")
+
+    scorer.submit(live, np.zeros((1, 3)), ["YES"], np.array([0.8]), [{"id": 1}])
+    saved.wait_for(1)
+    assert _counter(SHADOW_ERRORS, model="broken") == errors + 1
+    assert saved[0]["id"] == 1
+    assert set(saved[0]["shadow"]) == {"ok"}
+    assert [p["challenger"] for p in scorer.report()["pairs"]] == ["ok"]
+
+
+def test_canary_is_compared_with_the_default_model():
+    scorer, _ = _scorer({}, ["xgboost", "random_forest"])
+    assert scorer.targets("live") == ["xgboost", "random_forest"]
+    assert scorer.targets("xgboost") == ["random_forest", "live"]
+
+
+def test_canary_routes_its_fraction(monkeypatch):
+    assert Canary.from_config({"api": {"canary": {"model": None, "fraction": 0.5}}}) is None
+    canary = Canary.from_config({"api": {"canary": {"model": "xgboost", "fraction": 0.25}}})
+    draws = iter([0.1, 0.3, 0.24, 0.25])
+    monkeypatch.setattr("src.serving.shadow.random.random", lambda: next(draws))
+    assert [canary.route() for _ in range(4)] == [True, False, True, False]
+    assert Canary("x", 7).fraction == 1.0
@@ -0,0 +1,153 @@
+import fcntl
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.serving.store import (BufferedPredictionStore, MemoryPredictionStore, SQLitePredictionStore,
+                               create_store, migrate_json_log)
+
+
+def _record(i, minutes_ago=0, label="NO"):
+    ts = (datetime.now() - timedelta(minutes=minutes_ago)).isoformat()
+    return {"timestamp": ts, "prediction": label, "response_time": 1.0 + i, "model": "lightgbm"}
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLitePredictionStore(str(tmp_path / "predictions.db"), retention_minutes=60)
+    else:
+        store = MemoryPredictionStore(retention_minutes=60)
+    yield store
+    store.close()
+
+
+def test_append_flush_query(backend):
+    store = BufferedPredictionStore(backend, flush_interval=60)
+    store.append_many([_record(i, label="YES" if i % 3 == 0 else "NO") for i in range(10)])
+
+    # the writer polls every 60 s: reads flush the queue themselves
+    assert store.count() == 10
+    page = store.query(limit=4)
+    assert [r["response_time"] for r in page] == [10.0, 9.0, 8.0, 7.0]
+    assert page[0]["model"] == "lightgbm"
+    assert store.summary(60)["by_label"] == {"YES": 4, "NO": 6}
+
+    store.clear()
+    assert store.count() == 0 and store.query() == []
+    assert store.summary(60)["per_minute"] == []
+
+
+def test_writer_thread_drains_the_queue(backend):
+    store = BufferedPredictionStore(backend, flush_interval=0.01, max_batch=3)
+    for i in range(7):
+        store.append(_record(i))
+    for _ in range(200):
+        if backend.count() == 7:
+            break
+        threading.Event().wait(0.01)
+    assert backend.count() == 7
+
+
+def test_old_minute_buckets_are_pruned(backend):
+    backend.append_many([_record(0, minutes_ago=180), _record(1, minutes_ago=90), _record(2, minutes_ago=30)])
+    backend.append_many([_record(3)])
+
+    minutes = [row["minute"] for row in backend.summary(10_000)["per_minute"]]
+    assert len(minutes) == 2
+    assert min(minutes) >= (datetime.now() - timedelta(minutes=60)).isoformat()[:16]
+    assert backend.count() == 4  # only the aggregates are pruned, not the log
+
+
+def test_pruning_shares_the_insert_transaction(tmp_path):
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"), retention_minutes=60)
+    store.append_many([_record(0, minutes_ago=120)])
+    n_minutes = store._conn().execute("SELECT COUNT(*) FROM agg_minutes").fetchone()[0]
+    assert n_minutes == 0
+
+
+def _legacy(tmp_path, n=5):
+    path = tmp_path / "predictions.json"
+    path.write_text(json.dumps([_record(i) for i in range(n)]))
+    return str(path)
+
+
+def test_migrates_the_json_log_once(tmp_path):
+    path = _legacy(tmp_path)
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    assert migrate_json_log(store, path) == 5
+    assert migrate_json_log(store, path) == 0
+    assert store.count() == 5
+    assert (tmp_path / "predictions.json.migrated").exists()
+    assert not (tmp_path / "predictions.json").exists()
+    assert not (tmp_path / "predictions.json.migrating").exists()
+
+
+def test_resumes_an_interrupted_migration(tmp_path):
+    path = _legacy(tmp_path)
+    # a worker claimed the file, then died before importing it
+    (tmp_path / "predictions.json").rename(tmp_path / "predictions.json.migrating")
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    assert migrate_json_log(store, path) == 5
+    assert store.count() == 5
+    assert (tmp_path / "predictions.json.migrated").exists()
+
+
+def test_skips_a_migration_in_progress(tmp_path):
+    path = _legacy(tmp_path)
+    claimed = tmp_path / "predictions.json.migrating"
+    (tmp_path / "predictions.json").rename(claimed)
+    store = SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    with open(claimed) as f:
+        fcntl.flock(f, fcntl.LOCK_EX)  # another worker is importing it
+        assert migrate_json_log(store, path) == 0
+    assert store.count() == 0 and claimed.exists()
+
+
+def test_create_store_migrates_and_buffers(tmp_path):
+    path = _legacy(tmp_path, n=3)
+    config = {"api": {"prediction_store": {"backend": "sqlite", "path": str(tmp_path / "p.db"),
+                                           "legacy_json": path, "max_window_minutes": 30}}}
+    store = create_store(config)
+    assert isinstance(store, BufferedPredictionStore)
+    assert store.backend.retention_minutes == 30
+    assert store.count() == 3
+    store.close()
+
+
+def test_concurrent_reader_and_writer(tmp_path):
+    db = str(tmp_path / "predictions.db")
+    writer_store, reader_store = SQLitePredictionStore(db), SQLitePredictionStore(db)
+    errors, counts, done = [], [], threading.Event()
+
+    def write():
+        try:
+            for i in range(50):
+                writer_store.append_many([_record(i), _record(i, label="YES")])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                counts.append(reader_store.count())
+                page = reader_store.query(limit=5)
+                assert len(page) <= 5
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write), threading.Thread(target=read)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert counts == sorted(counts)  # each read sees a whole committed batch, never less than before
+    assert all(n % 2 == 0 for n in counts)
+    assert reader_store.count() == 100
+    assert reader_store.summary(60)["by_label"] == {"NO": 50, "YES": 50}
@@ -0,0 +1,91 @@
+"""Out-of-core pipeline: streaming fit / transform against the in-memory one, and a streamed training run."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.ingestion import DataIngestion
+from src.data.preprocessing import DataPreprocessor
+from src.data.synthetic import make_raw_data
+from src.models.train import ModelTrainer
+from src.serving.registry import ModelRegistry
+
+
+def _ingestion(workspace, fmt: str, n_rows: int = 3000, chunksize: int = 700) -> DataIngestion:
+    make_raw_data(n_rows, seed=7).to_csv(workspace.config["data"]["raw_data_path"], index=False)
+    workspace.config["data"]["ingestion"].update(format=fmt, chunksize=chunksize)
+    workspace.save_config()
+    return DataIngestion()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_fit_streaming_matches_in_memory(workspace, fmt):
+    ingestion = _ingestion(workspace, fmt)
+    in_memory = DataPreprocessor()
+    X_mem, y_mem = in_memory.preprocess_data(ingestion.load_data())
+
+    streamed = DataPreprocessor()
+    streamed.fit_streaming(ingestion.iter_chunks())
+
+    assert streamed.feature_names_ == in_memory.feature_names_
+    assert streamed.onehot_encode_features == in_memory.onehot_encode_features
+    assert streamed.onehot_columns == in_memory.onehot_columns
+    assert streamed.label_encoders.keys() == in_memory.label_encoders.keys()
+    for c, le in in_memory.label_encoders.items():
+        assert list(streamed.label_encoders[c].classes_) == list(le.classes_)
+    assert streamed.binary_encoder.cols == in_memory.binary_encoder.cols
+    for a, b in zip(streamed.binary_encoder.ordinal_encoder.mapping, in_memory.binary_encoder.ordinal_encoder.mapping):
+        assert a["col"] == b["col"]
+        pd.testing.assert_series_equal(a["mapping"], b["mapping"])
+    assert streamed.target_classes_ == sorted(y_mem.unique())
+    assert streamed.example_record_ == in_memory.example_record_
+
+    parts = list(streamed.transform_chunks(ingestion.iter_chunks()))
+    X = pd.concat([x for x, _ in parts], ignore_index=True)
+    y = pd.concat([t for _, t in parts], ignore_index=True)
+    np.testing.assert_array_equal(X.to_numpy(np.float64), X_mem.to_numpy(np.float64))
+    assert list(X.columns) == list(X_mem.columns)
+    assert y.tolist() == y_mem.tolist()
+
+
+def test_train_streaming_saves_both_boosters(workspace):
+    ingestion = _ingestion(workspace, "parquet", n_rows=4000, chunksize=1000)
+    model_cfg = workspace.config["model"]
+    for spec in model_cfg["models"]:
+        if spec["name"] in ("lightgbm", "xgboost"):
+            spec["params"]["n_estimators"] = 20
+    model_cfg["streaming"].update(enabled=True, batch_rows=500)
+    workspace.save_config()
+
+    preprocessor = DataPreprocessor()
+    preprocessor.fit_streaming(ingestion.iter_chunks())
+    published = []
+    trainer = ModelTrainer()
+    # artefacts of an earlier in-memory run
+    trainer.cache.set_deployed({"preprocessor": "a", "lightgbm": "b", "forest-lightgbm": "b:1", "xgboost": "c",
+                                "forest-xgboost": "c:1", "random_forest": "d", "drift_reference": "e"})
+    results = trainer.train_streaming(
+        preprocessor.transform_chunks(ingestion.iter_chunks()), preprocessor.target_classes_,
+        before_publish=lambda: published.append([f for f in os.listdir("models") if not f.startswith(".")]),
+    )
+
+    assert set(results) == {"lightgbm", "xgboost"}
+    assert published == [[]]  # nothing written before the hook
+    for name in results:
+        assert 0.0 <= results[name]["roc_auc"] <= 1.0
+        for suffix in (".joblib", "_label_encoder.joblib", "_calibration.json"):
+            assert os.path.exists(f"models/{name}{suffix}")
+    assert os.path.exists("models/drift_reference.json")
+    # the next in-memory run must rewrite everything the streamed run replaced
+    assert trainer.cache.deployed() == {"preprocessor": "a", "random_forest": "d"}
+
+    # served like an in-memory fit
+    preprocessor.save_preprocessor()
+    X = np.asarray(next(preprocessor.transform_chunks(ingestion.iter_chunks(200)))[0], dtype=np.float32)
+    registry = ModelRegistry(compiled_trees=False)
+    for name in results:
+        model = registry.get(name)
+        proba = model.predict_proba(X)
+        assert proba.shape == (len(X),) and np.all((proba >= 0) & (proba <= 1))
+        assert set(model.labels(proba)) <= {"No", "Yes"}
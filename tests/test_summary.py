@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.serving.store import MemoryPredictionStore, SQLitePredictionStore
+from src.serving.summary import LATENCY_EDGES_MS, _percentile, build_summary, latency_bucket
+
+
+def _record(minutes_ago, label, ms):
+    ts = (datetime.now() - timedelta(minutes=minutes_ago)).isoformat()
+    return {"timestamp": ts, "prediction": label, "response_time": ms}
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLitePredictionStore(str(tmp_path / "predictions.db"))
+    return MemoryPredictionStore()
+
+
+def test_percentile_interpolates_within_a_bucket():
+    b = latency_bucket(10.0)
+    lo, hi = LATENCY_EDGES_MS[b - 1], LATENCY_EDGES_MS[b]
+    assert lo < 10.0 <= hi
+    assert _percentile({b: 4}, 50) == round(lo + (hi - lo) * 0.5, 2)
+    assert _percentile({b: 4}, 100) == round(hi, 2)
+    assert _percentile({}, 50) is None
+
+
+def test_percentile_picks_the_bucket_holding_the_rank():
+    fast, slow = latency_bucket(1.0), latency_bucket(100.0)
+    hist = {fast: 90, slow: 10}
+    assert _percentile(hist, 50) <= LATENCY_EDGES_MS[fast]
+    assert LATENCY_EDGES_MS[slow - 1] <= _percentile(hist, 95) <= LATENCY_EDGES_MS[slow]
+
+
+def test_build_summary_sums_minute_buckets():
+    minutes = [("2025-01-01T10:01", "NO", 3, 30.0), ("2025-01-01T10:00", "YES", 1, 5.0),
+               ("2025-01-01T10:01", "YES", 2, 10.0)]
+    latency = [("2025-01-01T10:00", latency_bucket(5.0), 1, 5.0), ("2025-01-01T10:01", latency_bucket(8.0), 5, 40.0)]
+    summary = build_summary(minutes, latency, 60, all_time_total=42)
+
+    assert summary["total"] == 6 and summary["all_time_total"] == 42
+    assert summary["by_label"] == {"NO": 3, "YES": 3}
+    assert summary["response_time"]["mean"] == round(45.0 / 6, 2)
+    assert [row["minute"] for row in summary["per_minute"]] == ["2025-01-01T10:00", "2025-01-01T10:01"]
+    assert summary["per_minute"][1] == {"minute": "2025-01-01T10:01", "count": 5, "by_label": {"NO": 3, "YES": 2},
+                                        "avg_response_time": 8.0}
+
+
+def test_summary_covers_only_the_window(store):
+    store.append_many([_record(90, "YES", 500.0)] * 3 + [_record(1, "NO", 2.0)] * 4 + [_record(0, "YES", 4.0)])
+
+    recent = store.summary(window_minutes=30)
+    assert recent["total"] == 5 and recent["all_time_total"] == 8
+    assert recent["by_label"] == {"NO": 4, "YES": 1}
+    assert recent["response_time"]["mean"] == 2.4
+    assert recent["response_time"]["p99"] < 5.0  # the 500 ms requests are outside the window
+
+    everything = store.summary(window_minutes=120)
+    assert everything["by_label"] == {"NO": 4, "YES": 4}
+    assert everything["response_time"]["p99"] > 400
+
+
+def _ids(page):
+    return [r["id"] for r in page]
+
+
+def test_keyset_pagination(store):
+    base = datetime(2025, 1, 1, 10)
+    # equal timestamps are ordered by id
+    store.append_many([{"timestamp": (base + timedelta(seconds=i // 2)).isoformat(), "prediction": "NO",
+                        "response_time": 1.0} for i in range(10)])
+    newest = _ids(store.query(limit=4))
+    assert newest == [10, 9, 8, 7]
+    assert _ids(store.query(limit=4, before=7)) == [6, 5, 4, 3]
+    assert _ids(store.query(limit=4, before=3)) == [2, 1]
+    assert _ids(store.query(limit=4, after=2)) == [6, 5, 4, 3]
+    assert _ids(store.query(limit=4, after=6)) == [10, 9, 8, 7]
+    assert _ids(store.query(after=3, before=8)) == [7, 6, 5, 4]
+    assert _ids(store.query(start=(base + timedelta(seconds=4)).isoformat())) == [10, 9]
+    assert _ids(store.query(end=(base + timedelta(seconds=1)).isoformat())) == [2, 1]
+
+
+def test_predictions_endpoint_cursors(api, client):
+    api.prediction_store.append_many([{"prediction": "NO", "response_time": float(i)} for i in range(5)])
+
+    first = client.get("/predictions?limit=2")
+    assert [r["response_time"] for r in first.json] == [4.0, 3.0]
+    next_before = first.headers["X-Next-Before"]
+
+    second = client.get(f"/predictions?limit=2&before={next_before}")
+    assert [r["response_time"] for r in second.json] == [2.0, 1.0]
+
+    last = client.get(f"/predictions?limit=2&before={second.headers['X-Next-Before']}")
+    assert [r["response_time"] for r in last.json] == [0.0]
+    assert "X-Next-Before" not in last.headers  # a short page is the last one
+
+    back = client.get(f"/predictions?limit=2&after={second.headers['X-Prev-After']}")
+    assert back.json == first.json
+
+
+def test_summary_endpoint_window(api, client):
+    api.prediction_store.append_many([_record(600, "YES", 3.0), _record(0, "NO", 3.0)])
+    body = client.get("/predictions/summary?window=60").json
+    assert body["by_label"] == {"NO": 1} and body["all_time_total"] == 2
+    # clamped to api.prediction_store.max_window_minutes
+    assert client.get("/predictions/summary?window=100000").json["window_minutes"] == 1440
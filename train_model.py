@@ -1,28 +1,110 @@
 """
 Script to train and save the model pipeline.
+
+The in-memory run is a DAG of cached stages (ingest → preprocess →
+resample → fit-<model> → evaluate, reference); stages whose inputs,
+config section and code are unchanged are loaded from the artefact cache
+or skipped.
+
+    python train_model.py                      # rerun only what changed
+    python train_model.py --force preprocess   # rerun preprocess and everything after it
 """
-from src.data.ingestion import DataIngestion
+import argparse
+import src.data.features
+import src.data.ingestion
+import src.data.preprocessing
+from src.data.ingestion import DataIngestion, file_sha256
 from src.data.preprocessing import DataPreprocessor
+from src.models.pipeline import StagePipeline
 from src.models.train import ModelTrainer
 import json, os, datetime as dt
 
-def main():
-    # Load and preprocess data
-    print("Loading and preprocessing data...")
-    ingestion = DataIngestion()
-    raw_data = ingestion.run_pipeline()
-    
+STAGES = ["ingest", "preprocess", "resample", "fit", "evaluate", "reference"]
+
+def train_streaming(ingestion: DataIngestion) -> dict:
+    """Two passes over the raw chunks: fit the encoders, then encode + train out of core."""
+    print("Fitting encoders chunk by chunk...")
+    preprocessor = DataPreprocessor()
+    preprocessor.fit_streaming(ingestion.iter_chunks())
+    trainer = ModelTrainer()
+
+    def save_preprocessor():
+        # before the models: a hot-reloading API never pairs new models with the old encoders
+        print("Saving preprocessor...")
+        preprocessor.save_preprocessor()
+        deployed = trainer.cache.deployed()
+        deployed.pop("preprocessor", None)
+        trainer.cache.set_deployed(deployed)
+
+    print("Training models from the on-disk feature matrix...")
+    chunks = preprocessor.transform_chunks(ingestion.iter_chunks())
+    return trainer.train_streaming(chunks, preprocessor.target_classes_, before_publish=save_preprocessor)
+
+
+def train_stages(ingestion: DataIngestion, force) -> dict:
+    """In-memory training as cached stages; prints each stage's status and wall time."""
+    config = ingestion.config
     preprocessor = DataPreprocessor()
-    X_processed, y = preprocessor.preprocess_data(raw_data)
-    
-    # Save preprocessor
-    print("Saving preprocessor...")
-    preprocessor.save_preprocessor()
-    
-    # Train models
-    print("Training models...")
     trainer = ModelTrainer()
-    results = trainer.train_models(X_processed, y)
+    pipeline = StagePipeline(trainer.cache, force=force)
+
+    ingest = pipeline.add(
+        "ingest", ingestion.run_pipeline,
+        params={"source": file_sha256(config["data"]["raw_data_path"]), "data": config["data"]},
+        code=[src.data.ingestion],
+        persist=False,  # the Parquet copy is ingestion's own cache
+    )
+
+    def preprocess(raw):
+        X, y = preprocessor.preprocess_data(raw)
+        return X, y, preprocessor.get_state()
+
+    preprocessed = pipeline.add(
+        "preprocess", preprocess, [ingest],
+        params={"features": config["features"], "mappings": file_sha256(config["data"]["mapping_data_path"])},
+        code=[src.data.preprocessing, src.data.features],
+    )
+
+    def save_preprocessor():
+        preprocessor.set_state(pipeline.get(preprocessed)[2])
+        preprocessor.save_preprocessor()
+
+    # published once the models are fitted but before their files, so a
+    # hot-reloading API never pairs new models with the old encoders
+    results = trainer.run_stages(
+        pipeline, preprocessed,
+        before_publish=lambda: pipeline.publish(
+            "preprocessor", preprocessed.key, "models/preprocessor.joblib", save_preprocessor
+        ),
+    )
+
+    print(f"{'stage':<24} {'status':<8} {'seconds':>9}")
+    for row in pipeline.summary():
+        print(f"{row['stage']:<24} {row['status']:<8} {row['seconds']:>9.2f}")
+    return results
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train and save the model pipeline.")
+    parser.add_argument(
+        "--force", action="append", default=[], metavar="STAGE",
+        help=f"rerun a stage and its dependants: {', '.join(STAGES)}, fit-<model> or all (repeatable)",
+    )
+    args = parser.parse_args(argv)
+    for stage in args.force:
+        if stage != "all" and stage not in STAGES and not (stage.startswith("fit-") and len(stage) > len("fit-")):
+            parser.error(f"unknown stage '{stage}'")
+    return args
+
+
+def main():
+    args = parse_args()
+    ingestion = DataIngestion()
+    if ingestion.config["model"].get("streaming", {}).get("enabled", False):
+        results = train_streaming(ingestion)
+    else:
+        print("Running training stages...")
+        results = train_stages(ingestion, args.force)
 
     metrics_path = "models/metrics.json"
     os.makedirs("models", exist_ok=True)